@@ -0,0 +1,75 @@
+# bulk.py
+# Request-body parsing for the bulk ingestion endpoints.
+# Bodies are either NDJSON (one JSON value per line) or a single JSON array.
+# NDJSON is parsed line by line as the body streams in, so memory stays flat
+# however large the upload is; a JSON array has to be read whole first.
+
+import json
+import os
+
+BULK_CHUNK_SIZE = int(os.getenv("BULK_CHUNK_SIZE", 500))
+
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl", "application/x-jsonlines")
+
+
+def _is_ndjson(content_type):
+    return (content_type or "").split(";")[0].strip().lower() in NDJSON_CONTENT_TYPES
+
+
+async def iter_bulk_items(body, content_type=None):
+    """
+    Yield (index, item, error) for each item of a bulk request body.
+    `body` is an async iterator of bytes (e.g. Request.stream()). A line that
+    isn't valid JSON yields its error instead of aborting the whole upload;
+    a malformed JSON array raises ValueError.
+    """
+    ndjson = _is_ndjson(content_type)
+    pending = b""
+    index = 0
+
+    async for chunk in body:
+        if not chunk:
+            continue
+        pending += chunk
+        if not ndjson:
+            stripped = pending.lstrip()
+            if not stripped:
+                continue
+            if stripped[:1] != b"[":
+                # Not an array: treat the body as NDJSON from here on
+                ndjson = True
+            else:
+                async for more in body:
+                    pending += more
+                items = json.loads(pending)
+                for index, item in enumerate(items):
+                    yield index, item, None
+                return
+
+        *lines, pending = pending.split(b"\n")
+        for line in lines:
+            if line.strip():
+                yield _parse_line(index, line)
+                index += 1
+
+    if pending.strip():
+        yield _parse_line(index, pending)
+
+
+def _parse_line(index, line):
+    try:
+        return index, json.loads(line), None
+    except ValueError as e:
+        return index, None, f"Invalid JSON: {e}"
+
+
+async def iter_chunks(items, size=BULK_CHUNK_SIZE):
+    """Group an async iterator of bulk items into lists of at most `size`."""
+    chunk = []
+    async for item in items:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
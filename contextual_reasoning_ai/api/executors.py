@@ -0,0 +1,108 @@
+# executors.py
+# Bounded executors for CPU-bound model inference.
+# Each model family ("audio", "image", "embedding", ...) gets its own small
+# thread pool, so a slow Wav2Vec2 request ties up only the audio workers and
+# never the event loop or the other endpoints. Work beyond the pool size plus
+# a short pending queue is rejected with InferenceBusyError rather than piling
+# up without limit.
+#
+# Sizes come from the environment (per model family first, then the default):
+#   INFERENCE_WORKERS_<NAME> / INFERENCE_WORKERS          threads per pool (default 2)
+#   INFERENCE_MAX_PENDING_<NAME> / INFERENCE_MAX_PENDING  queued calls allowed (default 8)
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+_executors = {}
+_registry_lock = threading.Lock()
+
+
+class InferenceBusyError(RuntimeError):
+    """Raised when an inference pool and its pending queue are both full."""
+
+
+def _env_int(name, key, default):
+    return int(os.getenv(f"{key}_{name.upper()}", os.getenv(key, default)))
+
+
+class InferenceExecutor:
+    def __init__(self, name, workers=2, max_pending=8):
+        self.name = name
+        self.workers = max(1, workers)
+        self.max_pending = max(0, max_pending)
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix=f"inference-{name}")
+        self._slots = threading.BoundedSemaphore(self.workers + self.max_pending)
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._completed = 0
+        self._rejected = 0
+
+    def submit(self, fn, *args, **kwargs):
+        """Submit a call; returns a concurrent Future or raises InferenceBusyError."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self._rejected += 1
+            raise InferenceBusyError(f"'{self.name}' inference is at capacity; retry later")
+        with self._lock:
+            self._in_flight += 1
+        future = self._pool.submit(functools.partial(fn, *args, **kwargs))
+        # The slot is held until the work itself finishes, even if the caller gave up
+        future.add_done_callback(self._release)
+        return future
+
+    def _release(self, _future):
+        with self._lock:
+            self._in_flight -= 1
+            self._completed += 1
+        self._slots.release()
+
+    async def run(self, fn, *args, **kwargs):
+        return await asyncio.wrap_future(self.submit(fn, *args, **kwargs))
+
+    def stats(self):
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "max_pending": self.max_pending,
+                "in_flight": self._in_flight,
+                "completed": self._completed,
+                "rejected": self._rejected,
+            }
+
+    def shutdown(self, wait=True):
+        self._pool.shutdown(wait=wait)
+
+
+def get_executor(name):
+    with _registry_lock:
+        executor = _executors.get(name)
+        if executor is None:
+            executor = InferenceExecutor(
+                name,
+                workers=_env_int(name, "INFERENCE_WORKERS", 2),
+                max_pending=_env_int(name, "INFERENCE_MAX_PENDING", 8),
+            )
+            _executors[name] = executor
+        return executor
+
+
+async def run_inference(name, fn, *args, **kwargs):
+    """Run `fn(*args, **kwargs)` on the `name` inference pool without blocking the event loop."""
+    return await get_executor(name).run(fn, *args, **kwargs)
+
+
+def executor_stats():
+    with _registry_lock:
+        executors = dict(_executors)
+    return {name: executor.stats() for name, executor in executors.items()}
+
+
+def shutdown_executors(wait=True):
+    with _registry_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.shutdown(wait=wait)
@@ -1,12 +1,21 @@
 # server.py (full updated)
-from fastapi import FastAPI, UploadFile, File
-from pydantic import BaseModel
-from contextual_reasoning_ai.core.cognition.context_engine import ContextEngine
+from fastapi import FastAPI, UploadFile, File, Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from contextual_reasoning_ai.core.cognitive.context_engine import ContextEngine
 from contextual_reasoning_ai.simulation.threat_simulator import ThreatSimulator
-from contextual_reasoning_ai.multimodal.audio_analyzer import AudioAnalyzer
-from contextual_reasoning_ai.db.neo4j_connector import Neo4jConnector
+from contextual_reasoning_ai.multimodal.model_registry import get_audio_analyzer, loaded_models
+from contextual_reasoning_ai.multimodal.uploads import upload_source, rewind
+from contextual_reasoning_ai.db.neo4j_connector import Neo4jConnector, neo4j_pool_metrics, close_all_drivers, close_all_async_drivers
 from contextual_reasoning_ai.core.cognition.embeddings import EmbeddingManager
-import shutil
+from contextual_reasoning_ai.core.cognition.embedding_codec import decode_embedding
+from contextual_reasoning_ai.api.bulk import BULK_CHUNK_SIZE, iter_bulk_items, iter_chunks
+from contextual_reasoning_ai.api.executors import InferenceBusyError, run_inference, executor_stats, shutdown_executors
+from contextual_reasoning_ai.workers.model_worker_pool import get_model_pool, model_pool_stats, close_model_pools
+import asyncio
+import io
+import json
 import os
 import uuid
 from datetime import datetime
@@ -19,6 +28,10 @@ engine = ContextEngine()
 neo4j_conn = Neo4jConnector()
 embedding_manager = EmbeddingManager()  # default model & neo4j connection via env
 
+@app.exception_handler(InferenceBusyError)
+async def inference_busy_handler(request: Request, exc: InferenceBusyError):
+    return JSONResponse(status_code=503, content={"error": str(exc)})
+
 # ======================================
 # Data Models
 # ======================================
@@ -61,6 +74,52 @@ def determine_relationship(src_type, target_type):
     }
     return relationships.get((src_type, target_type), "RELATED_TO")
 
+def worker_payload(source):
+    # Upload buffers can't be pickled to a worker: paths go as-is, buffers as
+    # BytesIO, which the pool moves through shared memory once it is large
+    if isinstance(source, str):
+        return source
+    return io.BytesIO(rewind(source).read())
+
+def analyze_image_upload(file: UploadFile):
+    # Small uploads are read straight from the upload buffer; big ones spool to a unique temp file
+    with upload_source(file.file, file.filename) as image:
+        result = engine.analyze_image(image)
+        # MODEL_WORKERS_IMAGE > 0: CLIP labels the image in its own processes
+        pool = get_model_pool("image")
+        if pool is not None:
+            labels = pool.call("analyze_image", worker_payload(image))
+            result["analysis"] = [{"label": label, "score": float(score)} for label, score in labels]
+        return result
+
+def transcribe_audio(audio):
+    # MODEL_WORKERS_AUDIO > 0: Wav2Vec2 runs in its own processes, loaded once per worker
+    pool = get_model_pool("audio")
+    if pool is not None:
+        return pool.call("analyze_audio", worker_payload(audio))
+    return get_audio_analyzer().analyze_audio(audio)
+
+def transcribe_audio_upload(file: UploadFile):
+    with upload_source(file.file, file.filename) as audio:
+        return transcribe_audio(audio)
+
+async def run_bulk(request, process_chunk):
+    """
+    Stream a bulk request body through `process_chunk` BULK_CHUNK_SIZE items at
+    a time. Each chunk is handled in the threadpool, so the event loop keeps
+    reading the upload while Neo4j and the model do the work.
+    """
+    results = []
+    try:
+        items = iter_bulk_items(request.stream(), request.headers.get("content-type"))
+        async for chunk in iter_chunks(items, BULK_CHUNK_SIZE):
+            results.extend(await run_in_threadpool(process_chunk, chunk))
+    except ValueError as e:
+        return {"error": f"Invalid bulk body: {str(e)}", "results": results}
+
+    failed = sum(1 for r in results if "error" in r)
+    return {"received": len(results), "succeeded": len(results) - failed, "failed": failed, "results": results}
+
 # ======================================
 # Basic analysis endpoints
 # ======================================
@@ -68,36 +127,122 @@ def determine_relationship(src_type, target_type):
 def analyze_text(data: TextInput):
     return engine.analyze_text(data.text)
 
+def analyze_text_chunk(chunk):
+    results, indexes, texts = [], [], []
+    for index, item, error in chunk:
+        text = item.get("text") if isinstance(item, dict) else item
+        if error is None and not (isinstance(text, str) and text.strip()):
+            error = "Item must be a string or an object with a non-empty 'text' field"
+        if error:
+            results.append({"index": index, "error": error})
+            continue
+        indexes.append(index)
+        texts.append(text)
+
+    if texts:
+        try:
+            analyzed = engine.analyze_texts(texts)
+        except Exception as e:
+            analyzed = [{"error": f"Bulk write failed: {str(e)}"}] * len(texts)
+        results.extend({"index": index, **result} for index, result in zip(indexes, analyzed))
+    return sorted(results, key=lambda r: r["index"])
+
+@app.post("/analyze/text/bulk")
+async def analyze_text_bulk(request: Request):
+    """
+    Body: NDJSON (Content-Type: application/x-ndjson) or a JSON array of
+    strings or {"text": ...} objects. Every chunk is written in one transaction.
+    """
+    return await run_bulk(request, analyze_text_chunk)
+
 @app.post("/analyze/image")
 async def analyze_image(file: UploadFile = File(...)):
-    temp_path = f"/tmp/{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    result = engine.analyze_image(temp_path)
-    os.remove(temp_path)
-    return result
+    # Reading and inference both run on the bounded image pool
+    return await run_inference("image", analyze_image_upload, file)
 
 @app.post("/analyze/audio")
 async def analyze_audio(file: UploadFile = File(...)):
-    temp_path = f"/tmp/{file.filename}"
-    with open(temp_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-    analyzer = AudioAnalyzer()
-    result = analyzer.analyze_audio(temp_path)
-    os.remove(temp_path)
+    result = await run_inference("audio", transcribe_audio_upload, file)
     return {"transcription": result}
 
+@app.post("/analyze/audio/stream")
+async def analyze_audio_stream(file: UploadFile = File(...), window_seconds: float = 20.0, overlap_seconds: float = 2.0):
+    """
+    Streamed transcription for long recordings: NDJSON lines of
+    {"start", "end", "text"} are sent as each batch of windows is decoded.
+    Always runs in-process (generators can't cross the model worker pool).
+    """
+    # The response outlives the upload object, so this one always gets its own temp file
+    spooled = upload_source(file.file, file.filename, always_spool=True)
+    audio_path = await run_in_threadpool(spooled.__enter__)
+    try:
+        # Taking the first audio slot up front turns overload into a 503 before streaming starts
+        analyzer = await run_inference("audio", get_audio_analyzer)
+        pieces = analyzer.stream_transcription(audio_path, window_seconds=window_seconds, overlap_seconds=overlap_seconds)
+    except Exception:
+        spooled.__exit__(None, None, None)
+        raise
+
+    async def ndjson():
+        try:
+            while True:
+                # Each step (decode + forward pass) runs on the bounded audio executor
+                piece = await run_inference("audio", next, pieces, None)
+                if piece is None:
+                    break
+                yield json.dumps(piece) + "\n"
+        except Exception as e:
+            yield json.dumps({"error": str(e)}) + "\n"
+        finally:
+            try:
+                # Raises ValueError if a disconnect left next() running on the executor
+                pieces.close()
+            except ValueError:
+                pass
+            finally:
+                spooled.__exit__(None, None, None)
+
+    return StreamingResponse(ndjson(), media_type="application/x-ndjson")
+
 @app.post("/simulate/threats")
 def simulate_threats():
     simulator = ThreatSimulator()
     simulator.simulate()
     return {"status": "Simulation completed"}
 
+# ======================================
+# Embedding helpers
+# ======================================
+async def embed_text_async(text):
+    # With micro-batching on, await the batcher's future directly: holding an
+    # inference thread per text would cap each batch at the pool size
+    if embedding_manager.batcher is not None:
+        return await asyncio.wrap_future(embedding_manager.batcher.submit(text))
+    return await run_inference("embedding", embedding_manager.embed_text, text)
+
+async def find_similar_async(q_matrix, k, memory_label, candidate_limit):
+    """
+    Top-k per query embedding. Only the scoring runs on the embedding executor;
+    brute-force candidates come through the async driver, and the ANN / native
+    index backends (mostly graph I/O) run on the threadpool.
+    """
+    if embedding_manager.similarity_backend != "brute_force":
+        return await run_in_threadpool(embedding_manager.find_top_k_similar_embeddings, q_matrix,
+                                       k=k, memory_label=memory_label, candidate_limit=candidate_limit)
+    async with neo4j_conn.get_async_session() as session:
+        result = await session.run(embedding_manager.candidate_query(memory_label), limit=candidate_limit)
+        rows = await result.data()
+    return await run_inference("embedding", embedding_manager.rank_candidates, q_matrix, rows, k)
+
+async def embed_and_store_node_async(label, node_id, content):
+    embedding = await embed_text_async(content)
+    await run_in_threadpool(embedding_manager.store_embedding_on_node, label, node_id, embedding)
+
 # ======================================
 # Memory creation (supports embedding)
 # ======================================
 @app.post("/memory/create")
-def create_memory(data: MemoryInput):
+async def create_memory(data: MemoryInput):
     if data.memory_type not in MEMORY_MAP:
         return {"error": f"Invalid memory_type '{data.memory_type}'. Must be one of {list(MEMORY_MAP.keys())}"}
 
@@ -112,9 +257,9 @@ def create_memory(data: MemoryInput):
     RETURN m
     """
 
-    with neo4j_conn.get_session() as session:
-        result = session.run(create_query, node_id=node_id, content=data.content, timestamp=timestamp)
-        node = result.single()[0]
+    async with neo4j_conn.get_async_session() as session:
+        result = await session.run(create_query, node_id=node_id, content=data.content, timestamp=timestamp)
+        node = (await result.single())[0]
 
         if data.link_to and data.link_to in MEMORY_MAP:
             link_label = MEMORY_MAP[data.link_to]
@@ -124,12 +269,18 @@ def create_memory(data: MemoryInput):
                   (target:{link_label} {{id: 'ltm_001'}})
             MERGE (src)-[:{relationship_type}]->(target)
             """
-            session.run(link_query, node_id=node_id)
+            await (await session.run(link_query, node_id=node_id)).consume()
 
     # optionally compute embedding immediately
     if data.embed:
         try:
-            embedding_manager.embed_and_store_node(memory_label, node_id, data.content)
+            await embed_and_store_node_async(memory_label, node_id, data.content)
+        except InferenceBusyError as e:
+            return {
+                "message": f"{memory_label} node created successfully (embedding skipped: {str(e)})",
+                "node_id": node_id,
+                "linked_to": data.link_to
+            }
         except Exception as e:
             # don't fail creation because embedding failed; return warning
             return {
@@ -144,6 +295,93 @@ def create_memory(data: MemoryInput):
         "linked_to": data.link_to
     }
 
+def create_memory_chunk(chunk):
+    results = {}
+    rows_by_type = {}
+    for index, item, error in chunk:
+        data = None
+        if error is None:
+            try:
+                data = MemoryInput.model_validate(item)
+            except ValidationError as e:
+                error = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in e.errors())
+        if data is not None and data.memory_type not in MEMORY_MAP:
+            error = f"Invalid memory_type '{data.memory_type}'. Must be one of {list(MEMORY_MAP.keys())}"
+        if error:
+            results[index] = {"index": index, "error": error}
+            continue
+        node_id = f"{data.memory_type[:2]}_{uuid.uuid4().hex[:8]}"
+        rows_by_type.setdefault(data.memory_type, []).append(
+            {"index": index, "node_id": node_id, "content": data.content, "link_to": data.link_to, "embed": data.embed}
+        )
+
+    timestamp = datetime.utcnow().isoformat()
+
+    def _create(tx):
+        # One UNWIND per label (labels and relationship types can't be parameters)
+        for memory_type, rows in rows_by_type.items():
+            memory_label = MEMORY_MAP[memory_type]
+            tx.run(f"""
+            UNWIND $rows AS row
+            MERGE (m:{memory_label} {{id: row.node_id}})
+            ON CREATE SET m.content = row.content,
+                          m.timestamp = datetime($timestamp)
+            """, rows=rows, timestamp=timestamp).consume()
+
+            links = {}
+            for row in rows:
+                if row["link_to"] in MEMORY_MAP:
+                    links.setdefault(row["link_to"], []).append(row["node_id"])
+            for link_to, node_ids in links.items():
+                relationship_type = determine_relationship(memory_type, link_to)
+                tx.run(f"""
+                MATCH (target:{MEMORY_MAP[link_to]} {{id: 'ltm_001'}})
+                UNWIND $node_ids AS node_id
+                MATCH (src:{memory_label} {{id: node_id}})
+                MERGE (src)-[:{relationship_type}]->(target)
+                """, node_ids=node_ids).consume()
+
+    all_rows = [row for rows in rows_by_type.values() for row in rows]
+    if all_rows:
+        try:
+            with neo4j_conn.get_session() as session:
+                session.execute_write(_create)
+        except Exception as e:
+            for row in all_rows:
+                results[row["index"]] = {"index": row["index"], "error": f"Bulk write failed: {str(e)}"}
+            return [results[i] for i in sorted(results)]
+
+    for row in all_rows:
+        results[row["index"]] = {"index": row["index"], "node_id": row["node_id"], "linked_to": row["link_to"]}
+
+    # Embed everything that asked for it in one model batch, then one write per label
+    to_embed = [(memory_type, row) for memory_type, rows in rows_by_type.items() for row in rows if row["embed"]]
+    if to_embed:
+        try:
+            embeddings = embedding_manager.embed_texts([row["content"] for _, row in to_embed])
+            by_label = {}
+            for (memory_type, row), embedding in zip(to_embed, embeddings):
+                ids, embs = by_label.setdefault(MEMORY_MAP[memory_type], ([], []))
+                ids.append(row["node_id"])
+                embs.append(embedding)
+            for memory_label, (ids, embs) in by_label.items():
+                embedding_manager.store_embeddings_batch(memory_label, ids, embs)
+        except Exception as e:
+            # don't fail creation because embedding failed; return warning
+            for _, row in to_embed:
+                results[row["index"]]["warning"] = f"embedding failed: {str(e)}"
+
+    return [results[i] for i in sorted(results)]
+
+@app.post("/memory/create/bulk")
+async def create_memory_bulk(request: Request):
+    """
+    Body: NDJSON (Content-Type: application/x-ndjson) or a JSON array of
+    MemoryInput objects. Nodes are created with one UNWIND per memory type per
+    chunk; embeddings requested with "embed": true are computed in one batch.
+    """
+    return await run_bulk(request, create_memory_chunk)
+
 # ======================================
 # Endpoint to encode & attach embedding to an existing node
 # ======================================
@@ -153,7 +391,7 @@ class EncodeInput(BaseModel):
     content: Optional[str] = None  # optional: re-encode this content instead of node.content
 
 @app.post("/memory/encode")
-def encode_node_embedding(data: EncodeInput):
+async def encode_node_embedding(data: EncodeInput):
     if data.memory_type not in MEMORY_MAP:
         return {"error": f"Invalid memory_type '{data.memory_type}'."}
     label = MEMORY_MAP[data.memory_type]
@@ -162,15 +400,17 @@ def encode_node_embedding(data: EncodeInput):
     content_to_embed = data.content
     if not content_to_embed:
         q = f"MATCH (n:{label} {{id: $node_id}}) RETURN n.content AS content"
-        with neo4j_conn.get_session() as session:
-            res = session.run(q, node_id=data.node_id)
-            rec = res.single()
+        async with neo4j_conn.get_async_session() as session:
+            res = await session.run(q, node_id=data.node_id)
+            rec = await res.single()
             if not rec:
                 return {"error": "Node not found"}
             content_to_embed = rec["content"]
 
     try:
-        embedding_manager.embed_and_store_node(label, data.node_id, content_to_embed)
+        await embed_and_store_node_async(label, data.node_id, content_to_embed)
+    except InferenceBusyError:
+        raise
     except Exception as e:
         return {"error": f"Embedding failed: {str(e)}"}
 
@@ -185,8 +425,21 @@ class SimilarityInput(BaseModel):
     candidate_limit: int = 1000
     top_k: int = 5
 
+def format_similarity_results(results, memory_type=None):
+    # normalize response
+    out = []
+    for r in results:
+        entry = {
+            "id": r.get("id"),
+            "label": r.get("label") if "label" in r else memory_type if memory_type else None,
+            "content": r.get("content"),
+            "score": r.get("score")
+        }
+        out.append(entry)
+    return out
+
 @app.post("/memory/similarity")
-def memory_similarity_search(data: SimilarityInput):
+async def memory_similarity_search(data: SimilarityInput):
     # memory_label optional
     memory_label = None
     if data.memory_type:
@@ -195,28 +448,90 @@ def memory_similarity_search(data: SimilarityInput):
         memory_label = MEMORY_MAP[data.memory_type]
 
     try:
-        results = embedding_manager.find_top_k_similar(data.query, k=data.top_k, memory_label=memory_label, candidate_limit=data.candidate_limit)
+        query_embedding = await embed_text_async(data.query)
+        results = (await find_similar_async([query_embedding], data.top_k, memory_label, data.candidate_limit))[0]
+    except InferenceBusyError:
+        raise
     except Exception as e:
         return {"error": f"Similarity search failed: {str(e)}"}
 
-    # normalize response
-    out = []
-    for r in results:
-        entry = {
-            "id": r.get("id"),
-            "label": r.get("label") if "label" in r else data.memory_type if data.memory_type else None,
-            "content": r.get("content"),
-            "score": r.get("score")
-        }
-        out.append(entry)
+    return {"query": data.query, "results": format_similarity_results(results, data.memory_type)}
+
+# Queries per /memory/similarity/batch request
+SIMILARITY_MAX_QUERIES = int(os.getenv("SIMILARITY_MAX_QUERIES", 64))
 
-    return {"query": data.query, "results": out}
+class SimilarityBatchInput(BaseModel):
+    queries: List[str]
+    memory_type: Optional[str] = None  # shared filter for every query
+    candidate_limit: int = 1000
+    top_k: int = 5
+
+@app.post("/memory/similarity/batch")
+async def memory_similarity_search_batch(data: SimilarityBatchInput):
+    """
+    Many similarity queries in one request: candidates are loaded and decoded once,
+    all queries are embedded in one model batch and scored together.
+    """
+    memory_label = None
+    if data.memory_type:
+        if data.memory_type not in MEMORY_MAP:
+            return {"error": f"Invalid memory_type '{data.memory_type}'."}
+        memory_label = MEMORY_MAP[data.memory_type]
+    if len(data.queries) > SIMILARITY_MAX_QUERIES:
+        return {"error": f"Too many queries ({len(data.queries)}); at most {SIMILARITY_MAX_QUERIES} per request."}
+    if not data.queries:
+        return {"results": []}
+
+    try:
+        # One model batch for all queries, then one scoring pass over shared candidates
+        q_matrix = await run_inference("embedding", embedding_manager.encode, data.queries)
+        batch_results = await find_similar_async(q_matrix, data.top_k, memory_label, data.candidate_limit)
+    except InferenceBusyError:
+        raise
+    except Exception as e:
+        return {"error": f"Similarity search failed: {str(e)}"}
+
+    return {
+        "results": [
+            {"query": query, "results": format_similarity_results(results, data.memory_type)}
+            for query, results in zip(data.queries, batch_results)
+        ]
+    }
+
+# ======================================
+# Embedding service metrics
+# ======================================
+@app.get("/embeddings/stats")
+def embedding_stats():
+    return embedding_manager.stats()
+
+@app.get("/metrics/ingest")
+def ingest_stats():
+    return engine.ingest_stats() or {"async_ingest": False}
+
+@app.get("/metrics/inference")
+def inference_stats():
+    return {"executors": executor_stats(), "model_pools": model_pool_stats(), "loaded_models": loaded_models()}
+
+@app.get("/metrics/neo4j")
+def neo4j_metrics():
+    return {"alive": neo4j_conn.driver.is_alive(), "pools": neo4j_pool_metrics()}
+
+@app.on_event("shutdown")
+async def shutdown():
+    # Flush any write-behind observations before the pool goes away
+    engine.close()
+    shutdown_executors()
+    embedding_manager.close()
+    close_model_pools()
+    await close_all_async_drivers()
+    close_all_drivers()
 
 # ======================================
 # Retrieval endpoints (existing)
 # ======================================
 @app.get("/memory/all/{memory_type}")
-def get_all_memories(memory_type: str):
+async def get_all_memories(memory_type: str):
     if memory_type not in MEMORY_MAP:
         return {"error": f"Invalid memory_type '{memory_type}'. Must be one of {list(MEMORY_MAP.keys())}"}
 
@@ -225,12 +540,12 @@ def get_all_memories(memory_type: str):
     RETURN m.id AS id, m.content AS content, m.timestamp AS timestamp
     ORDER BY m.timestamp DESC
     """
-    with neo4j_conn.get_session() as session:
-        result = session.run(query)
-        return [record.data() for record in result]
+    async with neo4j_conn.get_async_session() as session:
+        result = await session.run(query)
+        return await result.data()
 
 @app.get("/memory/{memory_type}/{node_id}")
-def get_memory_by_id(memory_type: str, node_id: str):
+async def get_memory_by_id(memory_type: str, node_id: str):
     if memory_type not in MEMORY_MAP:
         return {"error": f"Invalid memory_type '{memory_type}'."}
 
@@ -238,13 +553,19 @@ def get_memory_by_id(memory_type: str, node_id: str):
     MATCH (m:{MEMORY_MAP[memory_type]} {{id: $node_id}})
     RETURN m.id AS id, m.content AS content, m.timestamp AS timestamp, m.embedding AS embedding
     """
-    with neo4j_conn.get_session() as session:
-        result = session.run(query, node_id=node_id)
-        record = result.single()
-        return record.data() if record else {"error": "Memory node not found"}
+    async with neo4j_conn.get_async_session() as session:
+        result = await session.run(query, node_id=node_id)
+        record = await result.single()
+        if not record:
+            return {"error": "Memory node not found"}
+        data = record.data()
+        if data.get("embedding") is not None:
+            # Packed float32/int8 embeddings aren't JSON serializable as-is
+            data["embedding"] = decode_embedding(data["embedding"]).tolist()
+        return data
 
 @app.post("/memory/search")
-def search_memories(data: MemorySearchInput):
+async def search_memories(data: MemorySearchInput):
     if data.memory_type and data.memory_type not in MEMORY_MAP:
         return {"error": f"Invalid memory_type '{data.memory_type}'."}
 
@@ -265,20 +586,20 @@ def search_memories(data: MemorySearchInput):
         LIMIT $limit
         """
 
-    with neo4j_conn.get_session() as session:
-        result = session.run(query, query=data.query, limit=data.limit)
-        return [record.data() for record in result]
+    async with neo4j_conn.get_async_session() as session:
+        result = await session.run(query, query=data.query, limit=data.limit)
+        return await result.data()
 
 @app.get("/memory/graph/{node_id}")
-def get_memory_graph(node_id: str):
+async def get_memory_graph(node_id: str):
     query = """
     MATCH (start {id: $node_id})-[r*1..3]-(connected)
     RETURN start, r, connected
     """
-    with neo4j_conn.get_session() as session:
-        result = session.run(query, node_id=node_id)
+    async with neo4j_conn.get_async_session() as session:
+        result = await session.run(query, node_id=node_id)
         graph_data = []
-        for record in result:
+        async for record in result:
             graph_data.append({
                 "start": record["start"],
                 "connected": record["connected"],
@@ -1,7 +1,7 @@
 import argparse
 from core.context_engine import ContextEngine
 from simulation.threat_simulator import ThreatSimulator
-from multimodal.audio_analyzer import AudioAnalyzer
+from multimodal.model_registry import get_audio_analyzer
 
 def main():
     parser = argparse.ArgumentParser(description="Contextual Reasoner CLI")
@@ -24,7 +24,7 @@ def main():
         print(result)
 
     if args.audio:
-        analyzer = AudioAnalyzer()
+        analyzer = get_audio_analyzer()
         transcription = analyzer.analyze_audio(args.audio)
         print("Audio Transcription:")
         print(transcription)
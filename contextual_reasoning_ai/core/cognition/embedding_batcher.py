@@ -0,0 +1,165 @@
+# embedding_batcher.py
+# Micro-batching queue in front of the embedding model.
+# Concurrent callers submit single texts; a background thread collects them
+# for up to `max_wait_ms` (or until `max_batch_size` texts are waiting) and
+# runs one encode call for the whole batch.
+
+import queue
+import threading
+import time
+from concurrent.futures import Future, InvalidStateError
+from typing import Any, Callable, Dict, List, Tuple
+
+_STOP = object()
+
+
+class EmbeddingBatcher:
+    def __init__(self,
+                 encode_fn: Callable[[List[str]], List[Any]],
+                 max_batch_size: int = 64,
+                 max_wait_ms: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.encode_fn = encode_fn
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self._buckets = self._histogram_buckets(max_batch_size)
+        self._histogram = {b: 0 for b in self._buckets}
+        self._batches = 0
+        self._items = 0
+        self._max_queue_depth = 0
+
+        self._worker = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._worker.start()
+
+    @staticmethod
+    def _histogram_buckets(max_batch_size: int) -> List[int]:
+        buckets, b = [], 1
+        while b < max_batch_size:
+            buckets.append(b)
+            b *= 2
+        buckets.append(max_batch_size)
+        return buckets
+
+    # ------------------------
+    # Client side
+    # ------------------------
+    def submit(self, text: str) -> Future:
+        """Queue a text for embedding; the returned future resolves to its vector."""
+        future = Future()
+        # Checked and enqueued under the lock, so nothing lands behind close()'s stop marker
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("EmbeddingBatcher is closed")
+            self._queue.put((text, future))
+        depth = self._queue.qsize()
+        if depth > self._max_queue_depth:
+            with self._lock:
+                self._max_queue_depth = max(self._max_queue_depth, depth)
+        return future
+
+    def embed(self, text: str, timeout: float = None) -> Any:
+        return self.submit(text).result(timeout=timeout)
+
+    # ------------------------
+    # Worker side
+    # ------------------------
+    def _collect(self, first) -> Tuple[list, bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            # Callers that gave up (e.g. a cancelled asyncio.wrap_future) are dropped
+            # here; once running, a future can no longer be cancelled under us
+            batch = [(t, f) for t, f in batch if f.set_running_or_notify_cancel()]
+            if batch:
+                self._encode_batch(batch)
+            self._record(len(batch))
+
+        # Nothing can be queued after the stop marker, but fail any stragglers rather than hang
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                self._settle(item[1], error=RuntimeError("EmbeddingBatcher is closed"))
+
+    def _encode_batch(self, batch):
+        futures = [f for _, f in batch]
+        try:
+            results = self.encode_fn([t for t, _ in batch])
+            if len(results) != len(futures):
+                raise RuntimeError(f"encode_fn returned {len(results)} embeddings for {len(futures)} texts")
+        except Exception as e:
+            for f in futures:
+                self._settle(f, error=e)
+        else:
+            for f, r in zip(futures, results):
+                self._settle(f, result=r)
+
+    @staticmethod
+    def _settle(future: Future, result=None, error: BaseException = None):
+        # A future that can't take its result must never take the worker down with it
+        try:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+        except InvalidStateError:
+            pass
+
+    def _record(self, size: int):
+        with self._lock:
+            self._batches += 1
+            self._items += size
+            for b in self._buckets:
+                if size <= b:
+                    self._histogram[b] += 1
+                    break
+
+    # ------------------------
+    # Metrics & lifecycle
+    # ------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "batches": self._batches,
+                "items": self._items,
+                "avg_batch_size": (self._items / self._batches) if self._batches else 0.0,
+                "batch_size_histogram": {f"<={b}": n for b, n in self._histogram.items()},
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000.0,
+            }
+
+    def close(self, timeout: float = 5.0):
+        """Stop accepting work; texts already queued are still embedded."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(_STOP)
+        self._worker.join(timeout=timeout)
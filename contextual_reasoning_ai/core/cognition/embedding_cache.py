@@ -0,0 +1,248 @@
+# embedding_cache.py
+# Content-hash cache for text embeddings.
+# Keys are a hash of the model name plus the normalized text, so the same
+# alert text is only ever encoded once per model. A bounded in-memory LRU
+# sits in front of an optional memory-mapped on-disk tier that survives
+# restarts.
+
+import hashlib
+import json
+import mmap
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+
+def normalize_text(text: str) -> str:
+    """Unicode-normalize and collapse whitespace so trivially different texts share a key."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+class DiskEmbeddingStore:
+    """
+    Append-only on-disk tier: a float32 memmap of vectors plus a key file
+    whose n-th line is the key of row n. Holds at most `max_entries` rows;
+    once full, new vectors only go to the in-memory tier.
+    Has its own lock, so disk writes don't hold up in-memory lookups.
+    """
+
+    def __init__(self, path: str, model_name: str, dim: int, initial_capacity: int = 4096,
+                 max_entries: int = 1000000):
+        self.path = path
+        self.model_name = model_name
+        self.dim = dim
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._closed = False
+        os.makedirs(path, exist_ok=True)
+        self._meta_path = os.path.join(path, "meta.json")
+        self._vectors_path = os.path.join(path, "vectors.f32")
+        self._keys_path = os.path.join(path, "keys.txt")
+
+        if not self._meta_matches():
+            self._reset()
+
+        self._drop_partial_key_line()
+        self._rows: Dict[str, int] = {}
+        with open(self._keys_path, "r") as f:
+            for row, line in enumerate(f):
+                self._rows[line.rstrip("\n")] = row
+        file_rows = os.path.getsize(self._vectors_path) // (4 * dim)
+        self._capacity = max(file_rows, initial_capacity)
+        self._open_memmap()
+        self._keys_file = open(self._keys_path, "a")
+
+    def _meta_matches(self) -> bool:
+        if not (os.path.exists(self._meta_path) and os.path.exists(self._vectors_path)
+                and os.path.exists(self._keys_path)):
+            return False
+        with open(self._meta_path) as f:
+            meta = json.load(f)
+        return meta.get("model_name") == self.model_name and meta.get("dim") == self.dim
+
+    def _drop_partial_key_line(self):
+        # A crash mid-append can leave a key without its newline; the next
+        # append would glue onto it, so cut back to the last complete line
+        with open(self._keys_path, "r+b") as f:
+            data = f.read()
+            if data and not data.endswith(b"\n"):
+                f.truncate(data.rfind(b"\n") + 1)
+
+    def _reset(self):
+        with open(self._meta_path, "w") as f:
+            json.dump({"model_name": self.model_name, "dim": self.dim}, f)
+        open(self._vectors_path, "wb").close()
+        open(self._keys_path, "w").close()
+
+    def _open_memmap(self):
+        needed = self._capacity * self.dim * 4
+        if os.path.getsize(self._vectors_path) < needed:
+            with open(self._vectors_path, "r+b") as f:
+                f.truncate(needed)
+        self._vectors = np.memmap(self._vectors_path, dtype=np.float32, mode="r+",
+                                  shape=(self._capacity, self.dim))
+
+    def __len__(self):
+        return len(self._rows)
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            row = self._rows.get(key)
+            return None if row is None else np.array(self._vectors[row])
+
+    def put(self, key: str, vector: np.ndarray):
+        self.put_many([(key, vector)])
+
+    def put_many(self, items) -> int:
+        """
+        Append (key, vector) pairs with one msync and one key-file write for the
+        whole batch. Returns the number of rows added.
+        """
+        with self._lock:
+            if self._closed:
+                return 0
+            new_keys = []
+            first = len(self._rows)
+            for key, vector in items:
+                if key in self._rows or key in new_keys:
+                    continue
+                row = first + len(new_keys)
+                if row >= self.max_entries:
+                    break
+                if row >= self._capacity:
+                    self._vectors.flush()
+                    self._capacity *= 2
+                    self._open_memmap()
+                self._vectors[row] = vector
+                new_keys.append(key)
+            if not new_keys:
+                return 0
+            # Vectors first (synced to disk), then keys: a crash in between leaves
+            # unreferenced rows, never a key pointing at a zero or stale row
+            self._flush_rows(first, len(new_keys))
+            self._keys_file.write("".join(key + "\n" for key in new_keys))
+            self._keys_file.flush()
+            for offset, key in enumerate(new_keys):
+                self._rows[key] = first + offset
+            return len(new_keys)
+
+    def _flush_rows(self, first: int, count: int):
+        mapping = getattr(self._vectors, "_mmap", None)
+        if mapping is None:
+            self._vectors.flush()
+            return
+        # msync just the pages holding these rows; the offset must be page aligned
+        start = first * self.dim * 4
+        aligned = start - start % mmap.ALLOCATIONGRANULARITY
+        mapping.flush(aligned, start + count * self.dim * 4 - aligned)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._vectors.flush()
+            self._keys_file.close()
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, max_entries: int = 10000,
+                 disk_path: str = None, dim: int = None, max_disk_entries: int = 1000000):
+        if disk_path and not dim:
+            raise ValueError("dim is required when using the on-disk tier")
+        self.model_name = model_name
+        self.max_entries = max_entries
+        self.disk_path = disk_path
+        self.dim = dim
+        self.max_disk_entries = max_disk_entries
+        self._lru: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._disk = self._open_disk(model_name) if disk_path else None
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _open_disk(self, model_name: str) -> DiskEmbeddingStore:
+        return DiskEmbeddingStore(self.disk_path, model_name, self.dim, max_entries=self.max_disk_entries)
+
+    def key(self, text: str) -> str:
+        payload = f"{self.model_name}\0{normalize_text(text)}".encode("utf-8")
+        return hashlib.sha256(payload).hexdigest()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._lru[key] = vector
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_entries:
+            self._lru.popitem(last=False)
+
+    def get_many(self, texts: List[str]) -> List[Optional[np.ndarray]]:
+        out = []
+        with self._lock:
+            for text in texts:
+                key = self.key(text)
+                vector = self._lru.get(key)
+                if vector is not None:
+                    self._lru.move_to_end(key)
+                    self.memory_hits += 1
+                elif self._disk is not None and (vector := self._disk.get(key)) is not None:
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                else:
+                    self.misses += 1
+                out.append(vector)
+        return out
+
+    def get(self, text: str) -> Optional[np.ndarray]:
+        return self.get_many([text])[0]
+
+    def put_many(self, texts: List[str], vectors) -> None:
+        items = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = self.key(text)
+                vector = np.asarray(vector, dtype=np.float32)
+                self._remember(key, vector)
+                items.append((key, vector))
+            disk = self._disk
+        # The disk append (and its msync) happens outside the cache lock, once per batch
+        if disk is not None:
+            disk.put_many(items)
+
+    def put(self, text: str, vector) -> None:
+        self.put_many([text], [vector])
+
+    def set_model(self, model_name: str, dim: int = None) -> None:
+        """Invalidate everything cached for the previous model."""
+        with self._lock:
+            if model_name == self.model_name and (dim is None or dim == self.dim):
+                return
+            self.model_name = model_name
+            self.dim = dim or self.dim
+            self._lru.clear()
+            if self._disk is not None:
+                self._disk.close()
+                # A model/dim mismatch in meta.json resets the on-disk files
+                self._disk = self._open_disk(model_name)
+
+    def stats(self) -> Dict[str, object]:
+        with self._lock:
+            lookups = self.memory_hits + self.disk_hits + self.misses
+            return {
+                "model_name": self.model_name,
+                "memory_entries": len(self._lru),
+                "max_entries": self.max_entries,
+                "disk_entries": len(self._disk) if self._disk is not None else None,
+                "max_disk_entries": self.max_disk_entries if self._disk is not None else None,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "hit_rate": ((self.memory_hits + self.disk_hits) / lookups) if lookups else 0.0,
+            }
+
+    def close(self):
+        if self._disk is not None:
+            self._disk.close()
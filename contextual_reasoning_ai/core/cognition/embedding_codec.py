@@ -0,0 +1,75 @@
+# embedding_codec.py
+# Compact on-node storage formats for embeddings.
+#
+#   "list"    - plain list of floats (legacy; required by Neo4j vector indexes)
+#   "float32" - packed little-endian float32 bytes, decoded zero-copy
+#   "int8"    - int8 values with one float32 scale per vector (~4x smaller again)
+#
+# Packed values start with a 4-byte header (b"EMB" + format code) so they can
+# be told apart from each other; list-typed properties are still readable.
+
+from typing import Iterable, List, Sequence, Union
+
+import numpy as np
+
+STORAGE_FORMATS = ("list", "float32", "int8")
+
+_MAGIC = b"EMB"
+_FLOAT32 = ord("f")
+_INT8 = ord("q")
+_HEADER_SIZE = 4
+_F32 = np.dtype("<f4")
+
+_BYTES_TYPES = (bytes, bytearray, memoryview)
+
+
+def encode_embedding(embedding: Iterable[float], storage_format: str = "list") -> Union[List[float], bytes]:
+    """
+    Encode one embedding for storage as a Neo4j property.
+    """
+    if storage_format == "list":
+        return [float(x) for x in embedding]
+    vec = np.asarray(embedding, dtype=_F32)
+    if storage_format == "float32":
+        return _MAGIC + bytes([_FLOAT32]) + vec.tobytes()
+    if storage_format == "int8":
+        peak = float(np.max(np.abs(vec))) if vec.size else 0.0
+        scale = peak / 127.0 if peak > 0 else 1.0
+        quantized = np.clip(np.rint(vec / scale), -127, 127).astype(np.int8)
+        return _MAGIC + bytes([_INT8]) + np.float32(scale).astype(_F32).tobytes() + quantized.tobytes()
+    raise ValueError(f"Unknown embedding storage format '{storage_format}'. Must be one of {list(STORAGE_FORMATS)}")
+
+
+def decode_embedding(value) -> np.ndarray:
+    """
+    Decode a stored embedding (packed bytes or legacy list) to a float32 vector.
+    float32 payloads are returned as a read-only view over the original buffer.
+    """
+    if isinstance(value, _BYTES_TYPES):
+        buf = memoryview(value)
+        if len(buf) < _HEADER_SIZE or bytes(buf[:3]) != _MAGIC:
+            raise ValueError("Not a packed embedding value")
+        code = buf[3]
+        if code == _FLOAT32:
+            return np.frombuffer(buf, dtype=_F32, offset=_HEADER_SIZE)
+        if code == _INT8:
+            scale = np.frombuffer(buf, dtype=_F32, count=1, offset=_HEADER_SIZE)[0]
+            quantized = np.frombuffer(buf, dtype=np.int8, offset=_HEADER_SIZE + 4)
+            return quantized.astype(np.float32) * scale
+        raise ValueError(f"Unknown packed embedding format code {code!r}")
+    return np.asarray(value, dtype=np.float32)
+
+
+def decode_embeddings(values: Sequence) -> np.ndarray:
+    """
+    Decode many stored embeddings into one (N, D) float32 matrix.
+    """
+    if not values:
+        return np.zeros((0, 0), dtype=np.float32)
+    # Fast path: all packed float32 -> a single join and one frombuffer
+    if all(isinstance(v, _BYTES_TYPES) and len(v) > _HEADER_SIZE and v[3] == _FLOAT32 for v in values):
+        width = len(values[0]) - _HEADER_SIZE
+        if all(len(v) - _HEADER_SIZE == width for v in values):
+            joined = b"".join(memoryview(v)[_HEADER_SIZE:] for v in values)
+            return np.frombuffer(joined, dtype=_F32).reshape(len(values), -1)
+    return np.stack([decode_embedding(v) for v in values])
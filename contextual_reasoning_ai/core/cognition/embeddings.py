@@ -3,44 +3,178 @@
 # Uses sentence-transformers for local embedding generation.
 
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
 import numpy as np
-from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError
 import os
+import threading
+import time
 from typing import List, Dict, Any
+from contextual_reasoning_ai.db.neo4j_connector import get_neo4j_driver
+from contextual_reasoning_ai.core.cognition.vector_index import VectorIndex
+from contextual_reasoning_ai.core.cognition.embedding_batcher import EmbeddingBatcher
+from contextual_reasoning_ai.core.cognition.embedding_cache import EmbeddingCache
+from contextual_reasoning_ai.core.cognition.neo4j_vector_search import VECTOR_INDEX_NAMES, vector_index_statements, query_vector_indexes
+from contextual_reasoning_ai.workers.model_worker_pool import RemoteModel, get_model_pool
+from contextual_reasoning_ai.core.cognition.embedding_codec import (
+    STORAGE_FORMATS, encode_embedding, decode_embedding, decode_embeddings
+)
+
+SIMILARITY_BACKENDS = ("brute_force", "ann", "neo4j")
 
 class EmbeddingManager:
     def __init__(self,
                  model_name: str = "all-MiniLM-L6-v2",
                  neo4j_uri: str = None,
                  neo4j_user: str = None,
-                 neo4j_password: str = None):
+                 neo4j_password: str = None,
+                 similarity_backend: str = None,
+                 vector_index_path: str = None,
+                 batching: bool = None,
+                 batch_max_size: int = None,
+                 batch_max_wait_ms: float = None,
+                 cache_size: int = None,
+                 cache_dir: str = None,
+                 storage_format: str = None):
         # Load model (this may download weights the first time)
-        self.model = SentenceTransformer(model_name)
+        self.model_name = model_name
+        self.model = self._load_model(model_name)
+
+        # Content-hash embedding cache (EMBEDDING_CACHE_SIZE=0 disables it)
+        cache_size = cache_size if cache_size is not None else int(os.getenv("EMBEDDING_CACHE_SIZE", 10000))
+        self.cache = None
+        if cache_size > 0:
+            self.cache = EmbeddingCache(
+                model_name,
+                max_entries=cache_size,
+                disk_path=cache_dir or os.getenv("EMBEDDING_CACHE_DIR"),
+                dim=self.model.get_sentence_embedding_dimension(),
+                max_disk_entries=int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", 1000000)),
+            )
 
         # Neo4j connection (optional; only needed if you want to write embeddings to Neo4j)
         self.neo4j_uri = neo4j_uri or os.getenv("NEO4J_URI", "bolt://neo4j_db:7687")
         self.neo4j_user = neo4j_user or os.getenv("NEO4J_USER", "neo4j")
         self.neo4j_password = neo4j_password or os.getenv("NEO4J_PASSWORD", "securepassword")
-        self.driver = GraphDatabase.driver(self.neo4j_uri, auth=(self.neo4j_user, self.neo4j_password))
+        # Shared, process-wide driver; close() on it does not tear down the pool
+        self.driver = get_neo4j_driver(self.neo4j_uri, self.neo4j_user, self.neo4j_password)
+
+        # Similarity backend: "brute_force" scans Neo4j candidates, "ann" uses the in-process index,
+        # "neo4j" queries the native vector indexes (falls back to brute force if they are unavailable)
+        self.similarity_backend = similarity_backend or os.getenv("SIMILARITY_BACKEND", "brute_force")
+        if self.similarity_backend not in SIMILARITY_BACKENDS:
+            raise ValueError(f"Unknown similarity backend '{self.similarity_backend}'. Must be one of {list(SIMILARITY_BACKENDS)}")
+        # On-node embedding format: "list" (default), packed "float32" or quantized "int8"
+        self.storage_format = storage_format or os.getenv("EMBEDDING_STORAGE_FORMAT", "list")
+        if self.storage_format not in STORAGE_FORMATS:
+            raise ValueError(f"Unknown embedding storage format '{self.storage_format}'. Must be one of {list(STORAGE_FORMATS)}")
+        if self.similarity_backend == "neo4j" and self.storage_format != "list":
+            raise ValueError("similarity_backend 'neo4j' requires storage_format 'list' (vector indexes only cover float lists)")
+
+        self.vector_index = None
+        if self.similarity_backend == "ann":
+            self.vector_index = VectorIndex(
+                dim=self.model.get_sentence_embedding_dimension(),
+                path=vector_index_path or os.getenv("VECTOR_INDEX_PATH"),
+            )
+            self._vector_index_ready = self.vector_index.load()
+            # Other processes (e.g. scripts/batch_embed.py) write to Neo4j behind the
+            # index's back; with VECTOR_INDEX_MAX_AGE_SECONDS > 0 it is reloaded that often
+            self.vector_index_max_age = float(os.getenv("VECTOR_INDEX_MAX_AGE_SECONDS", 0))
+            self._vector_index_built_at = time.monotonic()
+            self._rebuild_lock = threading.Lock()
+        elif self.similarity_backend == "neo4j":
+            try:
+                self.ensure_neo4j_vector_indexes()
+            except Exception as e:
+                # Don't block startup; queries fall back to brute force until the indexes exist
+                print(f"[EMBEDDINGS] Could not create Neo4j vector indexes: {e}")
+
+        # Optional micro-batching of embed_text calls
+        if batching is None:
+            batching = os.getenv("EMBEDDING_BATCHING", "false").lower() in ("1", "true", "yes")
+        self.batcher = None
+        if batching:
+            self.batcher = EmbeddingBatcher(
+                self.embed_texts,
+                max_batch_size=batch_max_size or int(os.getenv("EMBEDDING_BATCH_MAX_SIZE", 64)),
+                max_wait_ms=batch_max_wait_ms if batch_max_wait_ms is not None else float(os.getenv("EMBEDDING_BATCH_MAX_WAIT_MS", 5)),
+            )
+
+    @staticmethod
+    def _load_model(model_name: str):
+        # With MODEL_WORKERS_EMBEDDING > 0 the model lives in worker processes
+        pool = get_model_pool("embedding", model_name)
+        return RemoteModel(pool) if pool is not None else SentenceTransformer(model_name)
+
+    def encode(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts into an (N, D) float32 matrix of L2-normalized rows.
+        Cached texts are served from the cache; only the misses hit the model.
+        Normalizing here, once at write time, lets similarity be a plain dot product.
+        """
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        if self.cache is None:
+            embs = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
+        else:
+            cached = self.cache.get_many(texts)
+            missing = [i for i, e in enumerate(cached) if e is None]
+            if missing:
+                missing_texts = [texts[i] for i in missing]
+                encoded = self._normalize_rows(
+                    self.model.encode(missing_texts, convert_to_numpy=True, show_progress_bar=False)
+                )
+                self.cache.put_many(missing_texts, encoded)
+                for i, emb in zip(missing, encoded):
+                    cached[i] = emb
+            embs = np.stack(cached)
+        return self._normalize_rows(embs)
+
+    @staticmethod
+    def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+        matrix = np.asarray(matrix, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
 
     def embed_texts(self, texts: List[str]) -> List[List[float]]:
         """
         Produce embeddings for a list of texts (returns list-of-lists of floats).
         """
-        embs = self.model.encode(texts, convert_to_numpy=True, show_progress_bar=False)
         # convert to python lists for storage in Neo4j
-        return [emb.tolist() for emb in embs]
+        return [emb.tolist() for emb in self.encode(texts)]
 
     def embed_text(self, text: str) -> List[float]:
+        # Single texts from concurrent requests are coalesced into one model call
+        if self.batcher is not None:
+            return self.batcher.embed(text)
         return self.embed_texts([text])[0]
 
+    def set_model(self, model_name: str) -> None:
+        """
+        Swap the embedding model; cached vectors of the old model are invalidated.
+        """
+        if model_name == self.model_name:
+            return
+        self.model = self._load_model(model_name)
+        self.model_name = model_name
+        if self.cache is not None:
+            self.cache.set_model(model_name, dim=self.model.get_sentence_embedding_dimension())
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "model_name": self.model_name,
+            "batching": self.batcher.stats() if self.batcher is not None else None,
+            "cache": self.cache.stats() if self.cache is not None else None,
+        }
+
     # ------------------------
     # Neo4j storage helpers
     # ------------------------
     def store_embedding_on_node(self, node_label: str, node_id: str, embedding: List[float]) -> None:
         """
-        Store an embedding list on a node in Neo4j as property `embedding`.
+        Store an embedding on a node in Neo4j as property `embedding`,
+        encoded according to `storage_format`.
         """
         query = f"""
         MATCH (n:{node_label} {{id: $node_id}})
@@ -48,17 +182,37 @@ class EmbeddingManager:
         RETURN n.id
         """
         with self.driver.session() as session:
-            session.run(query, node_id=node_id, embedding=embedding)
+            session.run(query, node_id=node_id, embedding=encode_embedding(embedding, self.storage_format))
+        if self.vector_index is not None:
+            self.vector_index.add(node_label, node_id, embedding)
 
-    def get_nodes_with_embeddings(self, memory_label: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
+    def store_embeddings_batch(self, node_label: str, node_ids: List[str], embeddings: List[List[float]]) -> None:
         """
-        Retrieve nodes (id, content, embedding) from Neo4j that have an embedding property.
-        Optionally filter by memory label.
+        Store many embeddings on `node_label` nodes with one UNWIND write.
         """
+        if not node_ids:
+            return
+        query = f"""
+        UNWIND $rows AS row
+        MATCH (n:{node_label} {{id: row.id}})
+        SET n.embedding = row.embedding
+        """
+        rows = [
+            {"id": node_id, "embedding": encode_embedding(emb, self.storage_format)}
+            for node_id, emb in zip(node_ids, embeddings)
+        ]
+        with self.driver.session() as session:
+            session.execute_write(lambda tx: tx.run(query, rows=rows).consume())
+        if self.vector_index is not None:
+            self.vector_index.add_batch(node_label, list(node_ids), np.asarray(embeddings, dtype=np.float32))
+
+    @staticmethod
+    def candidate_query(memory_label: str = None) -> str:
+        """Cypher for the brute-force candidates (takes $limit); shared with async callers."""
         if memory_label:
             query = f"""
             MATCH (n:{memory_label})
-            WHERE exists(n.embedding)
+            WHERE n.embedding IS NOT NULL
             RETURN n.id AS id, n.content AS content, n.embedding AS embedding
             ORDER BY n.timestamp DESC
             LIMIT $limit
@@ -66,60 +220,241 @@ class EmbeddingManager:
         else:
             query = """
             MATCH (n)
-            WHERE exists(n.embedding)
+            WHERE n.embedding IS NOT NULL
             RETURN labels(n)[0] AS label, n.id AS id, n.content AS content, n.embedding AS embedding
             ORDER BY n.timestamp DESC
             LIMIT $limit
             """
+        return query
+
+    def _fetch_embedding_rows(self, memory_label: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        with self.driver.session() as session:
+            result = session.run(self.candidate_query(memory_label), limit=limit)
+            return [dict(r) for r in result]
+
+    def get_nodes_with_embeddings(self, memory_label: str = None, limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        Retrieve nodes (id, content, embedding) from Neo4j that have an embedding property.
+        Optionally filter by memory label. Embeddings are decoded to float32 arrays,
+        whichever storage format (packed bytes or legacy list) they were written in.
+        """
+        rows = self._fetch_embedding_rows(memory_label, limit)
+        for row in rows:
+            # Packed float32 values decode zero-copy; legacy lists go straight to float32
+            row["embedding"] = decode_embedding(row["embedding"])
+        return rows
+
+    # ------------------------
+    # ANN index maintenance
+    # ------------------------
+    def rebuild_vector_index(self, memory_label: str = None, batch_size: int = 5000) -> int:
+        """
+        (Re)load every embedded node into the in-process ANN index, paging through
+        Neo4j by id so no node is left out. Returns the number of indexed nodes.
+        The nodes go into a fresh index that replaces the live one once complete,
+        so searches keep working (on the old contents) meanwhile, and nodes
+        deleted from Neo4j drop out.
+        """
+        if self.vector_index is None:
+            raise RuntimeError("rebuild_vector_index requires similarity_backend='ann'")
+        fresh = self.vector_index.begin_rebuild(memory_label)
+        try:
+            # One label at a time, so each page is a range scan on that label's id constraint
+            labels = [memory_label] if memory_label else list(VECTOR_INDEX_NAMES)
+            count = 0
+            with self.driver.session() as session:
+                for label in labels:
+                    count += self._load_label_into(session, fresh, label, batch_size)
+        except BaseException:
+            self.vector_index.abort_rebuild(fresh)
+            raise
+        self.vector_index.finish_rebuild(fresh, memory_label)
+        if memory_label is None:
+            self._vector_index_ready = True
+            self._vector_index_built_at = time.monotonic()
+        if self.vector_index.path:
+            self.vector_index.save()
+        return count
+
+    @staticmethod
+    def _load_label_into(session, index: VectorIndex, label: str, batch_size: int) -> int:
+        query = f"""
+        MATCH (n:{label})
+        WHERE n.id > $last_id AND n.embedding IS NOT NULL
+        RETURN n.id AS id, n.embedding AS embedding
+        ORDER BY n.id
+        LIMIT $batch_size
+        """
+        count = 0
+        last_id = ""
+        while True:
+            rows = list(session.run(query, last_id=last_id, batch_size=batch_size))
+            if not rows:
+                return count
+            index.add_batch(label, [r["id"] for r in rows], decode_embeddings([r["embedding"] for r in rows]))
+            count += len(rows)
+            last_id = rows[-1]["id"]
+
+    def _ensure_vector_index_fresh(self):
+        if not self._vector_index_ready:
+            # Nothing usable yet: every caller waits for the first build
+            with self._rebuild_lock:
+                if not self._vector_index_ready:
+                    self.rebuild_vector_index()
+            return
+        expired = (self.vector_index_max_age > 0
+                   and time.monotonic() - self._vector_index_built_at > self.vector_index_max_age)
+        # One caller refreshes a stale index; the rest keep searching the current one
+        if expired and self._rebuild_lock.acquire(blocking=False):
+            try:
+                self.rebuild_vector_index()
+            finally:
+                self._rebuild_lock.release()
+
+    def _find_top_k_ann(self, q_vec: np.ndarray, k: int, memory_label: str = None) -> List[Dict[str, Any]]:
+        self._ensure_vector_index_fresh()
+        hits = self.vector_index.search(q_vec, k=k, label=memory_label)
+        if not hits:
+            return []
+
+        # Fetch content for the k winners only, one labeled lookup per label
+        ids_by_label: Dict[str, List[str]] = {}
+        for h in hits:
+            ids_by_label.setdefault(h["label"], []).append(h["id"])
+        content = {}
+        with self.driver.session() as session:
+            for label, ids in ids_by_label.items():
+                result = session.run(
+                    f"MATCH (n:{label}) WHERE n.id IN $ids RETURN n.id AS id, n.content AS content",
+                    ids=ids,
+                )
+                for r in result:
+                    content[r["id"]] = r["content"]
+
+        out = []
+        for h in hits:
+            row = {"id": h["id"], "content": content.get(h["id"]), "score": h["score"]}
+            if not memory_label:
+                row["label"] = h["label"]
+            out.append(row)
+        return out
+
+    def save_vector_index(self) -> None:
+        if self.vector_index is not None and self.vector_index.path:
+            self.vector_index.save()
+
+    # ------------------------
+    # Native Neo4j vector indexes
+    # ------------------------
+    def ensure_neo4j_vector_indexes(self) -> None:
+        """
+        Create the per-label vector indexes if they don't already exist.
+        """
+        dimensions = int(self.model.get_sentence_embedding_dimension())
         with self.driver.session() as session:
-            result = session.run(query, limit=limit)
-            rows = []
-            for r in result:
-                row = dict(r)
-                # Ensure embedding is list of floats
-                if "embedding" in row and row["embedding"] is not None:
-                    # Neo4j driver returns a list-like object; keep as python list
-                    row["embedding"] = [float(x) for x in row["embedding"]]
-                rows.append(row)
-            return rows
+            for statement in vector_index_statements(dimensions):
+                session.run(statement)
+
+    def _find_top_k_neo4j(self, q_vec: np.ndarray, k: int, memory_label: str = None) -> List[Dict[str, Any]]:
+        """
+        Top-k via db.index.vector.queryNodes; only k rows per index cross the wire.
+        """
+        return query_vector_indexes(self.driver, q_vec, k, memory_label)
 
     # ------------------------
     # Similarity functions
     # ------------------------
     @staticmethod
-    def _cosine_sim_matrix(query_vec: np.ndarray, matrix: np.ndarray) -> np.ndarray:
+    def _top_k_indices(scores: np.ndarray, k: int) -> np.ndarray:
         """
-        Expect shape: query_vec (1, D), matrix (N, D) -> returns (N,)
+        Row-wise top-k column indices of a (Q, N) score matrix, best first.
+        argpartition keeps this O(N) per query instead of a full sort.
         """
-        # Use sklearn's pairwise cosine_similarity which handles norms
-        sims = cosine_similarity(query_vec, matrix)  # shape (1, N)
-        return sims.flatten()
+        n = scores.shape[1]
+        k = min(k, n)
+        if k <= 0:
+            return np.zeros((scores.shape[0], 0), dtype=np.int64)
+        if k < n:
+            part = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        else:
+            part = np.broadcast_to(np.arange(n), scores.shape)
+        order = np.argsort(-np.take_along_axis(scores, part, axis=1), axis=1)
+        return np.take_along_axis(part, order, axis=1)
 
-    def find_top_k_similar(self, query: str, k: int = 5, memory_label: str = None, candidate_limit: int = 1000) -> List[Dict[str, Any]]:
+    def _rank_candidates(self, q_matrix: np.ndarray, rows: List[Dict[str, Any]], k: int) -> List[List[Dict[str, Any]]]:
         """
-        1) embed the query
-        2) load candidate nodes with embeddings
-        3) compute cosine similarity and return top-k nodes
+        Score every query against every candidate with one float32 GEMM.
+        Candidates are re-normalized after decoding: legacy lists from models that
+        don't normalize, and int8-quantized vectors, aren't unit-norm on disk.
         """
-        # 1. embed query
-        q_vec = np.array(self.embed_text(query)).reshape(1, -1)  # shape (1, D)
+        emb_matrix = self._normalize_rows(decode_embeddings([r.pop("embedding") for r in rows]))  # shape (N, D)
+        sims = q_matrix @ emb_matrix.T  # shape (Q, N)
+        top = self._top_k_indices(sims, k)
+        return [
+            [dict(rows[j], score=float(sims[qi, j])) for j in top_row.tolist()]
+            for qi, top_row in enumerate(top)
+        ]
 
-        # 2. get candidates
-        candidates = self.get_nodes_with_embeddings(memory_label=memory_label, limit=candidate_limit)
-        if not candidates:
+    def find_top_k_similar_batch(self, queries: List[str], k: int = 5, memory_label: str = None,
+                                 candidate_limit: int = 1000) -> List[List[Dict[str, Any]]]:
+        """
+        Top-k similar nodes for many queries at once: the queries are embedded in one
+        model batch and, on the brute-force path, scored in a single matrix product.
+        Returns one result list per query, in input order.
+        """
+        if not queries:
             return []
+        # 1. embed queries (a single query goes through the micro-batcher, if enabled)
+        if len(queries) == 1:
+            q_matrix = np.asarray([self.embed_text(queries[0])])
+        else:
+            q_matrix = self.encode(queries)  # shape (Q, D)
+        return self.find_top_k_similar_embeddings(q_matrix, k=k, memory_label=memory_label,
+                                                  candidate_limit=candidate_limit)
 
-        emb_matrix = np.array([c["embedding"] for c in candidates])  # shape (N, D)
+    def find_top_k_similar_embeddings(self, q_matrix, k: int = 5, memory_label: str = None,
+                                      candidate_limit: int = 1000) -> List[List[Dict[str, Any]]]:
+        """
+        Same as find_top_k_similar_batch for query embeddings computed elsewhere
+        (e.g. awaited from the micro-batcher). Returns one result list per row.
+        """
+        q_matrix = self._normalize_rows(np.atleast_2d(np.asarray(q_matrix, dtype=np.float32)))
+
+        if self.similarity_backend == "ann":
+            return [self._find_top_k_ann(q_vec, k, memory_label) for q_vec in q_matrix]
+        if self.similarity_backend == "neo4j":
+            try:
+                return [self._find_top_k_neo4j(q_vec, k, memory_label) for q_vec in q_matrix]
+            except Neo4jError as e:
+                # e.g. Neo4j < 5.11 or indexes not created yet: use the Python path below
+                print(f"[EMBEDDINGS] Neo4j vector search unavailable, falling back to brute force: {e}")
+
+        # 2. get candidates
+        rows = self._fetch_embedding_rows(memory_label=memory_label, limit=candidate_limit)
+        if not rows:
+            return [[] for _ in q_matrix]
 
-        # 3. compute similarities
-        sims = self._cosine_sim_matrix(q_vec, emb_matrix)  # shape (N,)
-        # attach sims back to candidates
-        for i, c in enumerate(candidates):
-            c["score"] = float(sims[i])
+        # 3. score and select top-k
+        return self._rank_candidates(q_matrix, rows, k)
 
-        # 4. sort and return top-k
-        candidates.sort(key=lambda x: x["score"], reverse=True)
-        return candidates[:k]
+    def rank_candidates(self, q_matrix, rows: List[Dict[str, Any]], k: int = 5) -> List[List[Dict[str, Any]]]:
+        """
+        Brute-force scoring of candidate rows fetched elsewhere (e.g. with the async
+        driver via candidate_query()). Returns one result list per query row.
+        """
+        q_matrix = self._normalize_rows(np.atleast_2d(np.asarray(q_matrix, dtype=np.float32)))
+        if not rows:
+            return [[] for _ in q_matrix]
+        return self._rank_candidates(q_matrix, rows, k)
+
+    def find_top_k_similar(self, query: str, k: int = 5, memory_label: str = None, candidate_limit: int = 1000) -> List[Dict[str, Any]]:
+        """
+        1) embed the query
+        2) load candidate nodes with embeddings
+        3) compute cosine similarity and return top-k nodes
+        """
+        return self.find_top_k_similar_batch([query], k=k, memory_label=memory_label,
+                                             candidate_limit=candidate_limit)[0]
 
     # ------------------------
     # Convenience: embed & store node content
@@ -129,4 +464,9 @@ class EmbeddingManager:
         self.store_embedding_on_node(node_label, node_id, emb)
 
     def close(self):
+        if self.batcher is not None:
+            self.batcher.close()
+        if self.cache is not None:
+            self.cache.close()
+        self.save_vector_index()
         self.driver.close()
@@ -0,0 +1,62 @@
+# neo4j_vector_search.py
+# Native Neo4j (5.11+) vector indexes over the `embedding` property of each
+# memory label: the one place that names them (db/init_neo4j.cql creates the
+# same indexes for fresh databases), the statements that create them, and
+# the top-k query run against them.
+
+from typing import Any, Dict, List
+
+# Vector index per memory label
+VECTOR_INDEX_NAMES = {
+    "WorkingMemory": "wm_embedding_index",
+    "LongTermMemory": "ltm_embedding_index",
+    "EpisodicMemory": "em_embedding_index",
+    "SemanticMemory": "sm_embedding_index",
+    "ProceduralMemory": "pm_embedding_index"
+}
+
+VECTOR_QUERY = """
+CALL db.index.vector.queryNodes($index_name, $k, $embedding)
+YIELD node, score
+RETURN node.id AS id, node.content AS content, score
+"""
+
+
+def vector_index_statements(dimensions: int) -> List[str]:
+    """CREATE VECTOR INDEX ... IF NOT EXISTS for every memory label."""
+    return [
+        f"""
+        CREATE VECTOR INDEX {index_name} IF NOT EXISTS
+        FOR (n:{label})
+        ON (n.embedding)
+        OPTIONS {{indexConfig: {{
+            `vector.dimensions`: {int(dimensions)},
+            `vector.similarity_function`: 'cosine'
+        }}}}
+        """
+        for label, index_name in VECTOR_INDEX_NAMES.items()
+    ]
+
+
+def query_vector_indexes(driver, embedding, k: int, memory_label: str = None) -> List[Dict[str, Any]]:
+    """
+    Top-k via db.index.vector.queryNodes, across all memory labels unless
+    `memory_label` is given; only k rows per index cross the wire.
+    Hits from several labels carry a "label" key.
+    """
+    labels = [memory_label] if memory_label else list(VECTOR_INDEX_NAMES)
+    embedding = [float(x) for x in embedding]
+    hits = []
+    with driver.session() as session:
+        for label in labels:
+            index_name = VECTOR_INDEX_NAMES.get(label)
+            if index_name is None:
+                raise ValueError(f"No vector index configured for label '{label}'")
+            for r in session.run(VECTOR_QUERY, index_name=index_name, k=k, embedding=embedding):
+                # Neo4j reports cosine similarity rescaled to [0, 1]; map back to [-1, 1]
+                row = {"id": r["id"], "content": r["content"], "score": 2.0 * float(r["score"]) - 1.0}
+                if not memory_label:
+                    row["label"] = label
+                hits.append(row)
+    hits.sort(key=lambda x: x["score"], reverse=True)
+    return hits[:k]
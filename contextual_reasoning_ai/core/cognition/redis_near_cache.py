@@ -0,0 +1,194 @@
+# redis_near_cache.py
+# In-process cache of decoded Redis values, kept coherent with Redis.
+# Reads that hit the cache skip both the network round trip and the decode.
+#
+# Coherence: when the server has keyspace notifications enabled (or we are
+# allowed to enable them), a background thread subscribes to
+# __keyspace@<db>__:<prefix>* and evicts a key as soon as anyone changes it;
+# entries then only expire after a long safety TTL. Without notifications
+# (or while the subscription is down) entries expire after a short TTL.
+# Writes made through this process invalidate locally right away. Events
+# that only touch a key's TTL (EXPIRE/PERSIST) leave the value alone and
+# are ignored, so sliding a TTL never evicts what was just cached.
+#
+# Cached objects are shared between callers: treat them as read-only.
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict
+
+# Keyspace events needed: K = keyspace channel, g = DEL/EXPIRE..., h = hash,
+# $ = string, x = expired, e = evicted
+_REQUIRED_EVENTS = "Kg$hxe"
+# Generic-class events that don't change the value ("expired" does: the key is gone)
+_TTL_ONLY_EVENTS = {"expire", "persist"}
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class NearCache:
+    def __init__(self,
+                 redis_client,
+                 key_prefix: str = "wm:",
+                 fallback_ttl: float = 1.0,
+                 notify_ttl: float = 300.0,
+                 max_entries: int = 10000,
+                 use_notifications: bool = True,
+                 configure_notifications: bool = False):
+        self.redis_client = redis_client
+        self.key_prefix = key_prefix
+        self.fallback_ttl = fallback_ttl
+        self.notify_ttl = notify_ttl
+        self.max_entries = max_entries
+        self.configure_notifications = configure_notifications
+
+        self._entries = OrderedDict()  # key -> (value, fetched_at)
+        self._versions = {}            # key -> bumped on every invalidation
+        self._lock = threading.Lock()
+        self._live = threading.Event()  # set while keyspace notifications are flowing
+        self._stop = threading.Event()
+
+        # Metrics
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+        self._expirations = 0
+        self._hit_age_total = 0.0
+        self._hit_age_max = 0.0
+
+        self._listener = None
+        if use_notifications:
+            self._listener = threading.Thread(target=self._listen, name="redis-near-cache", daemon=True)
+            self._listener.start()
+
+    # ------------------------
+    # Reads & invalidation
+    # ------------------------
+    def get(self, key: str, loader: Callable[[], Any], on_hit: Callable[[str], Any] = None) -> Any:
+        """
+        Return the cached value for `key`, calling `loader()` on a miss.
+        `on_hit(key)` runs after a hit, outside the lock (e.g. to slide a TTL).
+        """
+        now = time.monotonic()
+        ttl = self.notify_ttl if self._live.is_set() else self.fallback_ttl
+        hit = False
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                value, fetched_at = entry
+                age = now - fetched_at
+                if age < ttl:
+                    self._entries.move_to_end(key)
+                    self._hits += 1
+                    self._hit_age_total += age
+                    self._hit_age_max = max(self._hit_age_max, age)
+                    hit = True
+                else:
+                    del self._entries[key]
+                    self._expirations += 1
+            if not hit:
+                self._misses += 1
+                version = self._versions.get(key, 0)
+
+        if hit:
+            if on_hit is not None:
+                on_hit(key)
+            return value
+
+        value = loader()
+
+        with self._lock:
+            # An invalidation that raced with the load means `value` may already be stale
+            if self._versions.get(key, 0) == version:
+                self._entries[key] = (value, time.monotonic())
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        return value
+
+    def invalidate(self, key: str):
+        with self._lock:
+            self._versions[key] = self._versions.get(key, 0) + 1
+            if self._entries.pop(key, None) is not None:
+                self._invalidations += 1
+            if len(self._versions) > 4 * self.max_entries:
+                # Versions only matter for loads in flight; old counters can go
+                self._versions = {k: v for k, v in self._versions.items() if k in self._entries}
+
+    def clear(self):
+        with self._lock:
+            for key in self._entries:
+                self._versions[key] = self._versions.get(key, 0) + 1
+            self._entries.clear()
+
+    # ------------------------
+    # Keyspace notifications
+    # ------------------------
+    def _notifications_enabled(self) -> bool:
+        try:
+            flags = _text(self.redis_client.config_get("notify-keyspace-events").get("notify-keyspace-events", ""))
+            if "K" in flags and ("A" in flags or all(f in flags for f in "g$hx")):
+                return True
+            if self.configure_notifications:
+                self.redis_client.config_set("notify-keyspace-events", _REQUIRED_EVENTS)
+                return True
+        except Exception as e:
+            # e.g. CONFIG is disabled on managed Redis
+            print(f"[NEAR CACHE] Keyspace notifications unavailable ({e}); using {self.fallback_ttl}s TTL.")
+        return False
+
+    def _listen(self):
+        if not self._notifications_enabled():
+            return
+        db = self.redis_client.connection_pool.connection_kwargs.get("db", 0)
+        channel_prefix = f"__keyspace@{db}__:"
+        backoff = 1.0
+        while not self._stop.is_set():
+            pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            try:
+                pubsub.psubscribe(f"{channel_prefix}{self.key_prefix}*")
+                # Anything cached before the subscription went live may have missed events
+                self.clear()
+                self._live.set()
+                backoff = 1.0
+                while not self._stop.is_set():
+                    message = pubsub.get_message(timeout=1.0)
+                    if message and message.get("type") == "pmessage" and _text(message.get("data")) not in _TTL_ONLY_EVENTS:
+                        self.invalidate(_text(message["channel"])[len(channel_prefix):])
+            except Exception as e:
+                print(f"[NEAR CACHE] Notification stream lost ({e}); falling back to TTL until reconnected.")
+            finally:
+                self._live.clear()
+                try:
+                    pubsub.close()
+                except Exception:
+                    pass
+            self._stop.wait(backoff)
+            backoff = min(backoff * 2, 30.0)
+
+    # ------------------------
+    # Metrics & lifecycle
+    # ------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "mode": "notifications" if self._live.is_set() else "ttl",
+                "entries": len(self._entries),
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": self._hits / lookups if lookups else 0.0,
+                "invalidations": self._invalidations,
+                "expirations": self._expirations,
+                # Staleness bound: how old served entries were when they were returned
+                "avg_hit_age_ms": 1000.0 * self._hit_age_total / self._hits if self._hits else 0.0,
+                "max_hit_age_ms": 1000.0 * self._hit_age_max,
+            }
+
+    def close(self):
+        self._stop.set()
+        if self._listener is not None:
+            self._listener.join(timeout=2.0)
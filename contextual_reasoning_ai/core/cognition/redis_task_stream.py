@@ -0,0 +1,124 @@
+# redis_task_stream.py
+# Working-memory task queue on a Redis Stream with a consumer group.
+# Many workers can read from the same group; each task is delivered to one
+# of them and stays in the group's pending list until it is acked, so a task
+# held by a crashed worker can be reclaimed by another one (XAUTOCLAIM).
+# The stream is trimmed to roughly `maxlen` entries on every add.
+
+import json
+import os
+import socket
+from typing import Any, Dict, List, Optional, Tuple
+
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+
+class RedisTaskStream:
+    def __init__(self,
+                 redis_client,
+                 stream: str = "wm:tasks:stream",
+                 group: str = "wm-workers",
+                 consumer: str = None,
+                 maxlen: int = None):
+        self.redis_client = redis_client
+        self.stream = stream
+        self.group = group
+        self.consumer = consumer or f"{socket.gethostname()}-{os.getpid()}"
+        self.maxlen = maxlen if maxlen is not None else int(os.getenv("WM_TASK_STREAM_MAXLEN", 100000))
+        self._group_ready = False
+
+    # ------------------------
+    # Setup
+    # ------------------------
+    def ensure_group(self):
+        """Create the consumer group (and the stream) if they don't exist yet."""
+        if self._group_ready:
+            return
+        try:
+            self.redis_client.xgroup_create(self.stream, self.group, id="0", mkstream=True)
+        except Exception as e:
+            # BUSYGROUP: another worker already created it
+            if "BUSYGROUP" not in str(e):
+                raise
+        self._group_ready = True
+
+    # ------------------------
+    # Producers
+    # ------------------------
+    def add(self, task: Dict[str, Any]) -> str:
+        """Append a task; returns its stream id."""
+        return _text(self.redis_client.xadd(self.stream, {"task": json.dumps(task)}, maxlen=self.maxlen, approximate=True))
+
+    def add_many(self, tasks: List[Dict[str, Any]]) -> List[str]:
+        """Append several tasks in one round trip."""
+        pipe = self.redis_client.pipeline(transaction=False)
+        for task in tasks:
+            pipe.xadd(self.stream, {"task": json.dumps(task)}, maxlen=self.maxlen, approximate=True)
+        return [_text(task_id) for task_id in pipe.execute()]
+
+    # ------------------------
+    # Consumers
+    # ------------------------
+    @staticmethod
+    def _decode_entries(entries) -> List[Tuple[str, Dict[str, Any]]]:
+        tasks = []
+        for task_id, fields in entries or []:
+            if fields is None:
+                continue  # entry trimmed away while pending
+            fields = {_text(k): v for k, v in fields.items()}
+            tasks.append((_text(task_id), json.loads(_text(fields["task"]))))
+        return tasks
+
+    def read(self, count: int = 1, block_ms: Optional[int] = None) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Claim up to `count` new tasks for this consumer, waiting up to
+        `block_ms` for one to arrive (None = don't block). Returns (id, task)
+        pairs; ack them once they are done.
+        """
+        self.ensure_group()
+        response = self.redis_client.xreadgroup(self.group, self.consumer, {self.stream: ">"}, count=count, block=block_ms)
+        tasks = []
+        for _, entries in response or []:
+            tasks.extend(self._decode_entries(entries))
+        return tasks
+
+    def ack(self, *task_ids: str) -> int:
+        if not task_ids:
+            return 0
+        return self.redis_client.xack(self.stream, self.group, *task_ids)
+
+    def reclaim(self, min_idle_ms: int = 60000, count: int = 10) -> List[Tuple[str, Dict[str, Any]]]:
+        """Take over tasks other consumers have held unacked for at least `min_idle_ms`."""
+        self.ensure_group()
+        response = self.redis_client.xautoclaim(self.stream, self.group, self.consumer, min_idle_ms, start_id="0-0", count=count)
+        # Redis 6.2 returns [next_id, entries]; 7.0+ appends the deleted ids
+        return self._decode_entries(response[1])
+
+    # ------------------------
+    # Inspection & cleanup
+    # ------------------------
+    def pending(self) -> Dict[str, Any]:
+        """Summary of delivered-but-unacked tasks (count, id range, per consumer)."""
+        self.ensure_group()
+        return self.redis_client.xpending(self.stream, self.group)
+
+    def peek(self, count: int = 100) -> List[Dict[str, Any]]:
+        """Up to `count` tasks not yet delivered to any consumer, oldest first."""
+        self.ensure_group()
+        last_delivered = "0-0"
+        for info in self.redis_client.xinfo_groups(self.stream):
+            info = {_text(k): v for k, v in info.items()}
+            if _text(info["name"]) == self.group:
+                last_delivered = _text(info["last-delivered-id"])
+        entries = self.redis_client.xrange(self.stream, min=f"({last_delivered}", max="+", count=count)
+        return [task for _, task in self._decode_entries(entries)]
+
+    def length(self) -> int:
+        return self.redis_client.xlen(self.stream)
+
+    def clear(self):
+        """Delete the stream and its consumer group."""
+        self.redis_client.delete(self.stream)
+        self._group_ready = False
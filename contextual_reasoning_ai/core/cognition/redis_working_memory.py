@@ -1,87 +1,359 @@
 import os
 import json
+import time
 import redis
 from datetime import datetime
+from .redis_task_stream import RedisTaskStream
+from .redis_near_cache import NearCache
+from .wm_codecs import CODECS, encode_value, decode_value
+
+
+SESSION_FIELDS = ("context", "perception", "decision")
+
+# Per-session keys used before sessions moved into one hash (no TTL on them)
+LEGACY_SESSION_KEYS = {
+    "perception": "wm:perceptions:{session_id}",
+    "decision": "wm:decisions:{session_id}",
+}
 
 
 class RedisWorkingMemory:
     """
     Redis-backed Working Memory for Contextual Cognitive Reasoning AI.
     Handles short-term, real-time state management.
+
+    Per-session state lives in one hash, wm:session:{session_id}, with
+    context / perception / decision fields and a sliding TTL
+    (WM_SESSION_TTL seconds, default 3600) refreshed on every access.
+    The first access to a session moves any legacy wm:perceptions:* /
+    wm:decisions:* keys into its hash; migrate_legacy_sessions() does it
+    for every session at once.
+
+    Tasks sit in the wm:tasks LPUSH/RPOP list by default;
+    WM_TASK_BACKEND=stream moves them to a Redis Stream consumer group
+    (see RedisTaskStream), first draining anything left in the old list.
+
+    WM_NEAR_CACHE=true keeps decoded context / session reads in-process
+    (see NearCache); values returned from the cache must not be mutated.
+
+    Values are encoded with WM_CODEC ("json" by default, or "msgpack");
+    numpy arrays / tensors are stored as raw bytes. Legacy JSON stays readable.
     """
 
-    def __init__(self):
+    def __init__(self, session_ttl: int = None, redis_client=None, task_backend: str = None, consumer: str = None,
+                 near_cache: bool = None, codec: str = None):
         # Connect to Redis using environment variables
-        self.redis_client = redis.StrictRedis(
+        self.redis_client = redis_client or redis.StrictRedis(
             host=os.getenv("REDIS_HOST", "localhost"),
             port=int(os.getenv("REDIS_PORT", 6379)),
-            decode_responses=True
+            # Replies stay bytes: binary codecs decode them without a UTF-8 pass
+            decode_responses=False
         )
+        self.codec = codec or os.getenv("WM_CODEC", "json")
+        if self.codec not in CODECS:
+            raise ValueError(f"Unknown working-memory codec '{self.codec}'. Must be one of {list(CODECS)}")
+        self.session_ttl = session_ttl if session_ttl is not None else int(os.getenv("WM_SESSION_TTL", 3600))
+
+        self.task_backend = task_backend or os.getenv("WM_TASK_BACKEND", "list")
+        if self.task_backend not in ("stream", "list"):
+            raise ValueError(f"Unknown task backend '{self.task_backend}'. Must be 'stream' or 'list'")
+        self.task_stream = RedisTaskStream(self.redis_client, consumer=consumer) if self.task_backend == "stream" else None
+        self._list_drained = False
+
+        # Opt-in client-side cache for the read-heavy decision loop
+        if near_cache is None:
+            near_cache = os.getenv("WM_NEAR_CACHE", "false").lower() in ("1", "true", "yes")
+        self.near_cache = None
+        self._ttl_refreshed = {}  # session key -> when its TTL was last slid
+        self._legacy_checked = set()  # sessions with no legacy keys left
+        if near_cache:
+            self.near_cache = NearCache(
+                self.redis_client,
+                fallback_ttl=float(os.getenv("WM_NEAR_CACHE_TTL", 1.0)),
+                configure_notifications=os.getenv("WM_NEAR_CACHE_CONFIGURE", "false").lower() in ("1", "true", "yes"),
+            )
+
+    def _cached(self, key: str, loader, on_hit=None):
+        return self.near_cache.get(key, loader, on_hit) if self.near_cache else loader()
+
+    def _invalidate(self, key: str):
+        if self.near_cache:
+            self.near_cache.invalidate(key)
+
+    def cache_stats(self) -> dict:
+        return self.near_cache.stats() if self.near_cache else None
+
+    def close(self):
+        if self.near_cache:
+            self.near_cache.close()
+
+    # -------------------------
+    # Session State
+    # -------------------------
+    @staticmethod
+    def _session_key(session_id: str) -> str:
+        return f"wm:session:{session_id}"
+
+    def _queue_legacy_check(self, pipe, session_id: str) -> bool:
+        """Add GETs for the session's legacy keys to `pipe`, unless already checked."""
+        if session_id in self._legacy_checked:
+            return False
+        for template in LEGACY_SESSION_KEYS.values():
+            pipe.get(template.format(session_id=session_id))
+        return True
+
+    def _migrate_legacy(self, session_id: str, values) -> bool:
+        """
+        Move legacy values (the results of _queue_legacy_check's GETs) into the
+        session hash without overwriting newer fields, then delete the old keys.
+        Returns True when anything was moved.
+        """
+        if len(self._legacy_checked) > 10000:
+            self._legacy_checked.clear()
+        self._legacy_checked.add(session_id)
+        found = {field: value for field, value in zip(LEGACY_SESSION_KEYS, values) if value is not None}
+        if not found:
+            return False
+        key = self._session_key(session_id)
+        pipe = self.redis_client.pipeline(transaction=True)
+        for field, value in found.items():
+            pipe.hsetnx(key, field, value)
+        pipe.expire(key, self.session_ttl)
+        pipe.delete(*(LEGACY_SESSION_KEYS[field].format(session_id=session_id) for field in found))
+        pipe.execute()
+        self._invalidate(key)
+        return True
+
+    def migrate_legacy_sessions(self, batch_size: int = 500) -> int:
+        """
+        One-off upgrade: move every legacy wm:perceptions:* / wm:decisions:* key
+        into its session hash. Returns the number of sessions migrated.
+        """
+        session_ids = set()
+        for template in LEGACY_SESSION_KEYS.values():
+            prefix = template.format(session_id="")
+            for key in self.redis_client.scan_iter(match=prefix + "*", count=batch_size):
+                key = key.decode() if isinstance(key, bytes) else key
+                session_ids.add(key[len(prefix):])
+        migrated = 0
+        for session_id in session_ids:
+            self._legacy_checked.discard(session_id)
+            pipe = self.redis_client.pipeline(transaction=False)
+            self._queue_legacy_check(pipe, session_id)
+            if self._migrate_legacy(session_id, pipe.execute()):
+                migrated += 1
+        if migrated:
+            print(f"[WORKING MEMORY] Migrated {migrated} legacy sessions into session hashes.")
+        return migrated
+
+    def update_session(self, session_id: str, **fields):
+        """
+        Write any of context / perception / decision for a session and
+        refresh its TTL, all in one round trip.
+        """
+        unknown = set(fields) - set(SESSION_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown session fields {sorted(unknown)}. Must be among {list(SESSION_FIELDS)}")
+        key = self._session_key(session_id)
+        mapping = {name: encode_value(value, self.codec) for name, value in fields.items() if value is not None}
+        mapping["updated_at"] = datetime.utcnow().isoformat()
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hset(key, mapping=mapping)
+        pipe.expire(key, self.session_ttl)
+        check_legacy = self._queue_legacy_check(pipe, session_id)
+        replies = pipe.execute()
+        if check_legacy:
+            # Fields just written win; only the missing ones are filled from legacy keys
+            self._migrate_legacy(session_id, replies[2:])
+        self._invalidate(key)
+        if self.near_cache:
+            self._ttl_refreshed[key] = time.monotonic()
+
+    def get_session(self, session_id: str) -> dict:
+        """Fetch all state for a session with a single HGETALL (and slide its TTL)."""
+        return self._cached(self._session_key(session_id), lambda: self._fetch_session(session_id), self._slide_ttl)
+
+    def _slide_ttl(self, key: str):
+        # Near-cache hits skip Redis, so refresh the TTL at most every tenth of it
+        now = time.monotonic()
+        if now - self._ttl_refreshed.get(key, 0.0) < self.session_ttl / 10:
+            return
+        self.redis_client.expire(key, self.session_ttl)
+        self._ttl_refreshed[key] = now
+        if len(self._ttl_refreshed) > 10000:
+            self._ttl_refreshed = {k: t for k, t in self._ttl_refreshed.items() if now - t < self.session_ttl}
+
+    def _fetch_session(self, session_id: str) -> dict:
+        key = self._session_key(session_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hgetall(key)
+        pipe.expire(key, self.session_ttl)
+        check_legacy = self._queue_legacy_check(pipe, session_id)
+        replies = pipe.execute()
+        if check_legacy and self._migrate_legacy(session_id, replies[2:]):
+            return self._fetch_session(session_id)
+        data = replies[0]
+        if self.near_cache:
+            self._ttl_refreshed[key] = time.monotonic()
+        session = {}
+        for name, value in (data or {}).items():
+            name = name.decode() if isinstance(name, bytes) else name
+            if name in SESSION_FIELDS:
+                session[name] = decode_value(value)
+            else:
+                session[name] = value.decode() if isinstance(value, bytes) else value
+        return session
+
+    def _get_session_field(self, session_id: str, field: str) -> dict:
+        if self.near_cache:
+            # One cached HGETALL serves context, perception and decision alike
+            return self.get_session(session_id).get(field) or {}
+        key = self._session_key(session_id)
+        pipe = self.redis_client.pipeline(transaction=False)
+        pipe.hget(key, field)
+        pipe.expire(key, self.session_ttl)
+        check_legacy = self._queue_legacy_check(pipe, session_id)
+        replies = pipe.execute()
+        if check_legacy and self._migrate_legacy(session_id, replies[2:]):
+            return self._get_session_field(session_id, field)
+        data = replies[0]
+        return decode_value(data) if data else {}
+
+    def clear_session(self, session_id: str):
+        """Drop all state for a session."""
+        self.redis_client.delete(self._session_key(session_id))
+        self._invalidate(self._session_key(session_id))
+        self._ttl_refreshed.pop(self._session_key(session_id), None)
 
     # -------------------------
     # Core Context Operations
     # -------------------------
-    def set_context(self, context: dict):
-        """Store the current reasoning context as a JSON blob."""
-        self.redis_client.set("wm:context", json.dumps(context))
+    def set_context(self, context: dict, session_id: str = None):
+        """Store the reasoning context (global, or scoped to a session) as a JSON blob."""
+        if session_id is not None:
+            self.update_session(session_id, context=context)
+            return
+        self.redis_client.set("wm:context", encode_value(context, self.codec))
+        self._invalidate("wm:context")
+
+    def get_context(self, session_id: str = None) -> dict:
+        """Retrieve the reasoning context (global, or for a session)."""
+        if session_id is not None:
+            return self._get_session_field(session_id, "context")
+        return self._cached("wm:context", self._fetch_context)
 
-    def get_context(self) -> dict:
-        """Retrieve the current reasoning context."""
+    def _fetch_context(self) -> dict:
         data = self.redis_client.get("wm:context")
-        return json.loads(data) if data else {}
+        return decode_value(data) if data else {}
 
-    def clear_context(self):
-        """Clear the current working context."""
+    def clear_context(self, session_id: str = None):
+        """Clear the working context (global, or for a session)."""
+        if session_id is not None:
+            self.redis_client.hdel(self._session_key(session_id), "context")
+            self._invalidate(self._session_key(session_id))
+            return
         self.redis_client.delete("wm:context")
+        self._invalidate("wm:context")
 
     # -------------------------
     # Task Management
     # -------------------------
     def add_task(self, task: dict):
         """Add a task to the working memory task queue."""
+        stream = self._stream()
+        if stream:
+            return stream.add(task)
         self.redis_client.lpush("wm:tasks", json.dumps(task))
 
-    def get_next_task(self) -> dict:
-        """Pop the next task from the queue."""
+    def get_next_task(self, block_ms: int = None) -> dict:
+        """
+        Pop the next task from the queue. The task is acked straight away;
+        use claim_tasks / ack_tasks when a crash mid-task must not lose it.
+        """
+        stream = self._stream()
+        if stream:
+            claimed = stream.read(count=1, block_ms=block_ms)
+            if not claimed:
+                return None
+            task_id, task = claimed[0]
+            stream.ack(task_id)
+            return task
         task = self.redis_client.rpop("wm:tasks")
         return json.loads(task) if task else None
 
-    def get_all_tasks(self) -> list:
-        """Get all tasks without removing them."""
-        tasks = self.redis_client.lrange("wm:tasks", 0, -1)
+    def claim_tasks(self, count: int = 10, block_ms: int = None) -> list:
+        """Claim up to `count` tasks as (task_id, task) pairs; ack each when done."""
+        return self._require_stream().read(count=count, block_ms=block_ms)
+
+    def ack_tasks(self, *task_ids: str) -> int:
+        """Mark claimed tasks as done."""
+        return self._require_stream().ack(*task_ids)
+
+    def reclaim_stale_tasks(self, min_idle_ms: int = 60000, count: int = 10) -> list:
+        """Take over tasks another worker claimed but never acked (e.g. it crashed)."""
+        return self._require_stream().reclaim(min_idle_ms=min_idle_ms, count=count)
+
+    def get_all_tasks(self, limit: int = None) -> list:
+        """
+        Get waiting tasks without removing them: all of them for the list
+        backend, at most `limit` (default 100) for the stream.
+        """
+        stream = self._stream()
+        if stream:
+            return stream.peek(count=limit or 100)
+        tasks = self.redis_client.lrange("wm:tasks", 0, limit - 1 if limit else -1)
         return [json.loads(t) for t in tasks]
 
     def clear_tasks(self):
         """Clear all tasks."""
+        stream = self._stream()
+        if stream:
+            stream.clear()
+            return
         self.redis_client.delete("wm:tasks")
 
+    def _require_stream(self) -> RedisTaskStream:
+        if not self.task_stream:
+            raise RuntimeError("Task claiming needs WM_TASK_BACKEND=stream")
+        return self._stream()
+
+    def _stream(self) -> RedisTaskStream:
+        """The task stream (None for the list backend), after draining the old list into it once."""
+        if self.task_stream and not self._list_drained:
+            moved = 0
+            # Oldest first, so the stream keeps the list's order
+            while True:
+                task = self.redis_client.rpop("wm:tasks")
+                if task is None:
+                    break
+                self.task_stream.add(json.loads(task))
+                moved += 1
+            if moved:
+                print(f"[WORKING MEMORY] Moved {moved} queued tasks from wm:tasks to the task stream.")
+            self._list_drained = True
+        return self.task_stream
+
     # -------------------------
     # Perception Handling
     # -------------------------
     def store_perception(self, session_id: str, perception: dict):
         """Store latest perception data for a session."""
-        key = f"wm:perceptions:{session_id}"
-        self.redis_client.set(key, json.dumps(perception))
+        self.update_session(session_id, perception=perception)
 
     def get_perception(self, session_id: str) -> dict:
         """Retrieve perception data for a session."""
-        key = f"wm:perceptions:{session_id}"
-        data = self.redis_client.get(key)
-        return json.loads(data) if data else {}
+        return self._get_session_field(session_id, "perception")
 
     # -------------------------
     # Decision Outputs
     # -------------------------
     def store_decision(self, session_id: str, decision: dict):
         """Store a decision generated by the cognitive engine."""
-        key = f"wm:decisions:{session_id}"
-        self.redis_client.set(key, json.dumps(decision))
+        self.update_session(session_id, decision=decision)
 
     def get_decision(self, session_id: str) -> dict:
         """Retrieve the last decision for a session."""
-        key = f"wm:decisions:{session_id}"
-        data = self.redis_client.get(key)
-        return json.loads(data) if data else {}
+        return self._get_session_field(session_id, "decision")
 
     # -------------------------
     # Heartbeat
@@ -94,7 +366,8 @@ class RedisWorkingMemory:
 
     def get_heartbeat(self) -> str:
         """Get the last heartbeat timestamp."""
-        return self.redis_client.get("wm:heartbeat")
+        timestamp = self.redis_client.get("wm:heartbeat")
+        return timestamp.decode() if isinstance(timestamp, bytes) else timestamp
 
     # -------------------------
     # Debugging Helpers
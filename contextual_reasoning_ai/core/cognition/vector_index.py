@@ -0,0 +1,419 @@
+# vector_index.py
+# In-process approximate nearest-neighbour index over memory-node embeddings.
+# Uses hnswlib (HNSW) when it is installed, otherwise a pure NumPy IVF index.
+# Vectors are partitioned by memory label so label filtering never scans
+# other labels.
+
+import json
+import os
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import hnswlib
+except ImportError:  # optional dependency
+    hnswlib = None
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    vectors = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(vectors, axis=-1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def _top_k(scores: np.ndarray, k: int) -> np.ndarray:
+    """Indices of the k largest scores, best first."""
+    if k >= len(scores):
+        return np.argsort(-scores)
+    part = np.argpartition(-scores, k)[:k]
+    return part[np.argsort(-scores[part])]
+
+
+class IVFLabelIndex:
+    """
+    Inverted-file index for a single label (pure NumPy).
+    Below `min_train_size` vectors the index is searched exhaustively;
+    above it, vectors are clustered with spherical k-means and a query
+    only scans the `nprobe` closest clusters.
+    """
+
+    def __init__(self, dim: int, nprobe: int = 8, min_train_size: int = 4096):
+        self.dim = dim
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self._vectors = np.zeros((0, dim), dtype=np.float32)
+        self._size = 0
+        self._ids: List[Optional[str]] = []
+        self._row_of: Dict[str, int] = {}
+        self._centroids: Optional[np.ndarray] = None
+        self._lists: List[List[int]] = []
+        self._cluster_of: Dict[int, int] = {}
+        self._trained_size = 0
+
+    def __len__(self):
+        return len(self._row_of)
+
+    def _grow(self, needed: int):
+        capacity = self._vectors.shape[0]
+        if needed <= capacity:
+            return
+        new_capacity = max(needed, capacity * 2, 1024)
+        grown = np.zeros((new_capacity, self.dim), dtype=np.float32)
+        grown[:self._size] = self._vectors[:self._size]
+        self._vectors = grown
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        vectors = _normalize(vectors).reshape(-1, self.dim)
+        new_rows = []
+        for node_id, vec in zip(ids, vectors):
+            row = self._row_of.get(node_id)
+            if row is not None:
+                # Overwrite in place; the cluster assignment is refreshed below
+                self._vectors[row] = vec
+                self._remove_from_lists(row)
+            else:
+                self._grow(self._size + 1)
+                row = self._size
+                self._size += 1
+                self._vectors[row] = vec
+                self._ids.append(node_id)
+                self._row_of[node_id] = row
+            new_rows.append(row)
+
+        # Train once the threshold is crossed, then again each time the index
+        # has grown 4x; below the threshold searches stay exhaustive
+        if self._centroids is None:
+            if len(self) >= self.min_train_size:
+                self._train()
+        elif len(self) >= 4 * max(self._trained_size, 1):
+            self._train()
+        else:
+            self._assign(np.array(new_rows, dtype=np.int64))
+
+    def remove(self, node_id: str):
+        row = self._row_of.pop(node_id, None)
+        if row is None:
+            return
+        self._ids[row] = None
+        self._remove_from_lists(row)
+
+    def _remove_from_lists(self, row: int):
+        cluster = self._cluster_of.pop(row, None)
+        if cluster is not None:
+            self._lists[cluster].remove(row)
+
+    def _live_rows(self) -> np.ndarray:
+        return np.fromiter(self._row_of.values(), dtype=np.int64, count=len(self._row_of))
+
+    def _train(self, iterations: int = 10):
+        rows = self._live_rows()
+        if len(rows) < self.min_train_size:
+            self._centroids = None
+            self._lists = []
+            self._cluster_of = {}
+            return
+        nlist = max(1, int(np.sqrt(len(rows))))
+        rng = np.random.default_rng(0)
+        sample = rows if len(rows) <= 256 * nlist else rng.choice(rows, 256 * nlist, replace=False)
+        data = self._vectors[sample]
+        centroids = data[rng.choice(len(data), nlist, replace=False)]
+        for _ in range(iterations):
+            assign = np.argmax(data @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assign, data)
+            empty = np.bincount(assign, minlength=nlist) == 0
+            sums[empty] = centroids[empty]
+            centroids = _normalize(sums)
+        self._centroids = centroids
+        self._lists = [[] for _ in range(nlist)]
+        self._cluster_of = {}
+        self._trained_size = len(rows)
+        self._assign(rows)
+
+    def _assign(self, rows: np.ndarray):
+        if self._centroids is None or len(rows) == 0:
+            return
+        assign = np.argmax(self._vectors[rows] @ self._centroids.T, axis=1)
+        for row, cluster in zip(rows.tolist(), assign.tolist()):
+            self._lists[cluster].append(row)
+            self._cluster_of[row] = cluster
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if not self._row_of:
+            return []
+        if self._centroids is None:
+            rows = self._live_rows()
+        else:
+            probe = _top_k(self._centroids @ query, min(self.nprobe, len(self._lists)))
+            rows = np.fromiter(
+                (r for c in probe.tolist() for r in self._lists[c]), dtype=np.int64
+            )
+            if len(rows) == 0:
+                return []
+        scores = self._vectors[rows] @ query
+        best = _top_k(scores, k)
+        return [(self._ids[rows[i]], float(scores[i])) for i in best]
+
+    def save(self, prefix: str):
+        rows = self._live_rows()
+        np.save(f"{prefix}.vectors.npy", self._vectors[rows])
+        with open(f"{prefix}.ids.json", "w") as f:
+            json.dump([self._ids[r] for r in rows.tolist()], f)
+
+    def load(self, prefix: str):
+        vectors = np.load(f"{prefix}.vectors.npy")
+        with open(f"{prefix}.ids.json") as f:
+            ids = json.load(f)
+        self.__init__(self.dim, self.nprobe, self.min_train_size)
+        if ids:
+            self.add(ids, vectors)
+
+
+class HNSWLabelIndex:
+    """
+    HNSW graph index for a single label, backed by hnswlib.
+    """
+
+    def __init__(self, dim: int, ef_search: int = 64, m: int = 16, ef_construction: int = 200):
+        self.dim = dim
+        self.ef_search = ef_search
+        self._m = m
+        self._ef_construction = ef_construction
+        self._index = hnswlib.Index(space="ip", dim=dim)
+        self._index.init_index(max_elements=1024, M=m, ef_construction=ef_construction, allow_replace_deleted=True)
+        self._index.set_ef(ef_search)
+        self._ids: List[Optional[str]] = []
+        self._label_of: Dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._label_of)
+
+    def add(self, ids: List[str], vectors: np.ndarray):
+        vectors = _normalize(vectors).reshape(-1, self.dim)
+        labels = []
+        for node_id in ids:
+            label = self._label_of.get(node_id)
+            if label is None:
+                label = len(self._ids)
+                self._ids.append(node_id)
+                self._label_of[node_id] = label
+            labels.append(label)
+        needed = len(self._ids)
+        if needed > self._index.get_max_elements():
+            self._index.resize_index(max(needed, 2 * self._index.get_max_elements()))
+        self._index.add_items(vectors, np.array(labels, dtype=np.int64))
+
+    def remove(self, node_id: str):
+        label = self._label_of.pop(node_id, None)
+        if label is not None:
+            self._index.mark_deleted(label)
+            self._ids[label] = None
+
+    def search(self, query: np.ndarray, k: int) -> List[Tuple[str, float]]:
+        if not self._label_of:
+            return []
+        k = min(k, len(self._label_of))
+        self._index.set_ef(max(self.ef_search, k))
+        labels, distances = self._index.knn_query(query.reshape(1, -1), k=k)
+        # hnswlib "ip" distance is 1 - dot product
+        return [(self._ids[l], 1.0 - float(d)) for l, d in zip(labels[0].tolist(), distances[0].tolist())]
+
+    def save(self, prefix: str):
+        self._index.save_index(f"{prefix}.hnsw")
+        with open(f"{prefix}.ids.json", "w") as f:
+            json.dump(self._ids, f)
+
+    def load(self, prefix: str):
+        with open(f"{prefix}.ids.json") as f:
+            self._ids = json.load(f)
+        self._index.load_index(f"{prefix}.hnsw", allow_replace_deleted=True)
+        self._index.set_ef(self.ef_search)
+        self._label_of = {node_id: i for i, node_id in enumerate(self._ids) if node_id is not None}
+
+
+class VectorIndex:
+    """
+    Persistent ANN index covering every embedded memory node.
+
+    One sub-index is kept per memory label; unfiltered queries search all
+    labels and merge the results. Scores are cosine similarities.
+
+    Thread-safe: request threads add vectors while others search, and the
+    sub-indexes reallocate their storage as they grow, so every operation
+    runs under one lock.
+    """
+
+    def __init__(self, dim: int, path: str = None, backend: str = None, **index_options):
+        self.dim = dim
+        self.path = path
+        if backend is None:
+            backend = "hnsw" if hnswlib is not None else "ivf"
+        if backend == "hnsw" and hnswlib is None:
+            raise ValueError("backend 'hnsw' requires the hnswlib package")
+        if backend not in ("hnsw", "ivf"):
+            raise ValueError(f"Unknown vector index backend '{backend}'")
+        self.backend = backend
+        self._index_options = index_options
+        self._lock = threading.RLock()
+        self._labels: Dict[str, object] = {}
+        self._label_of: Dict[str, str] = {}
+        # Rebuilds in progress: (label or None for all, fresh index) pairs that
+        # mirror every write until they are swapped in
+        self._rebuilds: List[Tuple[Optional[str], "VectorIndex"]] = []
+
+    def __len__(self):
+        with self._lock:
+            return len(self._label_of)
+
+    def labels(self) -> List[str]:
+        with self._lock:
+            return list(self._labels)
+
+    def _sub_index(self, label: str):
+        sub = self._labels.get(label)
+        if sub is None:
+            cls = HNSWLabelIndex if self.backend == "hnsw" else IVFLabelIndex
+            sub = cls(self.dim, **self._index_options)
+            self._labels[label] = sub
+        return sub
+
+    def add(self, label: str, node_id: str, embedding: Iterable[float]):
+        self.add_batch(label, [node_id], np.asarray(embedding, dtype=np.float32).reshape(1, -1))
+
+    def add_batch(self, label: str, node_ids: List[str], embeddings: np.ndarray):
+        if not node_ids:
+            return
+        with self._lock:
+            # A node id moving to another label must not stay in the old one
+            for node_id in node_ids:
+                previous = self._label_of.get(node_id)
+                if previous is not None and previous != label:
+                    self._labels[previous].remove(node_id)
+            self._sub_index(label).add(list(node_ids), np.asarray(embeddings, dtype=np.float32))
+            for node_id in node_ids:
+                self._label_of[node_id] = label
+            for rebuild_label, fresh in self._rebuilds:
+                if rebuild_label is None or rebuild_label == label:
+                    fresh.add_batch(label, node_ids, embeddings)
+
+    def remove(self, node_id: str):
+        with self._lock:
+            label = self._label_of.pop(node_id, None)
+            if label is not None:
+                self._labels[label].remove(node_id)
+            for _, fresh in self._rebuilds:
+                fresh.remove(node_id)
+
+    def clear(self, label: str = None):
+        """Drop every vector, or only those of one label."""
+        with self._lock:
+            if label is None:
+                self._labels = {}
+                self._label_of = {}
+                return
+            sub = self._labels.pop(label, None)
+            if sub is not None:
+                self._label_of = {node_id: lbl for node_id, lbl in self._label_of.items() if lbl != label}
+
+    # ------------------------
+    # Rebuilds
+    # ------------------------
+    def begin_rebuild(self, label: str = None) -> "VectorIndex":
+        """
+        Empty index to reload into (everything, or one label) while this one
+        keeps serving searches. Writes made in the meantime are mirrored into
+        it; finish_rebuild() swaps it in, abort_rebuild() discards it.
+        """
+        fresh = VectorIndex(self.dim, backend=self.backend, **self._index_options)
+        with self._lock:
+            self._rebuilds.append((label, fresh))
+        return fresh
+
+    def finish_rebuild(self, fresh: "VectorIndex", label: str = None):
+        with self._lock:
+            self._rebuilds = [(l, f) for l, f in self._rebuilds if f is not fresh]
+            if label is None:
+                self._labels = fresh._labels
+                self._label_of = fresh._label_of
+                return
+            self.clear(label)
+            sub = fresh._labels.get(label)
+            if sub is not None:
+                self._labels[label] = sub
+                for node_id, lbl in fresh._label_of.items():
+                    if lbl == label:
+                        previous = self._label_of.get(node_id)
+                        if previous is not None and previous != label:
+                            self._labels[previous].remove(node_id)
+                        self._label_of[node_id] = label
+
+    def abort_rebuild(self, fresh: "VectorIndex"):
+        with self._lock:
+            self._rebuilds = [(l, f) for l, f in self._rebuilds if f is not fresh]
+
+    def search(self, query: Iterable[float], k: int = 5, label: str = None) -> List[Dict[str, object]]:
+        """
+        Return up to k hits as dicts with keys label, id and score, best first.
+        """
+        q = _normalize(np.asarray(query, dtype=np.float32).reshape(-1))
+        hits = []
+        with self._lock:
+            labels = [label] if label else list(self._labels)
+            for lbl in labels:
+                sub = self._labels.get(lbl)
+                if sub is None:
+                    continue
+                hits.extend({"label": lbl, "id": node_id, "score": score} for node_id, score in sub.search(q, k))
+        hits.sort(key=lambda h: h["score"], reverse=True)
+        return hits[:k]
+
+    # ------------------------
+    # Persistence
+    # ------------------------
+    def save(self, path: str = None):
+        path = path or self.path
+        if not path:
+            raise ValueError("No path given for saving the vector index")
+        os.makedirs(path, exist_ok=True)
+        with self._lock:
+            for label, sub in self._labels.items():
+                sub.save(os.path.join(path, label))
+            with open(os.path.join(path, "manifest.json"), "w") as f:
+                json.dump({"dim": self.dim, "backend": self.backend, "labels": list(self._labels)}, f)
+
+    def load(self, path: str = None) -> bool:
+        """
+        Load a saved index. Returns False when nothing compatible is on disk.
+        """
+        path = path or self.path
+        manifest_path = os.path.join(path, "manifest.json") if path else None
+        if not manifest_path or not os.path.exists(manifest_path):
+            return False
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+        if manifest.get("dim") != self.dim or manifest.get("backend") != self.backend:
+            return False
+        with self._lock:
+            self._labels = {}
+            self._label_of = {}
+            for label in manifest.get("labels", []):
+                sub = self._sub_index(label)
+                sub.load(os.path.join(path, label))
+                for node_id in sub._ids:
+                    if node_id is not None:
+                        self._label_of[node_id] = label
+        return True
+
+    @staticmethod
+    def mark_stale(path: str):
+        """
+        Invalidate an index saved at `path` (e.g. after another process wrote
+        embeddings straight to Neo4j), so the next load() misses and the
+        owner rebuilds from the graph.
+        """
+        manifest_path = os.path.join(path, "manifest.json")
+        if os.path.exists(manifest_path):
+            os.remove(manifest_path)
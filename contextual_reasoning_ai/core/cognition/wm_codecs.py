@@ -0,0 +1,123 @@
+# wm_codecs.py
+# Value codecs for RedisWorkingMemory.
+#
+#   "json"    - plain JSON text (legacy layout, untagged, readable by old code)
+#   "msgpack" - compact binary; numpy arrays / torch tensors nested anywhere
+#               in the payload are stored as raw bytes (msgpack ext type)
+#   top-level numpy arrays / tensors are always stored as raw array bytes
+#
+# Binary values start with a 2-byte tag, b"\x00" + codec id, so they can be
+# told apart from each other and from untagged legacy JSON (which never
+# starts with a NUL byte). A new layout gets a new codec id.
+
+import json
+import struct
+from typing import Any
+
+import numpy as np
+
+try:
+    import msgpack
+except ImportError:  # optional: only needed for WM_CODEC=msgpack
+    msgpack = None
+
+CODECS = ("json", "msgpack")
+
+_TAG = b"\x00"
+_MSGPACK = 2
+_ARRAY = 3
+
+_NDARRAY_EXT = 1
+
+
+def _as_ndarray(value):
+    """numpy arrays as-is, torch tensors (anything with .detach) as numpy, else None."""
+    if isinstance(value, np.ndarray):
+        return value
+    if hasattr(value, "detach") and hasattr(value, "numpy"):
+        return value.detach().cpu().numpy()
+    return None
+
+
+# ------------------------
+# Raw numeric arrays
+# ------------------------
+def _pack_array(array: np.ndarray) -> bytes:
+    array = np.ascontiguousarray(array)
+    dtype = array.dtype.str.encode()
+    header = struct.pack(f"<B{len(dtype)}sB{array.ndim}Q", len(dtype), dtype, array.ndim, *array.shape)
+    return header + array.tobytes()
+
+
+def _unpack_array(data: memoryview) -> np.ndarray:
+    dtype_len = data[0]
+    dtype = np.dtype(bytes(data[1:1 + dtype_len]).decode())
+    offset = 1 + dtype_len
+    ndim = data[offset]
+    shape = struct.unpack_from(f"<{ndim}Q", data, offset + 1)
+    offset += 1 + 8 * ndim
+    # Read-only view over the reply buffer; no per-element decoding
+    return np.frombuffer(data, dtype=dtype, offset=offset).reshape(shape)
+
+
+# ------------------------
+# msgpack with array extension
+# ------------------------
+def _msgpack_default(value):
+    array = _as_ndarray(value)
+    if array is not None:
+        return msgpack.ExtType(_NDARRAY_EXT, _pack_array(array))
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+def _msgpack_ext_hook(code, data):
+    if code == _NDARRAY_EXT:
+        return _unpack_array(memoryview(data))
+    return msgpack.ExtType(code, data)
+
+
+def _json_default(value):
+    array = _as_ndarray(value)
+    if array is not None:
+        return array.tolist()
+    if isinstance(value, np.generic):
+        return value.item()
+    raise TypeError(f"Object of type {type(value).__name__} is not JSON serializable")
+
+
+# ------------------------
+# Public API
+# ------------------------
+def encode_value(value: Any, codec: str = "json") -> bytes:
+    """Encode a working-memory value for storage in Redis."""
+    array = _as_ndarray(value)
+    if array is not None:
+        return _TAG + bytes([_ARRAY]) + _pack_array(array)
+    if codec == "json":
+        return json.dumps(value, default=_json_default).encode()
+    if codec == "msgpack":
+        if msgpack is None:
+            raise ImportError("WM_CODEC=msgpack requires the 'msgpack' package")
+        return _TAG + bytes([_MSGPACK]) + msgpack.packb(value, default=_msgpack_default, use_bin_type=True)
+    raise ValueError(f"Unknown working-memory codec '{codec}'. Must be one of {list(CODECS)}")
+
+
+def decode_value(data) -> Any:
+    """Decode a stored value (tagged binary, or legacy JSON as bytes or str)."""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        return json.loads(data)
+    if data[:1] != _TAG:
+        return json.loads(data)
+    codec_id = data[1]
+    payload = memoryview(data)[2:]
+    if codec_id == _ARRAY:
+        return _unpack_array(payload)
+    if codec_id == _MSGPACK:
+        if msgpack is None:
+            raise ImportError("Reading msgpack working-memory values requires the 'msgpack' package")
+        return msgpack.unpackb(payload, ext_hook=_msgpack_ext_hook, raw=False)
+    raise ValueError(f"Unknown working-memory codec id {codec_id}")
@@ -1,6 +1,15 @@
+import os
+import queue
 import uuid
 from datetime import datetime
-from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError
+from contextual_reasoning_ai.db.neo4j_connector import get_neo4j_driver
+from contextual_reasoning_ai.core.cognitive.ingest_buffer import IngestBuffer
+from contextual_reasoning_ai.core.memory.MemoryGraphManager import LINK_RELATIONS, FULLTEXT_INDEX, build_fulltext_query
+
+
+def new_working_memory_id():
+    return f"wm_{uuid.uuid4().hex[:8]}"
 
 class MemoryGraphManager:
     """
@@ -8,8 +17,11 @@ class MemoryGraphManager:
     SemanticMemory, and EpisodicMemory nodes in the Neo4j graph.
     """
 
-    def __init__(self, uri="bolt://neo4j_db:7687", user="neo4j", password="securepassword"):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri=None, user=None, password=None, related_limit=None):
+        # Sessions come from the shared process-wide pool (NEO4J_* env vars fill in defaults)
+        self.driver = get_neo4j_driver(uri, user, password)
+        # Only the top-N most relevant memories get linked to a new observation
+        self.related_limit = related_limit or int(os.getenv("RELATED_MEMORY_LIMIT", 25))
 
     def close(self):
         self.driver.close()
@@ -17,8 +29,8 @@ class MemoryGraphManager:
     # ============================================================
     # Create a new WorkingMemory node
     # ============================================================
-    def create_working_memory(self, content, tags=None):
-        wm_id = f"wm_{uuid.uuid4().hex[:8]}"
+    def create_working_memory(self, content, tags=None, wm_id=None):
+        wm_id = wm_id or new_working_memory_id()
         timestamp = datetime.utcnow().isoformat()
         tags = tags if tags else []
 
@@ -37,43 +49,87 @@ class MemoryGraphManager:
     # ============================================================
     # Search for related memory nodes
     # ============================================================
-    def find_related_memories(self, keywords):
+    def find_related_memories(self, keywords, limit=None):
+        """
+        Search LongTermMemory, SemanticMemory, and EpisodicMemory through the
+        full-text index, returning at most `limit` nodes ranked by BM25 score.
+        """
+        limit = limit or self.related_limit
+        search = build_fulltext_query(keywords)
+        if not search:
+            return []
+
         query = """
-        MATCH (m)
-        WHERE (m:LongTermMemory OR m:SemanticMemory OR m:EpisodicMemory)
-          AND any(keyword IN $keywords WHERE toLower(m.content) CONTAINS toLower(keyword))
-        RETURN m
+        CALL db.index.fulltext.queryNodes($index_name, $search)
+        YIELD node, score
+        RETURN node AS m, score
+        LIMIT $limit
         """
         with self.driver.session() as session:
-            results = session.run(query, keywords=keywords)
+            try:
+                results = session.run(query, index_name=FULLTEXT_INDEX, search=search, limit=limit)
+                return [record["m"] for record in results]
+            except Neo4jError as e:
+                # Index not created yet: fall back to the substring scan, still capped
+                print(f"[WARN] Full-text index unavailable ({e.code}); using keyword scan.")
+
+            fallback_query = """
+            MATCH (m)
+            WHERE (m:LongTermMemory OR m:SemanticMemory OR m:EpisodicMemory)
+              AND any(keyword IN $keywords WHERE toLower(m.content) CONTAINS toLower(keyword))
+            RETURN m
+            LIMIT $limit
+            """
+            results = session.run(fallback_query, keywords=keywords, limit=limit)
             return [record["m"] for record in results]
 
     # ============================================================
     # Link WorkingMemory node to other memory types
     # ============================================================
     def link_memory(self, wm_id, related_nodes):
+        """
+        Link a new WorkingMemory node to relevant memories dynamically.
+        All links are written in one transaction with one UNWIND per target label
+        (relationship types can't be parameterized), and targets are matched by
+        labeled id lookups so the unique-id constraints' indexes are used.
+        """
+        rows_by_target = self._group_links(wm_id, related_nodes)
+        if not rows_by_target:
+            return
+
         with self.driver.session() as session:
-            for node in related_nodes:
-                if "LongTermMemory" in node.labels:
-                    relation = "REFERS_TO"
-                elif "SemanticMemory" in node.labels:
-                    relation = "RELATES_TO"
-                elif "EpisodicMemory" in node.labels:
-                    relation = "RECALLS"
-                else:
-                    relation = "ASSOCIATED_WITH"
-
-                query = f"""
-                MATCH (wm:WorkingMemory {{id: $wm_id}}), (target {{id: $target_id}})
-                MERGE (wm)-[:{relation}]->(target)
-                """
-                session.run(query, wm_id=wm_id, target_id=node["id"])
+            session.execute_write(self._write_links, rows_by_target)
+
+    @staticmethod
+    def _group_links(wm_id, related_nodes, rows_by_target=None):
+        rows_by_target = rows_by_target if rows_by_target is not None else {}
+        for node in related_nodes:
+            label = next((l for l in LINK_RELATIONS if l in node.labels), None)
+            if label:
+                relation = LINK_RELATIONS[label]
+            else:
+                label = sorted(node.labels)[0] if node.labels else None
+                relation = "ASSOCIATED_WITH"
+            rows_by_target.setdefault((label, relation), []).append({"wm_id": wm_id, "id": node["id"]})
+        return rows_by_target
+
+    @staticmethod
+    def _write_links(tx, rows_by_target):
+        for (label, relation), rows in rows_by_target.items():
+            target = f"(target:{label} {{id: row.id}})" if label else "(target {id: row.id})"
+            query = f"""
+            UNWIND $rows AS row
+            MATCH (wm:WorkingMemory {{id: row.wm_id}})
+            MATCH {target}
+            MERGE (wm)-[:{relation}]->(target)
+            """
+            tx.run(query, rows=rows).consume()
 
     # ============================================================
     # High-level process for new observations
     # ============================================================
-    def process_new_observation(self, content, keywords):
-        wm_node = self.create_working_memory(content, tags=keywords)
+    def process_new_observation(self, content, keywords, wm_id=None):
+        wm_node = self.create_working_memory(content, tags=keywords, wm_id=wm_id)
         if not wm_node:
             print("[ERROR] Failed to create WorkingMemory node.")
             return None
@@ -91,6 +147,91 @@ class MemoryGraphManager:
 
         return wm_node
 
+    # ============================================================
+    # Batched write path used by the ingest buffer
+    # ============================================================
+    def process_observation_batch(self, observations):
+        """
+        Create and link a batch of observations in a single write transaction.
+        Each observation is a dict with "wm_id", "content" and "keywords".
+        Related memories for the whole batch are found with one query first.
+        """
+        if not observations:
+            return
+
+        timestamp = datetime.utcnow().isoformat()
+        rows = [{"wm_id": o["wm_id"], "content": o["content"], "tags": o["keywords"] or []} for o in observations]
+
+        with self.driver.session() as session:
+            related = self.find_related_memories_batch(session, observations)
+
+            def _ingest(tx):
+                tx.run("""
+                UNWIND $rows AS row
+                MERGE (wm:WorkingMemory {id: row.wm_id})
+                ON CREATE SET wm.content = row.content,
+                              wm.timestamp = datetime($timestamp),
+                              wm.tags = row.tags
+                """, rows=rows, timestamp=timestamp).consume()
+
+                rows_by_target = {}
+                for wm_id, nodes in related.items():
+                    self._group_links(wm_id, nodes, rows_by_target)
+                self._write_links(tx, rows_by_target)
+
+            session.execute_write(_ingest)
+        print(f"[INFO] Ingested {len(observations)} observations in one transaction.")
+
+    def find_related_memories_batch(self, session, observations, limit=None):
+        """
+        Related memories for many observations in one round trip: one UNWIND
+        over the searches with a per-row CALL subquery, capped at `limit` each.
+        Returns {wm_id: [nodes]}.
+        """
+        limit = limit or self.related_limit
+        searches = []
+        for o in observations:
+            search = build_fulltext_query(o["keywords"])
+            if search:
+                searches.append({"wm_id": o["wm_id"], "search": search, "keywords": list(o["keywords"])})
+        if not searches:
+            return {}
+
+        query = """
+        UNWIND $searches AS s
+        CALL {
+            WITH s
+            CALL db.index.fulltext.queryNodes($index_name, s.search)
+            YIELD node, score
+            RETURN node AS m
+            LIMIT $limit
+        }
+        RETURN s.wm_id AS wm_id, m
+        """
+        try:
+            records = list(session.run(query, searches=searches, index_name=FULLTEXT_INDEX, limit=limit))
+        except Neo4jError as e:
+            # Index not created yet: fall back to the substring scan, still capped
+            print(f"[WARN] Full-text index unavailable ({e.code}); using keyword scan.")
+            fallback_query = """
+            UNWIND $searches AS s
+            CALL {
+                WITH s
+                MATCH (m)
+                WHERE (m:LongTermMemory OR m:SemanticMemory OR m:EpisodicMemory)
+                  AND any(keyword IN s.keywords WHERE toLower(m.content) CONTAINS toLower(keyword))
+                RETURN m
+                LIMIT $limit
+            }
+            RETURN s.wm_id AS wm_id, m
+            """
+            records = list(session.run(fallback_query, searches=searches, limit=limit))
+
+        related = {}
+        for record in records:
+            related.setdefault(record["wm_id"], []).append(record["m"])
+        return related
+
 
 # ============================================================
 # Context Engine
@@ -101,21 +242,45 @@ class ContextEngine:
     Integrates memory graph with cognitive reasoning.
     """
 
-    def __init__(self):
+    def __init__(self, async_ingest=None):
         self.memory_graph = MemoryGraphManager()
 
+        # Write-behind mode: analyze_text returns at once and a background
+        # thread writes observations to Neo4j in batched transactions
+        if async_ingest is None:
+            async_ingest = os.getenv("CONTEXT_ENGINE_ASYNC_INGEST", "false").lower() in ("1", "true", "yes")
+        self.ingest_buffer = None
+        if async_ingest:
+            self.ingest_buffer = IngestBuffer(
+                self.memory_graph,
+                max_queue_size=int(os.getenv("INGEST_MAX_QUEUE_SIZE", 10000)),
+                max_batch_size=int(os.getenv("INGEST_MAX_BATCH_SIZE", 200)),
+                flush_interval_ms=float(os.getenv("INGEST_FLUSH_INTERVAL_MS", 50)),
+                put_timeout=float(os.getenv("INGEST_PUT_TIMEOUT", 5)),
+            )
+
     def analyze_text(self, text):
         """
         Process text input and store it in WorkingMemory.
         Automatically link to related memories using Neo4j graph.
         """
-        print(f"[CONTEXT ENGINE] Processing new text input: {text}")
+        preview = text if len(text) <= 80 else f"{text[:77]}..."
+        print(f"[CONTEXT ENGINE] Processing new text input: {preview}")
 
-        # Generate keywords (placeholder: simple split, can use NLP later)
-        keywords = [word.lower() for word in text.split() if len(word) > 3]
+        keywords = self.extract_keywords(text)
 
-        # Create and link memory nodes
-        wm_node = self.memory_graph.process_new_observation(text, keywords)
+        if self.ingest_buffer:
+            wm_id = new_working_memory_id()
+            try:
+                self.ingest_buffer.submit({"wm_id": wm_id, "content": text, "keywords": keywords})
+                return {"status": "queued", "working_memory_id": wm_id, "keywords": keywords}
+            except queue.Full:
+                # Buffer stayed full for put_timeout: write this one synchronously
+                print("[CONTEXT ENGINE] Ingest buffer full; writing synchronously.")
+                wm_node = self.memory_graph.process_new_observation(text, keywords, wm_id=wm_id)
+        else:
+            # Create and link memory nodes
+            wm_node = self.memory_graph.process_new_observation(text, keywords)
 
         return {
             "status": "processed",
@@ -123,10 +288,48 @@ class ContextEngine:
             "keywords": keywords
         }
 
-    def analyze_image(self, image_path):
+    def analyze_texts(self, texts):
+        """
+        Bulk variant of analyze_text: the whole list is created, searched and
+        linked in one transaction (or handed to the ingest buffer).
+        Returns one result dict per text, in order.
+        """
+        print(f"[CONTEXT ENGINE] Processing {len(texts)} text inputs in bulk")
+        observations = [
+            {"wm_id": new_working_memory_id(), "content": text, "keywords": self.extract_keywords(text)}
+            for text in texts
+        ]
+
+        queued = 0
+        if self.ingest_buffer:
+            try:
+                for obs in observations:
+                    self.ingest_buffer.submit(obs)
+                    queued += 1
+            except queue.Full:
+                print("[CONTEXT ENGINE] Ingest buffer full; writing remaining inputs synchronously.")
+
+        # Anything not queued is written here in one batched transaction
+        self.memory_graph.process_observation_batch(observations[queued:])
+
+        return [
+            {"status": "queued" if i < queued else "processed",
+             "working_memory_id": obs["wm_id"],
+             "keywords": obs["keywords"]}
+            for i, obs in enumerate(observations)
+        ]
+
+    @staticmethod
+    def extract_keywords(text):
+        # Placeholder: simple split, can use NLP later
+        return [word.lower() for word in text.split() if len(word) > 3]
+
+    def analyze_image(self, image):
         """
         Stub for image analysis that would connect to visual memory.
+        Accepts a path or a file-like object (e.g. an in-memory upload).
         """
+        image_path = image if isinstance(image, str) else getattr(image, "name", "<in-memory image>")
         print(f"[CONTEXT ENGINE] Processing image: {image_path}")
         return {"status": "image processed", "image_path": image_path}
 
@@ -144,7 +347,12 @@ class ContextEngine:
             results = session.run(query, keyword=keyword)
             return [record["wm"] for record in results]
 
+    def ingest_stats(self):
+        return self.ingest_buffer.stats() if self.ingest_buffer else None
+
     def close(self):
+        if self.ingest_buffer:
+            self.ingest_buffer.close()
         self.memory_graph.close()
 
 
@@ -0,0 +1,176 @@
+# ingest_buffer.py
+# Write-behind buffer for new observations.
+# Callers enqueue observations and return immediately; a background thread
+# collects up to `max_batch_size` of them (or whatever arrived within
+# `flush_interval_ms`) and writes the batch to Neo4j in one transaction.
+# The queue is bounded, so a slow database pushes back on producers instead
+# of growing memory without limit.
+
+import atexit
+import logging
+import queue
+import threading
+import time
+from typing import Any, Dict, List, Tuple
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+class IngestBuffer:
+    def __init__(self,
+                 memory_graph,
+                 max_queue_size: int = 10000,
+                 max_batch_size: int = 200,
+                 flush_interval_ms: float = 50.0,
+                 put_timeout: float = 5.0):
+        if max_batch_size < 1:
+            raise ValueError("max_batch_size must be at least 1")
+        self.memory_graph = memory_graph
+        self.max_batch_size = max_batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.put_timeout = put_timeout
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        # Submits past the closed check but not yet enqueued; close() waits for
+        # them so its stop marker always lands behind every accepted observation
+        self._putting = 0
+        self._puts_done = threading.Condition(self._lock)
+
+        # Metrics
+        self._enqueued = 0
+        self._written = 0
+        self._failed = 0
+        self._batches = 0
+        self._max_queue_depth = 0
+
+        self._worker = threading.Thread(target=self._run, name="ingest-buffer", daemon=True)
+        self._worker.start()
+        # Daemon thread: make sure queued observations reach Neo4j at interpreter exit
+        atexit.register(self.close)
+
+    # ------------------------
+    # Client side
+    # ------------------------
+    def submit(self, observation: Dict[str, Any]):
+        """
+        Queue one observation ({"wm_id", "content", "keywords"}).
+        Blocks for up to `put_timeout` seconds when the buffer is full and then
+        raises queue.Full, so the caller can fall back to a synchronous write.
+        """
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("IngestBuffer is closed")
+            self._putting += 1
+        # The put itself happens outside the lock: a full queue must only block this caller
+        try:
+            self._queue.put(observation, timeout=self.put_timeout)
+        except BaseException:
+            with self._lock:
+                self._putting -= 1
+                self._puts_done.notify_all()
+            raise
+        depth = self._queue.qsize()
+        with self._lock:
+            self._putting -= 1
+            self._enqueued += 1
+            self._max_queue_depth = max(self._max_queue_depth, depth)
+            self._puts_done.notify_all()
+
+    # ------------------------
+    # Worker side
+    # ------------------------
+    def _collect(self, first) -> Tuple[List[Dict[str, Any]], bool]:
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run(self):
+        stop = False
+        while not stop:
+            first = self._queue.get()
+            if first is _STOP:
+                break
+            batch, stop = self._collect(first)
+            self._flush(batch)
+
+        # Observations that raced with close() are still written
+        leftovers = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is not _STOP:
+                leftovers.append(item)
+        for i in range(0, len(leftovers), self.max_batch_size):
+            self._flush(leftovers[i:i + self.max_batch_size])
+
+    def _flush(self, batch: List[Dict[str, Any]]):
+        try:
+            self.memory_graph.process_observation_batch(batch)
+            written, failed = len(batch), 0
+        except Exception as e:
+            # One bad observation shouldn't lose the whole batch: retry them one by one
+            logger.warning("[INGEST] Batch of %d failed (%s); retrying individually.", len(batch), e)
+            written, failed = 0, 0
+            for obs in batch:
+                try:
+                    self.memory_graph.process_new_observation(obs["content"], obs["keywords"], wm_id=obs["wm_id"])
+                    written += 1
+                except Exception as e:
+                    failed += 1
+                    logger.error("[INGEST] Dropped observation %s: %s", obs["wm_id"], e, exc_info=True)
+        with self._lock:
+            self._batches += 1
+            self._written += written
+            self._failed += failed
+
+    # ------------------------
+    # Metrics & lifecycle
+    # ------------------------
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_queue_depth": self._max_queue_depth,
+                "enqueued": self._enqueued,
+                "written": self._written,
+                "failed": self._failed,
+                "batches": self._batches,
+                "avg_batch_size": (self._written + self._failed) / self._batches if self._batches else 0.0,
+            }
+
+    def close(self, timeout: float = None) -> int:
+        """
+        Stop accepting observations and flush everything already queued.
+        Waits for the flush to finish unless a `timeout` is given; returns the
+        number of observations not yet written or dropped (0 once flushed).
+        """
+        with self._lock:
+            first_close = not self._closed
+            self._closed = True
+            while self._putting:
+                self._puts_done.wait()
+        if first_close:
+            self._queue.put(_STOP)
+        self._worker.join(timeout=timeout)
+        if self._worker.is_alive():
+            with self._lock:
+                unflushed = self._enqueued - self._written - self._failed
+            # Stay registered so interpreter exit still waits for the rest
+            logger.warning("[INGEST] Close timed out after %ss with %d observations unflushed.", timeout, unflushed)
+            return unflushed
+        atexit.unregister(self.close)
+        return 0
@@ -1,21 +1,32 @@
 import networkx as nx
 
+from .reachability import ReachabilityIndex
+
 class KnowledgeGraph:
     def __init__(self):
         self.graph = nx.MultiDiGraph()
+        self.index = ReachabilityIndex(self.graph)
         self._build_initial_graph()
 
     def _build_initial_graph(self):
-        self.graph.add_node("User_A", type="User", location="US")
-        self.graph.add_node("Device_X", type="Device", os="Windows")
-        self.graph.add_node("Network_1", type="Network", ip_range="192.168.1.0/24")
-        self.graph.add_node("Threat_Z", type="Threat", severity="High")
-        self.graph.add_node("Vuln_Y", type="Vulnerability", cve="CVE-2025-1234")
+        self.add_entity("User", "User_A", location="US")
+        self.add_entity("Device", "Device_X", os="Windows")
+        self.add_entity("Network", "Network_1", ip_range="192.168.1.0/24")
+        self.add_entity("Threat", "Threat_Z", severity="High")
+        self.add_entity("Vulnerability", "Vuln_Y", cve="CVE-2025-1234")
+
+        self.add_relationship("User_A", "Device_X", "owns")
+        self.add_relationship("Device_X", "Network_1", "connected_to")
+        self.add_relationship("Network_1", "Threat_Z", "exposed_to")
+        self.add_relationship("Threat_Z", "Vuln_Y", "exploits")
+
+    def add_entity(self, entity_type, entity_id, **attributes):
+        self.graph.add_node(entity_id, type=entity_type, **attributes)
+        self.index.on_node(entity_id, entity_type)
 
-        self.graph.add_edge("User_A", "Device_X", relation="owns")
-        self.graph.add_edge("Device_X", "Network_1", relation="connected_to")
-        self.graph.add_edge("Network_1", "Threat_Z", relation="exposed_to")
-        self.graph.add_edge("Threat_Z", "Vuln_Y", relation="exploits")
+    def add_relationship(self, source_id, target_id, relation, **attributes):
+        self.graph.add_edge(source_id, target_id, relation=relation, **attributes)
+        self.index.on_edge(source_id, target_id)
 
     def get_neighbors(self, node):
         return list(self.graph.successors(node))
@@ -26,5 +37,15 @@ class KnowledgeGraph:
         except nx.NetworkXNoPath:
             return []
 
+    # Index lookups (call index.rebuild() after editing self.graph directly)
+    def nodes_of_type(self, entity_type):
+        return self.index.nodes_of_type(entity_type)
+
+    def threats_reachable_from(self, node):
+        return self.index.threats_reachable_from(node)
+
+    def exposed_to(self, threat, entity_type=None):
+        return self.index.exposed_to(threat, entity_type)
+
     def describe(self):
         return nx.nx_pydot.to_pydot(self.graph).to_string()
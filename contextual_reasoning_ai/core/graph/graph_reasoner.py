@@ -1,22 +1,44 @@
+import os
+
 from .graph_engine import KnowledgeGraph
+from .path_search import iter_paths, DEFAULT_MAX_DEPTH, DEFAULT_MAX_PATHS
+
+THREAT_PATH_TIME_BUDGET = float(os.getenv("THREAT_PATH_TIME_BUDGET", 5.0))
+
 
 class GraphReasoner:
     def __init__(self, graph: KnowledgeGraph):
         self.graph = graph
 
-    def detect_threat_path(self, user_id):
-        # Start from the user and search for paths to known threats
-        threat_nodes = [n for n, d in self.graph.graph.nodes(data=True) if d.get("type") == "Threat"]
-        paths = []
-        for threat in threat_nodes:
-            found_paths = self.graph.find_paths(user_id, threat)
-            for path in found_paths:
-                paths.append({
-                    "path": path,
-                    "threat": threat,
-                    "length": len(path)
-                })
-        return paths
+    def iter_threat_paths(self, user_id, max_depth=DEFAULT_MAX_DEPTH, max_paths=DEFAULT_MAX_PATHS,
+                          relation_weights=None, time_budget=THREAT_PATH_TIME_BUDGET):
+        # The reachability index says which threats are within max_depth hops;
+        # one best-first search from the user then finds paths to all of them,
+        # cheapest first, yielding results as they are found
+        reachable = self.graph.threats_reachable_from(user_id)
+        threat_nodes = {threat for threat, distance in reachable.items() if distance <= max_depth}
+        if not threat_nodes:
+            return
+        for result in iter_paths(self.graph.graph, user_id, threat_nodes,
+                                 max_depth=max_depth,
+                                 max_paths=max_paths,
+                                 relation_weights=relation_weights,
+                                 time_budget=time_budget):
+            yield {
+                "path": result["path"],
+                "threat": result["target"],
+                "length": len(result["path"]),
+                "relations": result["relations"],
+                "cost": result["cost"]
+            }
+
+    def detect_threat_path(self, user_id, max_depth=DEFAULT_MAX_DEPTH, max_paths=DEFAULT_MAX_PATHS,
+                           relation_weights=None, time_budget=THREAT_PATH_TIME_BUDGET):
+        return list(self.iter_threat_paths(user_id, max_depth, max_paths, relation_weights, time_budget))
+
+    def exposed_entities(self, threat_id, entity_type="User"):
+        # e.g. which users can reach threat_id, and in how many hops
+        return self.graph.exposed_to(threat_id, entity_type)
 
     def summarize_paths(self, paths):
         if not paths:
@@ -0,0 +1,110 @@
+# path_search.py
+# Bounded path search over the knowledge graph.
+# nx.all_simple_paths enumerates every simple path, which is exponential in
+# the size of the graph. iter_paths instead runs one best-first search from
+# the source towards a whole set of targets and yields loopless paths in
+# order of increasing cost (sum of relation weights), stopping at
+# `max_depth` edges, `max_paths` results or `time_budget` seconds of search
+# time, whichever comes first. Each node is expanded at most `max_paths`
+# times (the usual k-shortest-paths bound), so the work stays proportional
+# to k * edges.
+
+import heapq
+import itertools
+import time
+from typing import Any, Dict, Iterable, Iterator, Optional
+
+DEFAULT_MAX_DEPTH = 6
+DEFAULT_MAX_PATHS = 100
+
+
+def edge_relation(key, data) -> Any:
+    """Relation of an edge: its `relation` attribute, else the multigraph edge key."""
+    return data.get("relation", key)
+
+
+def _cheapest_edges(graph, node, relation_weights, default_weight):
+    """(neighbor, relation, weight) for the cheapest edge to each successor."""
+    best = {}
+    if graph.is_multigraph():
+        edges = ((v, edge_relation(k, d)) for _, v, k, d in graph.out_edges(node, keys=True, data=True))
+    else:
+        edges = ((v, d.get("relation")) for _, v, d in graph.out_edges(node, data=True))
+    for neighbor, relation in edges:
+        weight = relation_weights.get(relation, default_weight)
+        if weight is None:
+            continue  # relation excluded from the search
+        if neighbor not in best or weight < best[neighbor][1]:
+            best[neighbor] = (relation, weight)
+    return [(neighbor, relation, weight) for neighbor, (relation, weight) in best.items()]
+
+
+def iter_paths(graph,
+               source,
+               targets: Iterable,
+               max_depth: int = DEFAULT_MAX_DEPTH,
+               max_paths: int = DEFAULT_MAX_PATHS,
+               relation_weights: Optional[Dict[Any, float]] = None,
+               default_weight: float = 1.0,
+               time_budget: Optional[float] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Yield up to `max_paths` loopless paths from `source` to any node in
+    `targets`, cheapest first. Each result is a dict with the node `path`,
+    the `relations` along it, the `target` reached and its `cost`.
+
+    `relation_weights` maps relation -> non-negative weight (default
+    `default_weight`); a weight of None excludes that relation. Negative
+    weights raise ValueError. The search gives up quietly once it has spent
+    `time_budget` seconds; time the caller spends between results is not
+    counted.
+    """
+    relation_weights = relation_weights or {}
+    if default_weight is not None and default_weight < 0:
+        raise ValueError(f"default_weight must be non-negative, got {default_weight}")
+    for relation, weight in relation_weights.items():
+        if weight is not None and weight < 0:
+            raise ValueError(f"Weight for relation {relation!r} must be non-negative, got {weight}")
+    # Validated up front so bad weights fail at the call, not at the first next()
+    return _search(graph, source, set(targets), max_depth, max_paths, relation_weights, default_weight, time_budget)
+
+
+def _search(graph, source, targets, max_depth, max_paths, relation_weights, default_weight, time_budget):
+    if source not in graph or not targets or max_paths <= 0:
+        return
+    # Only search time is charged: the clock is paused while a result is out
+    spent = 0.0
+    resumed = time.monotonic()
+
+    expansions = {}
+    neighbors_cache = {}
+    counter = itertools.count()  # tie-breaker so paths are never compared
+    heap = [(0.0, next(counter), (source,), ())]
+    found = 0
+
+    while heap:
+        if time_budget is not None and spent + time.monotonic() - resumed > time_budget:
+            return
+        cost, _, path, relations = heapq.heappop(heap)
+        node = path[-1]
+
+        count = expansions.get(node, 0)
+        if count >= max_paths:
+            continue
+        expansions[node] = count + 1
+
+        if node in targets and len(path) > 1:
+            spent += time.monotonic() - resumed
+            yield {"path": list(path), "relations": list(relations), "target": node, "cost": cost}
+            resumed = time.monotonic()
+            found += 1
+            if found >= max_paths:
+                return
+
+        if len(path) - 1 >= max_depth:
+            continue
+        if node not in neighbors_cache:
+            neighbors_cache[node] = _cheapest_edges(graph, node, relation_weights, default_weight)
+        for neighbor, relation, weight in neighbors_cache[node]:
+            if neighbor in path:
+                continue  # loopless
+            heapq.heappush(heap, (cost + weight, next(counter), path + (neighbor,), relations + (relation,)))
@@ -0,0 +1,111 @@
+# reachability.py
+# Incrementally maintained indexes over a knowledge graph:
+#   - type index:   node type -> node ids
+#   - reachability: node -> {threat: hop distance} for every threat the node
+#                   can reach along directed edges, plus the reverse view
+#                   threat -> {node: hop distance}
+# so "which threats can X reach" and "who is exposed to threat T" are dict
+# lookups. Adding a node or an edge only ever shortens distances, so both
+# are handled by relaxing distances backwards from the change. Mutations
+# made to the graph directly (e.g. removing edges) need a rebuild().
+
+from collections import deque
+from typing import Dict, Optional, Set
+
+THREAT_TYPE = "Threat"
+
+
+class ReachabilityIndex:
+    def __init__(self, graph, threat_type: str = THREAT_TYPE, max_depth: Optional[int] = None):
+        self.graph = graph
+        self.threat_type = threat_type
+        self.max_depth = max_depth
+        self.rebuild()
+
+    # ------------------------
+    # Lookups
+    # ------------------------
+    def nodes_of_type(self, node_type: str) -> Set:
+        return set(self._types.get(node_type, ()))
+
+    def threats_reachable_from(self, node) -> Dict:
+        """{threat: distance} for every threat reachable from `node`."""
+        return dict(self._reach.get(node, {}))
+
+    def exposed_to(self, threat, node_type: str = None) -> Dict:
+        """{node: distance} for every node that can reach `threat`, optionally of one type."""
+        exposed = self._exposed.get(threat, {})
+        if node_type is None:
+            return dict(exposed)
+        of_type = self._types.get(node_type, ())
+        return {node: distance for node, distance in exposed.items() if node in of_type}
+
+    # ------------------------
+    # Maintenance
+    # ------------------------
+    def rebuild(self):
+        """Recompute both indexes from the graph."""
+        self._types = {}       # type -> set of node ids
+        self._node_types = {}  # node id -> type
+        self._reach = {}       # node -> {threat: distance}
+        self._exposed = {}     # threat -> {node: distance}
+        for node, data in self.graph.nodes(data=True):
+            self.on_node(node, data.get("type"))
+
+    def on_node(self, node, node_type):
+        """Call after a node was added or retyped."""
+        previous = self._node_types.get(node)
+        if previous == node_type and node in self._node_types:
+            return
+        if previous is not None:
+            self._types[previous].discard(node)
+        self._node_types[node] = node_type
+        if node_type is not None:
+            self._types.setdefault(node_type, set()).add(node)
+
+        if previous == self.threat_type:
+            self._drop_threat(node)
+        if node_type == self.threat_type:
+            self._propagate([(node, node, 0)])
+
+    def on_edge(self, source, target):
+        """Call after an edge source -> target was added."""
+        for node in (source, target):
+            if node not in self._node_types:
+                self.on_node(node, self.graph.nodes[node].get("type"))
+        seeds = [(source, threat, distance + 1) for threat, distance in self._reach.get(target, {}).items()]
+        if self._node_types.get(target) == self.threat_type:
+            seeds.append((source, target, 1))
+        self._propagate(seeds)
+
+    def _relax(self, node, threat, distance) -> bool:
+        if node == threat or (self.max_depth is not None and distance > self.max_depth):
+            return False
+        reach = self._reach.setdefault(node, {})
+        current = reach.get(threat)
+        if current is not None and current <= distance:
+            return False
+        reach[threat] = distance
+        self._exposed.setdefault(threat, {})[node] = distance
+        return True
+
+    def _propagate(self, seeds):
+        # Label-correcting BFS over predecessors: every improvement is pushed on
+        # to the node's predecessors until no distance gets shorter
+        queue = deque()
+        for node, threat, distance in seeds:
+            if distance == 0:
+                queue.append((node, threat, 0))  # the threat itself
+            elif self._relax(node, threat, distance):
+                queue.append((node, threat, distance))
+        while queue:
+            node, threat, distance = queue.popleft()
+            if self._reach.get(node, {}).get(threat, distance) < distance:
+                continue  # superseded by a shorter distance queued later
+            for predecessor in self.graph.predecessors(node):
+                if self._relax(predecessor, threat, distance + 1):
+                    queue.append((predecessor, threat, distance + 1))
+
+    def _drop_threat(self, threat):
+        for node in self._exposed.pop(threat, {}):
+            self._reach[node].pop(threat, None)
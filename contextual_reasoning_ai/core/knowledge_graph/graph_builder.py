@@ -1,14 +1,19 @@
 import networkx as nx
 
+from ..graph.reachability import ReachabilityIndex
+
 class CyberGuardKnowledgeGraph:
     def __init__(self):
         self.graph = nx.MultiDiGraph()
+        self.index = ReachabilityIndex(self.graph)
 
     def add_entity(self, entity_type, entity_id, **attributes):
         self.graph.add_node(entity_id, type=entity_type, **attributes)
+        self.index.on_node(entity_id, entity_type)
 
     def add_relationship(self, source_id, target_id, relationship_type, **attributes):
         self.graph.add_edge(source_id, target_id, key=relationship_type, **attributes)
+        self.index.on_edge(source_id, target_id)
 
     def get_neighbors(self, entity_id):
         return list(self.graph[entity_id])
@@ -19,6 +24,16 @@ class CyberGuardKnowledgeGraph:
         except nx.NetworkXNoPath:
             return None
 
+    # Index lookups (call index.rebuild() after editing self.graph directly)
+    def nodes_of_type(self, entity_type):
+        return self.index.nodes_of_type(entity_type)
+
+    def threats_reachable_from(self, entity_id):
+        return self.index.threats_reachable_from(entity_id)
+
+    def exposed_to(self, threat_id, entity_type=None):
+        return self.index.exposed_to(threat_id, entity_type)
+
     def get_graph(self):
         return self.graph
 
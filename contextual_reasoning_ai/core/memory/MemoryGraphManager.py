@@ -1,10 +1,39 @@
-from neo4j import GraphDatabase
+from neo4j.exceptions import Neo4jError
+from contextual_reasoning_ai.db.neo4j_connector import get_neo4j_driver
 from datetime import datetime
+import os
 import uuid
 
+# Relationship used when linking a WorkingMemory node to each memory label
+LINK_RELATIONS = {
+    "LongTermMemory": "REFERS_TO",
+    "SemanticMemory": "RELATES_TO",
+    "EpisodicMemory": "RECALLS"
+}
+
+# Full-text index over memory content (see db/init_neo4j.cql)
+FULLTEXT_INDEX = "memory_content_fulltext"
+
+_LUCENE_SPECIAL = set('+-&|!(){}[]^"~*?:\\/')
+
+
+def build_fulltext_query(keywords):
+    """
+    Turn keywords into a Lucene OR-query, escaping Lucene syntax characters.
+    """
+    terms = []
+    for keyword in keywords:
+        escaped = "".join(f"\\{c}" if c in _LUCENE_SPECIAL else c for c in keyword)
+        if escaped:
+            terms.append(escaped)
+    return " OR ".join(terms)
+
 class MemoryGraphManager:
-    def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+    def __init__(self, uri, user, password, related_limit=None):
+        # Sessions come from the shared process-wide pool (NEO4J_* env vars fill in defaults)
+        self.driver = get_neo4j_driver(uri, user, password)
+        # Only the top-N most relevant memories get linked to a new observation
+        self.related_limit = related_limit or int(os.getenv("RELATED_MEMORY_LIMIT", 25))
 
     def close(self):
         self.driver.close()
@@ -34,21 +63,40 @@ class MemoryGraphManager:
             return wm_node[0] if wm_node else None
 
     # ============================================================
-    # Find related memory nodes using simple keyword matching
+    # Find related memory nodes via the full-text index
     # ============================================================
-    def find_related_memories(self, keywords):
+    def find_related_memories(self, keywords, limit=None):
         """
-        Search LongTermMemory, SemanticMemory, and EpisodicMemory for matches.
+        Search LongTermMemory, SemanticMemory, and EpisodicMemory for matches
+        through the full-text index, best BM25 score first, capped at `limit`.
         """
+        limit = limit or self.related_limit
+        search = build_fulltext_query(keywords)
+        if not search:
+            return []
+
         query = """
-        MATCH (m)
-        WHERE (m:LongTermMemory OR m:SemanticMemory OR m:EpisodicMemory)
-          AND any(keyword IN $keywords WHERE toLower(m.content) CONTAINS toLower(keyword))
-        RETURN m
+        CALL db.index.fulltext.queryNodes($index_name, $search)
+        YIELD node, score
+        RETURN node AS m, score
+        LIMIT $limit
         """
-
         with self.driver.session() as session:
-            results = session.run(query, keywords=keywords)
+            try:
+                results = session.run(query, index_name=FULLTEXT_INDEX, search=search, limit=limit)
+                return [record["m"] for record in results]
+            except Neo4jError as e:
+                # Index not created yet: fall back to the substring scan, still capped
+                print(f"[WARN] Full-text index unavailable ({e.code}); using keyword scan.")
+
+            fallback_query = """
+            MATCH (m)
+            WHERE (m:LongTermMemory OR m:SemanticMemory OR m:EpisodicMemory)
+              AND any(keyword IN $keywords WHERE toLower(m.content) CONTAINS toLower(keyword))
+            RETURN m
+            LIMIT $limit
+            """
+            results = session.run(fallback_query, keywords=keywords, limit=limit)
             return [record["m"] for record in results]
 
     # ============================================================
@@ -57,23 +105,36 @@ class MemoryGraphManager:
     def link_memory(self, wm_id, related_nodes):
         """
         Link a new WorkingMemory node to relevant memories dynamically.
+        All links are written in one transaction with one UNWIND per target label
+        (relationship types can't be parameterized), and targets are matched by
+        labeled id lookups so the unique-id constraints' indexes are used.
         """
-        with self.driver.session() as session:
-            for node in related_nodes:
-                if "LongTermMemory" in node.labels:
-                    relation = "REFERS_TO"
-                elif "SemanticMemory" in node.labels:
-                    relation = "RELATES_TO"
-                elif "EpisodicMemory" in node.labels:
-                    relation = "RECALLS"
-                else:
-                    relation = "ASSOCIATED_WITH"
-
+        rows_by_target = {}
+        for node in related_nodes:
+            label = next((l for l in LINK_RELATIONS if l in node.labels), None)
+            if label:
+                relation = LINK_RELATIONS[label]
+            else:
+                label = sorted(node.labels)[0] if node.labels else None
+                relation = "ASSOCIATED_WITH"
+            rows_by_target.setdefault((label, relation), []).append({"id": node["id"]})
+
+        if not rows_by_target:
+            return
+
+        def _link(tx):
+            for (label, relation), rows in rows_by_target.items():
+                target = f"(target:{label} {{id: row.id}})" if label else "(target {id: row.id})"
                 query = f"""
-                MATCH (wm:WorkingMemory {{id: $wm_id}}), (target {{id: $target_id}})
+                MATCH (wm:WorkingMemory {{id: $wm_id}})
+                UNWIND $rows AS row
+                MATCH {target}
                 MERGE (wm)-[:{relation}]->(target)
                 """
-                session.run(query, wm_id=wm_id, target_id=node["id"])
+                tx.run(query, wm_id=wm_id, rows=rows).consume()
+
+        with self.driver.session() as session:
+            session.execute_write(_link)
 
     # ============================================================
     # High-level function to create and connect WorkingMemory
@@ -18,4 +18,24 @@
                 REQUIRE n.id IS UNIQUE
                 """
                 session.run(query)
+
+            # Full-text index used by MemoryGraphManager.find_related_memories
+            session.run("""
+            CREATE FULLTEXT INDEX memory_content_fulltext IF NOT EXISTS
+            FOR (m:LongTermMemory|SemanticMemory|EpisodicMemory)
+            ON EACH [m.content]
+            """)
         print("[Neo4j] Memory constraints ready.")
+
+    def initialize_vector_indexes(self, dimensions=384):
+        """
+        Create Neo4j 5 vector indexes over the `embedding` property of each memory label.
+        `dimensions` must match the embedding model (384 for all-MiniLM-L6-v2).
+        """
+        from contextual_reasoning_ai.core.cognition.neo4j_vector_search import vector_index_statements
+
+        print("[Neo4j] Initializing memory vector indexes...")
+        with self.driver.session() as session:
+            for statement in vector_index_statements(dimensions):
+                session.run(statement)
+        print("[Neo4j] Memory vector indexes ready.")
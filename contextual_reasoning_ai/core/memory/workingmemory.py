@@ -1,10 +1,11 @@
-from neo4j import GraphDatabase
+from contextual_reasoning_ai.db.neo4j_connector import get_neo4j_driver
 from datetime import datetime
 import uuid
 
 class MemoryGraph:
     def __init__(self, uri, user, password):
-        self.driver = GraphDatabase.driver(uri, auth=(user, password))
+        # Sessions come from the shared process-wide pool (NEO4J_* env vars fill in defaults)
+        self.driver = get_neo4j_driver(uri, user, password)
 
     def close(self):
         self.driver.close()
@@ -1,15 +1,200 @@
-from neo4j import GraphDatabase
+from neo4j import AsyncGraphDatabase, GraphDatabase
+import hashlib
 import os
+import threading
+import time
+
+# ======================================
+# Process-wide driver registry
+# ======================================
+# Every component takes its sessions from one shared driver (and so one
+# connection pool) per (uri, user, password) instead of opening its own.
+# The password only enters the key as a hash.
+# Pool settings come from the environment:
+#   NEO4J_MAX_POOL_SIZE                  max connections in the pool (default 50)
+#   NEO4J_CONNECTION_ACQUISITION_TIMEOUT seconds to wait for a free connection (default 60)
+#   NEO4J_LIVENESS_CHECK_TIMEOUT         re-check idle connections older than this many seconds
+#   NEO4J_MAX_CONNECTION_LIFETIME        seconds before a connection is retired (default 3600)
+
+_drivers = {}
+_async_drivers = {}
+_registry_lock = threading.Lock()
+
+
+def _registry_key(uri, user, password):
+    # Different credentials must never be handed another caller's driver
+    return (uri, user, hashlib.sha256(password.encode("utf-8")).hexdigest())
+
+
+def _pool_config():
+    config = {
+        "max_connection_pool_size": int(os.getenv("NEO4J_MAX_POOL_SIZE", 50)),
+        "connection_acquisition_timeout": float(os.getenv("NEO4J_CONNECTION_ACQUISITION_TIMEOUT", 60)),
+        "max_connection_lifetime": float(os.getenv("NEO4J_MAX_CONNECTION_LIFETIME", 3600)),
+    }
+    liveness = os.getenv("NEO4J_LIVENESS_CHECK_TIMEOUT")
+    if liveness is not None:
+        config["liveness_check_timeout"] = float(liveness)
+    return config
+
+
+class _TrackedSession:
+    """
+    Wraps a driver session to keep pool-usage counters up to date.
+    """
+
+    def __init__(self, owner, session):
+        self._owner = owner
+        self._session = session
+        self._opened_at = None
+
+    def __enter__(self):
+        self._session.__enter__()
+        self._opened_at = time.monotonic()
+        self._owner._session_opened()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            return self._session.__exit__(exc_type, exc, tb)
+        finally:
+            self._owner._session_closed(time.monotonic() - self._opened_at)
+
+    def __getattr__(self, name):
+        return getattr(self._session, name)
+
+
+class SharedDriver:
+    """
+    Proxy around a shared neo4j Driver. Behaves like the driver, but close()
+    is a no-op so one component shutting down can't pull the pool from under
+    the others; use close_all_drivers() at process exit.
+    """
+
+    def __init__(self, driver, uri, user, pool_size):
+        self._driver = driver
+        self.uri = uri
+        self.user = user
+        self.max_pool_size = pool_size
+        self._lock = threading.Lock()
+        self._active = 0
+        self._peak = 0
+        self._opened = 0
+        self._session_seconds = 0.0
+
+    def session(self, **kwargs):
+        return _TrackedSession(self, self._driver.session(**kwargs))
+
+    def _session_opened(self):
+        with self._lock:
+            self._active += 1
+            self._opened += 1
+            self._peak = max(self._peak, self._active)
+
+    def _session_closed(self, duration):
+        with self._lock:
+            self._active -= 1
+            self._session_seconds += duration
+
+    def metrics(self):
+        with self._lock:
+            return {
+                "uri": self.uri,
+                "max_pool_size": self.max_pool_size,
+                "active_sessions": self._active,
+                "peak_active_sessions": self._peak,
+                "sessions_opened": self._opened,
+                # Sessions, not connections: the driver exposes no pool counters, and
+                # each open session holds at most one connection at a time
+                "active_sessions_per_pool_slot": self._active / self.max_pool_size if self.max_pool_size else None,
+                "avg_session_seconds": self._session_seconds / self._opened if self._opened else 0.0,
+            }
+
+    def is_alive(self):
+        try:
+            self._driver.verify_connectivity()
+            return True
+        except Exception:
+            return False
+
+    def close(self):
+        pass
+
+    def __getattr__(self, name):
+        return getattr(self._driver, name)
+
+
+def get_neo4j_driver(uri=None, user=None, password=None):
+    """
+    Return the process-wide driver for these credentials, creating it on first use.
+    """
+    uri = uri or os.getenv("NEO4J_URI", "bolt://neo4j_db:7687")
+    user = user or os.getenv("NEO4J_USER", "neo4j")
+    password = password or os.getenv("NEO4J_PASSWORD", "securepassword")
+    key = _registry_key(uri, user, password)
+    with _registry_lock:
+        shared = _drivers.get(key)
+        if shared is None:
+            config = _pool_config()
+            driver = GraphDatabase.driver(uri, auth=(user, password), **config)
+            shared = SharedDriver(driver, uri, user, config["max_connection_pool_size"])
+            _drivers[key] = shared
+        return shared
+
+
+def get_async_neo4j_driver(uri=None, user=None, password=None):
+    """
+    Return the process-wide async driver for these credentials, for use from
+    coroutines (e.g. FastAPI async endpoints). Same pool settings as the sync
+    driver; the async driver has its own pool.
+    """
+    uri = uri or os.getenv("NEO4J_URI", "bolt://neo4j_db:7687")
+    user = user or os.getenv("NEO4J_USER", "neo4j")
+    password = password or os.getenv("NEO4J_PASSWORD", "securepassword")
+    key = _registry_key(uri, user, password)
+    with _registry_lock:
+        driver = _async_drivers.get(key)
+        if driver is None:
+            driver = AsyncGraphDatabase.driver(uri, auth=(user, password), **_pool_config())
+            _async_drivers[key] = driver
+        return driver
+
+
+def neo4j_pool_metrics():
+    with _registry_lock:
+        drivers = list(_drivers.values())
+    return [d.metrics() for d in drivers]
+
+
+def close_all_drivers():
+    with _registry_lock:
+        drivers = list(_drivers.values())
+        _drivers.clear()
+    for d in drivers:
+        d._driver.close()
+
+
+async def close_all_async_drivers():
+    with _registry_lock:
+        drivers = list(_async_drivers.values())
+        _async_drivers.clear()
+    for d in drivers:
+        await d.close()
+
 
 class Neo4jConnector:
     def __init__(self):
         self.uri = os.getenv("NEO4J_URI", "bolt://neo4j_db:7687")
         self.user = os.getenv("NEO4J_USER", "neo4j")
         self.password = os.getenv("NEO4J_PASSWORD", "securepassword")
-        self.driver = GraphDatabase.driver(self.uri, auth=(self.user, self.password))
+        self.driver = get_neo4j_driver(self.uri, self.user, self.password)
 
     def close(self):
         self.driver.close()
 
     def get_session(self):
         return self.driver.session()
+
+    def get_async_session(self):
+        """Async session for use with `async with` inside coroutines."""
+        return get_async_neo4j_driver(self.uri, self.user, self.password).session()
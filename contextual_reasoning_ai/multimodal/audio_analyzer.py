@@ -1,6 +1,9 @@
+import math
 import torch
 import torchaudio
 from transformers import Wav2Vec2Processor, Wav2Vec2ForCTC
+from .model_registry import get_resampler
+from .uploads import rewind
 
 class AudioAnalyzer:
     def __init__(self, model_name="facebook/wav2vec2-base-960h", device=None):
@@ -9,10 +12,10 @@ class AudioAnalyzer:
         self.model = Wav2Vec2ForCTC.from_pretrained(model_name).to(self.device)
 
     def analyze_audio(self, audio_path):
-        waveform, sample_rate = torchaudio.load(audio_path)
+        # Paths and file-like objects (e.g. BytesIO uploads) both work
+        waveform, sample_rate = torchaudio.load(rewind(audio_path))
         if sample_rate != 16000:
-            resampler = torchaudio.transforms.Resample(orig_freq=sample_rate, new_freq=16000)
-            waveform = resampler(waveform)
+            waveform = get_resampler(sample_rate, 16000)(waveform)
 
         input_values = self.processor(waveform.squeeze().numpy(), return_tensors="pt", sampling_rate=16000).input_values.to(self.device)
         with torch.no_grad():
@@ -20,4 +23,76 @@ class AudioAnalyzer:
 
         predicted_ids = torch.argmax(logits, dim=-1)
         transcription = self.processor.batch_decode(predicted_ids)[0]
-        return transcription
\ No newline at end of file
+        return transcription
+
+    def stream_transcription(self, audio_path, window_seconds=20.0, overlap_seconds=2.0, windows_per_batch=4):
+        """
+        Transcribe a long file window by window, yielding partial transcripts
+        ({"start", "end", "text"}) as soon as whole words are decoded.
+        Each window carries `overlap_seconds` of context on both sides; the CTC
+        frames of that context are trimmed so the kept pieces tile the file.
+        """
+        if window_seconds <= 2 * overlap_seconds:
+            raise ValueError("window_seconds must be larger than 2 * overlap_seconds")
+        info = torchaudio.info(rewind(audio_path))
+        sr, total = info.sample_rate, info.num_frames
+        chunk = int((window_seconds - 2 * overlap_seconds) * sr)
+        context = int(overlap_seconds * sr)
+
+        tokenizer = self.processor.tokenizer
+        delimiter = tokenizer.word_delimiter_token_id
+        pad = tokenizer.pad_token_id
+        pending_ids, pending_start, emitted_frames, last_id = [], 0.0, 0, None
+        frame_seconds = None
+
+        starts = range(0, total, chunk)
+        for b in range(0, len(starts), windows_per_batch):
+            # Decode only this batch of windows from disk
+            windows = []
+            for start in starts[b:b + windows_per_batch]:
+                load_start = max(0, start - context)
+                load_end = min(total, start + chunk + context)
+                waveform, _ = torchaudio.load(rewind(audio_path), frame_offset=load_start, num_frames=load_end - load_start)
+                waveform = waveform.mean(dim=0)
+                if sr != 16000:
+                    waveform = get_resampler(sr, 16000)(waveform)
+                left = (start - load_start) * 16000 / sr
+                right = (load_end - min(total, start + chunk)) * 16000 / sr
+                windows.append((waveform.numpy(), left, right))
+
+            inputs = self.processor([w for w, _, _ in windows], return_tensors="pt", sampling_rate=16000, padding=True)
+            with torch.no_grad():
+                logits = self.model(inputs.input_values.to(self.device)).logits
+            predicted = torch.argmax(logits, dim=-1).cpu()
+
+            padded = inputs.input_values.shape[1]
+            frames_per_sample = predicted.shape[1] / padded
+            frame_seconds = frame_seconds or 1.0 / (frames_per_sample * 16000)
+            for i, (audio, left, right) in enumerate(windows):
+                # Keep only the frames that belong to this window's own chunk
+                n_frames = math.ceil(len(audio) * frames_per_sample)
+                keep = predicted[i, round(left * frames_per_sample):max(0, n_frames - round(right * frames_per_sample))].tolist()
+                seam_last = keep[-1] if keep else last_id
+                # A token run cut by the seam is one CTC emission, not two: blank its
+                # continuation (frames stay, so timestamps don't drift); blanks are left alone
+                if last_id is not None and last_id != pad:
+                    run = 0
+                    while run < len(keep) and keep[run] == last_id:
+                        keep[run] = pad
+                        run += 1
+                last_id = seam_last
+                pending_ids.extend(keep)
+                emitted_frames += len(keep)
+
+            # Emit everything up to the last word boundary; the rest waits for the next batch
+            if delimiter in pending_ids:
+                cut = len(pending_ids) - pending_ids[::-1].index(delimiter)
+                end = (emitted_frames - (len(pending_ids) - cut)) * frame_seconds
+                text = self.processor.decode(pending_ids[:cut]).strip()
+                if text:
+                    yield {"start": round(pending_start, 2), "end": round(end, 2), "text": text}
+                pending_ids, pending_start = pending_ids[cut:], end
+
+        text = self.processor.decode(pending_ids).strip() if pending_ids else ""
+        if text:
+            yield {"start": round(pending_start, 2), "end": round(emitted_frames * (frame_seconds or 0.0), 2), "text": text}
\ No newline at end of file
@@ -1,23 +1,56 @@
+import threading
 import torch
 import clip
 from PIL import Image
 
+DEFAULT_PROMPTS = ("a computer", "a hacker", "a vulnerability", "a firewall", "a network attack")
+
 class ImageAnalyzer:
     def __init__(self, device="cuda" if torch.cuda.is_available() else "cpu"):
         self.device = device
         self.model, self.preprocess = clip.load("ViT-B/32", device=self.device)
+        # Prompt tuple -> normalized text features (oldest set evicted first)
+        self._text_feature_cache = {}
+        self._cache_lock = threading.Lock()
+        self.max_cached_prompt_sets = 64
 
     def analyze_image(self, image_path, text_prompts=None):
-        image = self.preprocess(Image.open(image_path)).unsqueeze(0).to(self.device)
-        if text_prompts is None:
-            text_prompts = ["a computer", "a hacker", "a vulnerability", "a firewall", "a network attack"]
+        return self.analyze_images([image_path], text_prompts)[0]
+
+    def analyze_images(self, image_paths, text_prompts=None, batch_size=32):
+        """
+        Score many images against the same prompts. Images are preprocessed and
+        stacked so each batch is one encode_image call; prompt features come
+        from the cache.
+        """
+        text_prompts = tuple(text_prompts or DEFAULT_PROMPTS)
+        text_features = self.text_features(text_prompts)
+        logit_scale = self.model.logit_scale.exp()
 
-        text = clip.tokenize(text_prompts).to(self.device)
-        with torch.no_grad():
-            image_features = self.model.encode_image(image)
-            text_features = self.model.encode_text(text)
-            logits_per_image, _ = self.model(image, text)
-            probs = logits_per_image.softmax(dim=-1).cpu().numpy()
+        results = []
+        for start in range(0, len(image_paths), batch_size):
+            # Entries may be paths or file-like objects (PIL reads both)
+            batch = torch.stack([self.preprocess(Image.open(p)) for p in image_paths[start:start + batch_size]]).to(self.device)
+            with torch.no_grad():
+                image_features = self.model.encode_image(batch)
+                image_features = image_features / image_features.norm(dim=-1, keepdim=True)
+                # Same logits as self.model(image, text), without encoding the image twice
+                probs = (logit_scale * image_features @ text_features.T).softmax(dim=-1).cpu().numpy()
+            for row in probs:
+                results.append(sorted(zip(text_prompts, row), key=lambda x: -x[1]))
+        return results
 
-        results = list(zip(text_prompts, probs[0]))
-        return sorted(results, key=lambda x: -x[1])
\ No newline at end of file
+    def text_features(self, text_prompts):
+        """L2-normalized CLIP text features for a prompt set, encoded once per set."""
+        key = tuple(text_prompts)
+        features = self._text_feature_cache.get(key)
+        if features is None:
+            text = clip.tokenize(list(key)).to(self.device)
+            with torch.no_grad():
+                features = self.model.encode_text(text)
+                features = features / features.norm(dim=-1, keepdim=True)
+            with self._cache_lock:
+                if len(self._text_feature_cache) >= self.max_cached_prompt_sets:
+                    self._text_feature_cache.pop(next(iter(self._text_feature_cache)))
+                self._text_feature_cache[key] = features
+        return features
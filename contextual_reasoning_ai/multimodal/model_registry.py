@@ -0,0 +1,121 @@
+# model_registry.py
+# Process-wide cache of loaded multimodal models.
+# Analyzers are built lazily on first use and shared by every caller that asks
+# for the same (model_name, device), so Wav2Vec2 weights are read from disk
+# once per process instead of once per request. Optionally, models that
+# haven't been used for MODEL_IDLE_UNLOAD_SECONDS are dropped to free memory
+# (they are reloaded on the next request).
+
+import os
+import threading
+import time
+
+DEFAULT_AUDIO_MODEL = "facebook/wav2vec2-base-960h"
+
+_models = {}          # key -> [instance, last_used]
+_loading_locks = {}   # key -> lock held while that model loads
+_registry_lock = threading.Lock()
+_resamplers = {}
+_reaper = None
+
+
+def _resolve_device(device):
+    if device:
+        return device
+    import torch
+    return "cuda" if torch.cuda.is_available() else "cpu"
+
+
+def _get_or_load(key, loader):
+    with _registry_lock:
+        entry = _models.get(key)
+        if entry is not None:
+            entry[1] = time.monotonic()
+            return entry[0]
+        load_lock = _loading_locks.setdefault(key, threading.Lock())
+
+    # Load outside the registry lock so other models stay available meanwhile;
+    # the per-key lock makes concurrent first requests share one load
+    with load_lock:
+        with _registry_lock:
+            entry = _models.get(key)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                return entry[0]
+        instance = loader()
+        with _registry_lock:
+            _models[key] = [instance, time.monotonic()]
+    _start_reaper()
+    return instance
+
+
+def get_audio_analyzer(model_name=DEFAULT_AUDIO_MODEL, device=None):
+    """Shared AudioAnalyzer for (model_name, device), loaded on first use."""
+    from .audio_analyzer import AudioAnalyzer
+
+    device = _resolve_device(device)
+    return _get_or_load(("audio", model_name, device), lambda: AudioAnalyzer(model_name=model_name, device=device))
+
+
+def get_resampler(orig_sr, new_sr=16000):
+    """Shared torchaudio Resample transform for one (orig_sr, new_sr) pair."""
+    key = (orig_sr, new_sr)
+    resampler = _resamplers.get(key)
+    if resampler is None:
+        import torchaudio
+        with _registry_lock:
+            resampler = _resamplers.get(key)
+            if resampler is None:
+                resampler = torchaudio.transforms.Resample(orig_freq=orig_sr, new_freq=new_sr)
+                _resamplers[key] = resampler
+    return resampler
+
+
+# ======================================
+# Idle unloading
+# ======================================
+def idle_unload_seconds():
+    return float(os.getenv("MODEL_IDLE_UNLOAD_SECONDS", 0))
+
+
+def unload_idle_models(max_idle=None):
+    """Drop models unused for `max_idle` seconds; returns the unloaded keys."""
+    max_idle = idle_unload_seconds() if max_idle is None else max_idle
+    now = time.monotonic()
+    with _registry_lock:
+        idle = [key for key, (_, last_used) in _models.items() if now - last_used >= max_idle]
+        for key in idle:
+            # Callers still holding the instance keep working; it is freed once they let go
+            del _models[key]
+    if idle:
+        print(f"[MODEL REGISTRY] Unloaded idle models: {idle}")
+    return idle
+
+
+def _reap():
+    while True:
+        max_idle = idle_unload_seconds()
+        time.sleep(max(1.0, min(60.0, max_idle / 2)))
+        unload_idle_models(max_idle)
+
+
+def _start_reaper():
+    global _reaper
+    if idle_unload_seconds() <= 0:
+        return
+    with _registry_lock:
+        if _reaper is None:
+            _reaper = threading.Thread(target=_reap, name="model-registry-reaper", daemon=True)
+            _reaper.start()
+
+
+def loaded_models():
+    now = time.monotonic()
+    with _registry_lock:
+        return [{"model": list(key), "idle_seconds": now - last_used} for key, (_, last_used) in _models.items()]
+
+
+def clear_models():
+    with _registry_lock:
+        _models.clear()
+        _resamplers.clear()
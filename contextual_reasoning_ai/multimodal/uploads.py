@@ -0,0 +1,57 @@
+# uploads.py
+# Hand uploaded media to the analyzers without a /tmp round trip.
+# PIL and torchaudio both read file-like objects, so an upload at or below
+# UPLOAD_SPOOL_THRESHOLD bytes (default 32 MiB) is passed through as-is.
+# Larger or non-seekable uploads are spooled to a uniquely named temp file
+# (so concurrent uploads with the same filename never collide), which is
+# removed again afterwards.
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+
+SPOOL_THRESHOLD_BYTES = int(os.getenv("UPLOAD_SPOOL_THRESHOLD", 32 << 20))
+
+
+def _size(fileobj):
+    try:
+        if not fileobj.seekable():
+            return None
+        position = fileobj.tell()
+        size = fileobj.seek(0, os.SEEK_END)
+        fileobj.seek(position)
+        return size
+    except (AttributeError, OSError):
+        return None
+
+
+def rewind(source):
+    """Seek a file-like source back to its start (paths are left alone)."""
+    if hasattr(source, "seek"):
+        source.seek(0)
+    return source
+
+
+@contextmanager
+def upload_source(fileobj, filename=None, always_spool=False):
+    """
+    Yield a path or file-like object the analyzers can read.
+    `always_spool` forces a temp file, for readers that outlive the request.
+    """
+    size = _size(fileobj)
+    if not always_spool and size is not None and size <= SPOOL_THRESHOLD_BYTES:
+        yield rewind(fileobj)
+        return
+
+    # Keep the extension: decoders use it to pick a format
+    suffix = os.path.splitext(filename or "")[1]
+    fd, path = tempfile.mkstemp(prefix="upload_", suffix=suffix)
+    try:
+        with os.fdopen(fd, "wb") as out:
+            if size is not None:
+                fileobj.seek(0)
+            shutil.copyfileobj(fileobj, out, 1 << 20)
+        yield path
+    finally:
+        os.remove(path)
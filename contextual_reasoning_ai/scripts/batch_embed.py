@@ -0,0 +1,248 @@
+# batch_embed.py
+# Resumable bulk backfill of embeddings for memory nodes that don't have one.
+#
+# Fetch, encode and write run as an overlapped producer/consumer pipeline:
+#   fetcher  -> pages nodes missing `embedding` by keyset pagination on `id`
+#   encoders -> (--workers threads) embed each page in one model batch
+#   writer   -> stores each page with a single UNWIND ... SET transaction
+# The last committed id per label is checkpointed, so an interrupted run
+# picks up where it stopped. A saved ANN index (VECTOR_INDEX_PATH) is marked
+# stale afterwards; a running server picks the new nodes up on its next
+# rebuild (see VECTOR_INDEX_MAX_AGE_SECONDS).
+#
+# Usage (from the project root):
+#   python -m contextual_reasoning_ai.scripts.batch_embed --workers 4 --page-size 1000
+
+import argparse
+import json
+import os
+import queue
+import threading
+import time
+
+MEMORY_LABELS = ["WorkingMemory", "LongTermMemory", "EpisodicMemory", "SemanticMemory", "ProceduralMemory"]
+
+_DONE = object()
+
+
+class Checkpoint:
+    """
+    Per-label high-water mark of committed ids. Pages can finish out of order
+    when several encoders run, so a page only advances the mark once every
+    earlier page of the same label has been written.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.last_ids = {}
+        if path and os.path.exists(path):
+            with open(path) as f:
+                self.last_ids = json.load(f)
+        self._next_seq = {}
+        self._finished = {}
+        self._lock = threading.Lock()
+
+    def start_id(self, label):
+        return self.last_ids.get(label, "")
+
+    def page_written(self, label, seq, last_id):
+        with self._lock:
+            finished = self._finished.setdefault(label, {})
+            finished[seq] = last_id
+            next_seq = self._next_seq.get(label, 0)
+            while next_seq in finished:
+                self.last_ids[label] = finished.pop(next_seq)
+                next_seq += 1
+            self._next_seq[label] = next_seq
+            self._save()
+
+    def _save(self):
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(self.last_ids, f)
+        os.replace(tmp, self.path)
+
+
+class BackfillPipeline:
+    def __init__(self, manager, labels, page_size=1000, workers=2, checkpoint=None, limit=None, report_every=10.0):
+        self.manager = manager
+        self.labels = labels
+        self.page_size = page_size
+        self.workers = max(1, workers)
+        self.checkpoint = checkpoint or Checkpoint(None)
+        self.limit = limit
+        self.report_every = report_every
+
+        # Bounded queues give backpressure: fetching never runs far ahead of writing
+        self._pages = queue.Queue(maxsize=self.workers * 2)
+        self._encoded = queue.Queue(maxsize=self.workers * 2)
+        self._stop = threading.Event()
+        self._errors = []
+        self.fetched = 0
+        self.written = 0
+        self._started = None
+
+    # ------------------------
+    # Pipeline stages
+    # ------------------------
+    def _fetch(self):
+        try:
+            with self.manager.driver.session() as session:
+                for label in self.labels:
+                    query = f"""
+                    MATCH (n:{label})
+                    WHERE n.embedding IS NULL AND n.content IS NOT NULL AND n.id > $last_id
+                    RETURN n.id AS id, n.content AS content
+                    ORDER BY n.id
+                    LIMIT $page_size
+                    """
+                    last_id = self.checkpoint.start_id(label)
+                    seq = 0
+                    while not self._stop.is_set():
+                        page_size = self.page_size
+                        if self.limit is not None:
+                            page_size = min(page_size, self.limit - self.fetched)
+                            if page_size <= 0:
+                                return
+                        rows = [(r["id"], r["content"]) for r in session.run(query, last_id=last_id, page_size=page_size)]
+                        if not rows:
+                            break
+                        last_id = rows[-1][0]
+                        self.fetched += len(rows)
+                        if not self._put(self._pages, (label, seq, rows)):
+                            return
+                        seq += 1
+        except Exception as e:
+            self._fail(e)
+        finally:
+            for _ in range(self.workers):
+                self._put(self._pages, _DONE)
+
+    def _encode(self):
+        try:
+            while not self._stop.is_set():
+                try:
+                    item = self._pages.get(timeout=0.5)
+                except queue.Empty:
+                    continue
+                if item is _DONE:
+                    break
+                label, seq, rows = item
+                embeddings = self.manager.embed_texts([content for _, content in rows])
+                self._encoded.put((label, seq, rows, embeddings))
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._encoded.put(_DONE)
+
+    def _write(self):
+        remaining_encoders = self.workers
+        last_report = time.monotonic()
+        while remaining_encoders:
+            item = self._encoded.get()
+            if item is _DONE:
+                remaining_encoders -= 1
+                continue
+            if self._stop.is_set():
+                continue
+            label, seq, rows, embeddings = item
+            try:
+                self.manager.store_embeddings_batch(label, [node_id for node_id, _ in rows], embeddings)
+            except Exception as e:
+                self._fail(e)
+                continue
+            self.written += len(rows)
+            self.checkpoint.page_written(label, seq, rows[-1][0])
+            if time.monotonic() - last_report >= self.report_every:
+                self.report()
+                last_report = time.monotonic()
+
+    def _put(self, q, item):
+        """Blocking put that gives up once the pipeline is stopping."""
+        while True:
+            try:
+                q.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                if self._stop.is_set():
+                    return False
+
+    def _fail(self, error):
+        self._errors.append(error)
+        self._stop.set()
+
+    # ------------------------
+    # Driver
+    # ------------------------
+    def throughput(self):
+        elapsed = time.monotonic() - self._started if self._started else 0.0
+        return (self.written / elapsed) if elapsed > 0 else 0.0, elapsed
+
+    def report(self):
+        rate, elapsed = self.throughput()
+        print(f"[BATCH EMBED] fetched={self.fetched} written={self.written} "
+              f"elapsed={elapsed:.1f}s throughput={rate:.1f} nodes/sec")
+
+    def run(self):
+        self._started = time.monotonic()
+        threads = [threading.Thread(target=self._fetch, name="fetcher")]
+        threads += [threading.Thread(target=self._encode, name=f"encoder-{i}") for i in range(self.workers)]
+        for t in threads:
+            t.start()
+        self._write()
+        for t in threads:
+            t.join()
+        self.report()
+        if self._errors:
+            raise self._errors[0]
+        return self.written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Backfill embeddings for memory nodes in Neo4j")
+    parser.add_argument("--labels", nargs="+", default=MEMORY_LABELS, help="Memory labels to backfill")
+    parser.add_argument("--page-size", type=int, default=1000, help="Nodes fetched, encoded and written per batch")
+    parser.add_argument("--workers", type=int, default=2, help="Number of concurrent encode workers")
+    parser.add_argument("--checkpoint", type=str, default="batch_embed_checkpoint.json", help="Checkpoint file for resuming")
+    parser.add_argument("--reset", action="store_true", help="Ignore an existing checkpoint")
+    parser.add_argument("--limit", type=int, default=None, help="Stop after this many nodes")
+    parser.add_argument("--model", type=str, default="all-MiniLM-L6-v2", help="Sentence-transformers model name")
+    parser.add_argument("--report-every", type=float, default=10.0, help="Seconds between progress reports")
+    args = parser.parse_args()
+
+    if args.reset and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+
+    # Imported here so the pipeline itself loads without the model stack
+    from contextual_reasoning_ai.core.cognition.embeddings import EmbeddingManager
+
+    # Per-text micro-batching would only add latency here; pages are already batches.
+    # The brute-force backend keeps this process away from the server's ANN index
+    # file, which its close() would otherwise overwrite with a stale copy
+    manager = EmbeddingManager(model_name=args.model, batching=False, similarity_backend="brute_force")
+    try:
+        pipeline = BackfillPipeline(
+            manager,
+            labels=args.labels,
+            page_size=args.page_size,
+            workers=args.workers,
+            checkpoint=Checkpoint(args.checkpoint),
+            limit=args.limit,
+            report_every=args.report_every,
+        )
+        written = pipeline.run()
+        print(f"[BATCH EMBED] Done. {written} nodes embedded.")
+        index_path = os.getenv("VECTOR_INDEX_PATH")
+        if written and index_path:
+            # The saved ANN index doesn't know about these nodes; make the server rebuild it
+            from contextual_reasoning_ai.core.cognition.vector_index import VectorIndex
+            VectorIndex.mark_stale(index_path)
+            print(f"[BATCH EMBED] Marked the vector index at {index_path} stale.")
+    finally:
+        manager.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+import wave
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+from multimodal.audio_analyzer import AudioAnalyzer
+
+# Fake CTC vocabulary: 0 = pad / blank, 4 = word delimiter
+PAD, DELIMITER = 0, 4
+CHARS = {5: "a", 6: "b", 7: "c"}
+SAMPLES_PER_FRAME = 320  # 20 ms at 16 kHz, like Wav2Vec2
+
+
+class FakeProcessor:
+    tokenizer = SimpleNamespace(word_delimiter_token_id=DELIMITER, pad_token_id=PAD)
+
+    def __call__(self, arrays, return_tensors="pt", sampling_rate=16000, padding=True):
+        values = torch.zeros(len(arrays), max(len(a) for a in arrays))
+        for i, audio in enumerate(arrays):
+            values[i, :len(audio)] = torch.as_tensor(audio)
+        return SimpleNamespace(input_values=values)
+
+    def decode(self, ids):
+        text, previous = [], None
+        for token in ids:
+            if token != previous and token != PAD:
+                text.append(" " if token == DELIMITER else CHARS[token])
+            previous = token
+        return "".join(text)
+
+
+class FakeModel:
+    """Emits, for every 20 ms frame, the token whose id is encoded in the sample amplitude."""
+
+    def __call__(self, input_values):
+        frames = input_values.unfold(1, SAMPLES_PER_FRAME, SAMPLES_PER_FRAME).mean(-1)
+        ids = torch.round(frames * 100).long().clamp(0, 7)
+        return SimpleNamespace(logits=torch.nn.functional.one_hot(ids, 8).float())
+
+
+def write_frames(path, frame_ids):
+    samples = np.repeat(np.asarray(frame_ids, dtype=np.float64) / 100, SAMPLES_PER_FRAME)
+    with wave.open(path, "wb") as f:
+        f.setnchannels(1)
+        f.setsampwidth(2)
+        f.setframerate(16000)
+        f.writeframes(np.round(samples * 32767).astype("<i2").tobytes())
+
+
+class TestStreamTranscription(unittest.TestCase):
+    def setUp(self):
+        self.analyzer = AudioAnalyzer.__new__(AudioAnalyzer)
+        self.analyzer.processor = FakeProcessor()
+        self.analyzer.model = FakeModel()
+        self.analyzer.device = "cpu"
+        fd, self.path = tempfile.mkstemp(suffix=".wav")
+        os.close(fd)
+
+    def tearDown(self):
+        os.remove(self.path)
+
+    def test_seams_do_not_duplicate_tokens_or_shift_timestamps(self):
+        # 1 s windows with 0.1 s context keep 40 frames each: seams at frames 40 and 80
+        frames = (
+            [PAD] * 10 + [7] * 5 + [DELIMITER] * 5 + [PAD] * 16
+            + [5] * 8                    # "a" run cut by the seam at frame 40
+            + [DELIMITER] * 6 + [PAD] * 26
+            + [6] * 3 + [PAD] * 3        # "b", blank across the seam at frame 80, "b"
+            + [6] * 4 + [DELIMITER] * 4 + [PAD] * 20
+            + [7] * 5 + [PAD] * 5
+        )
+        self.assertEqual(len(frames), 120)
+        write_frames(self.path, frames)
+
+        pieces = list(self.analyzer.stream_transcription(self.path, window_seconds=1.0, overlap_seconds=0.1, windows_per_batch=1))
+        self.assertEqual([p["text"] for p in pieces], ["c", "a", "bb", "c"])
+        self.assertEqual([(p["start"], p["end"]) for p in pieces], [(0.0, 0.5), (0.5, 1.0), (1.0, 1.8), (1.8, 2.4)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import json
+import os
+import tempfile
+import threading
+import unittest
+
+from scripts.batch_embed import BackfillPipeline, Checkpoint
+
+
+class FakeSession:
+    def __init__(self, store):
+        self.store = store
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, last_id, page_size):
+        label = query.split("MATCH (n:")[1].split(")")[0]
+        nodes = self.store.nodes[label]
+        with self.store.lock:
+            ids = sorted(i for i in nodes if nodes[i] is None and i > last_id)
+        return [{"id": i, "content": f"content of {i}"} for i in ids[:page_size]]
+
+
+class FakeManager:
+    """Neo4j + model stand-in: nodes map id -> embedding (None until written)."""
+
+    def __init__(self, labels):
+        self.nodes = {label: {f"{label[:2].lower()}_{i:04d}": None for i in range(20)} for label in labels}
+        self.lock = threading.Lock()
+        self.encoded = []
+        self.driver = self
+
+    def session(self):
+        return FakeSession(self)
+
+    def embed_texts(self, texts):
+        with self.lock:
+            self.encoded.extend(texts)
+        return [[float(len(t))] for t in texts]
+
+    def store_embeddings_batch(self, label, node_ids, embeddings):
+        with self.lock:
+            for node_id, embedding in zip(node_ids, embeddings):
+                self.nodes[label][node_id] = embedding
+
+
+class TestBackfillPipeline(unittest.TestCase):
+    def setUp(self):
+        fd, self.path = tempfile.mkstemp(suffix=".json")
+        os.close(fd)
+        os.remove(self.path)
+
+    def tearDown(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+    def test_resume_skips_already_embedded_ids(self):
+        labels = ["SemanticMemory", "EpisodicMemory"]
+        manager = FakeManager(labels)
+
+        # First run is cut short after 6 nodes
+        first = BackfillPipeline(manager, labels, page_size=3, workers=2, checkpoint=Checkpoint(self.path), limit=6)
+        self.assertEqual(first.run(), 6)
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"SemanticMemory": "se_0005"})
+
+        # The resumed run starts after the checkpoint and never re-encodes those nodes
+        encoded_before = list(manager.encoded)
+        resumed = BackfillPipeline(manager, labels, page_size=3, workers=3, checkpoint=Checkpoint(self.path))
+        self.assertEqual(resumed.run(), 34)
+        resumed_texts = manager.encoded[len(encoded_before):]
+        self.assertFalse(set(resumed_texts) & set(encoded_before))
+        self.assertTrue(all(e is not None for nodes in manager.nodes.values() for e in nodes.values()))
+        with open(self.path) as f:
+            self.assertEqual(json.load(f), {"SemanticMemory": "se_0019", "EpisodicMemory": "ep_0019"})
+
+    def test_checkpoint_waits_for_earlier_pages(self):
+        checkpoint = Checkpoint(None)
+        checkpoint.page_written("SemanticMemory", 1, "se_0005")
+        self.assertEqual(checkpoint.start_id("SemanticMemory"), "")
+        checkpoint.page_written("SemanticMemory", 0, "se_0002")
+        self.assertEqual(checkpoint.start_id("SemanticMemory"), "se_0005")
+
+
+if __name__ == "__main__":
+    unittest.main()
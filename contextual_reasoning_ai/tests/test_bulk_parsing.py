@@ -0,0 +1,44 @@
+import asyncio
+import unittest
+
+from api.bulk import iter_bulk_items, iter_chunks
+
+
+async def stream(*parts):
+    for part in parts:
+        yield part
+
+
+def collect(body, content_type=None, chunk_size=None):
+    async def run():
+        items = iter_bulk_items(body, content_type)
+        if chunk_size:
+            return [chunk async for chunk in iter_chunks(items, chunk_size)]
+        return [item async for item in items]
+    return asyncio.run(run())
+
+
+class TestBulkParsing(unittest.TestCase):
+    def test_ndjson_lines_split_across_chunks(self):
+        body = stream(b'{"text": "fir', b'st"}\n\n{"text": "second"}\n', b'"third"')
+        items = collect(body, "application/x-ndjson")
+        self.assertEqual(items, [(0, {"text": "first"}, None), (1, {"text": "second"}, None), (2, "third", None)])
+
+    def test_bad_line_reports_error_and_continues(self):
+        items = collect(stream(b'{"text": "ok"}\n{broken\n{"text": "also ok"}\n'))
+        self.assertIsNone(items[0][2])
+        self.assertTrue(items[1][2].startswith("Invalid JSON"))
+        self.assertEqual(items[2][1], {"text": "also ok"})
+
+    def test_json_array_and_chunking(self):
+        chunks = collect(stream(b'  [{"text": "a"}, ', b'{"text": "b"}, {"text": "c"}]'), "application/json", chunk_size=2)
+        self.assertEqual([len(c) for c in chunks], [2, 1])
+        self.assertEqual(chunks[1][0], (2, {"text": "c"}, None))
+
+    def test_malformed_array_raises(self):
+        with self.assertRaises(ValueError):
+            collect(stream(b'[{"text": "a"},'))
+
+
+if __name__ == "__main__":
+    unittest.main()
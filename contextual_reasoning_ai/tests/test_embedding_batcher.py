@@ -0,0 +1,100 @@
+import threading
+import unittest
+
+from core.cognition.embedding_batcher import EmbeddingBatcher
+
+
+class RecordingEncoder:
+    def __init__(self):
+        self.calls = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def __call__(self, texts):
+        self.release.wait()
+        self.calls.append(list(texts))
+        return [f"vec:{t}" for t in texts]
+
+
+class TestEmbeddingBatcher(unittest.TestCase):
+    def test_concurrent_texts_are_coalesced_in_order(self):
+        encoder = RecordingEncoder()
+        encoder.release.clear()
+        batcher = EmbeddingBatcher(encoder, max_batch_size=8, max_wait_ms=50)
+        # The first text occupies the worker; the rest queue up behind it
+        first = batcher.submit("t0")
+        futures = [batcher.submit(f"t{i}") for i in range(1, 17)]
+        encoder.release.set()
+
+        self.assertEqual(first.result(timeout=5), "vec:t0")
+        self.assertEqual([f.result(timeout=5) for f in futures], [f"vec:t{i}" for i in range(1, 17)])
+        self.assertEqual([t for call in encoder.calls for t in call], [f"t{i}" for i in range(17)])
+        self.assertTrue(all(len(call) <= 8 for call in encoder.calls))
+        self.assertLess(len(encoder.calls), 17)
+        self.assertEqual(batcher.stats()["items"], 17)
+        batcher.close()
+
+    def test_encode_errors_reach_every_caller(self):
+        def failing(texts):
+            raise ValueError("model exploded")
+
+        batcher = EmbeddingBatcher(failing, max_batch_size=4, max_wait_ms=20)
+        futures = [batcher.submit(f"t{i}") for i in range(3)]
+        for f in futures:
+            with self.assertRaises(ValueError):
+                f.result(timeout=5)
+        batcher.close()
+
+    def test_cancelled_callers_do_not_stop_the_worker(self):
+        encoder = RecordingEncoder()
+        encoder.release.clear()
+        batcher = EmbeddingBatcher(encoder, max_batch_size=4, max_wait_ms=20)
+        blocker = batcher.submit("t0")
+        cancelled = batcher.submit("gone")
+        self.assertTrue(cancelled.cancel())
+        kept = batcher.submit("t1")
+        encoder.release.set()
+
+        self.assertEqual(blocker.result(timeout=5), "vec:t0")
+        self.assertEqual(kept.result(timeout=5), "vec:t1")
+        self.assertNotIn("gone", [t for call in encoder.calls for t in call])
+        self.assertEqual(batcher.embed("t2", timeout=5), "vec:t2")
+        batcher.close()
+
+    def test_short_encode_result_fails_whole_batch(self):
+        encoder = RecordingEncoder()
+        encoder.release.clear()
+        batcher = EmbeddingBatcher(lambda texts: encoder(texts)[:-1], max_batch_size=4, max_wait_ms=50)
+        futures = [batcher.submit(f"t{i}") for i in range(3)]
+        encoder.release.set()
+        for f in futures:
+            with self.assertRaises(RuntimeError):
+                f.result(timeout=5)
+        batcher.close()
+
+    def test_submits_racing_close_never_hang(self):
+        batcher = EmbeddingBatcher(RecordingEncoder(), max_batch_size=4, max_wait_ms=1)
+        futures = []
+
+        def producer():
+            for i in range(200):
+                try:
+                    futures.append(batcher.submit(f"t{i}"))
+                except RuntimeError:
+                    return  # closed
+
+        threads = [threading.Thread(target=producer) for _ in range(4)]
+        for t in threads:
+            t.start()
+        batcher.close()
+        for t in threads:
+            t.join()
+        # Everything accepted before close() is still embedded
+        for f in futures:
+            self.assertTrue(f.result(timeout=5).startswith("vec:"))
+        with self.assertRaises(RuntimeError):
+            batcher.submit("late")
+
+
+if __name__ == "__main__":
+    unittest.main()
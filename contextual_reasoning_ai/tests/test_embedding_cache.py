@@ -0,0 +1,73 @@
+import os
+import tempfile
+import unittest
+
+import numpy as np
+
+from core.cognition.embedding_cache import DiskEmbeddingStore, EmbeddingCache
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    def test_lru_eviction_and_counters(self):
+        cache = EmbeddingCache("model-a", max_entries=2)
+        cache.put_many(["one", "two", "three"], np.eye(3, dtype=np.float32))
+        self.assertIsNone(cache.get("one"))
+        np.testing.assert_array_equal(cache.get("three"), [0, 0, 1])
+        stats = cache.stats()
+        self.assertEqual(stats["memory_hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+
+    def test_whitespace_normalization(self):
+        cache = EmbeddingCache("model-a")
+        cache.put("Login failure from unknown IP", [1.0, 2.0])
+        self.assertIsNotNone(cache.get("  Login failure  from unknown IP "))
+
+    def test_disk_tier_survives_restart_and_model_change(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = EmbeddingCache("model-a", max_entries=1, disk_path=path, dim=3)
+            cache.put_many(["alpha", "beta"], np.eye(3, dtype=np.float32)[:2])
+            cache.close()
+
+            reopened = EmbeddingCache("model-a", max_entries=1, disk_path=path, dim=3)
+            np.testing.assert_array_equal(reopened.get("alpha"), [1, 0, 0])
+            self.assertEqual(reopened.stats()["disk_hits"], 1)
+
+            reopened.set_model("model-b")
+            self.assertIsNone(reopened.get("alpha"))
+            self.assertEqual(reopened.stats()["disk_entries"], 0)
+            reopened.close()
+
+    def test_disk_tier_is_bounded(self):
+        with tempfile.TemporaryDirectory() as path:
+            cache = EmbeddingCache("model-a", max_entries=1, disk_path=path, dim=3, max_disk_entries=2)
+            cache.put_many(["alpha", "beta", "gamma"], np.eye(3, dtype=np.float32))
+            self.assertEqual(cache.stats()["disk_entries"], 2)
+            cache.close()
+            reopened = EmbeddingCache("model-a", max_entries=1, disk_path=path, dim=3, max_disk_entries=2)
+            self.assertIsNone(reopened.get("gamma"))
+            np.testing.assert_array_equal(reopened.get("beta"), [0, 1, 0])
+            reopened.close()
+
+    def test_partial_key_line_is_dropped_on_open(self):
+        with tempfile.TemporaryDirectory() as path:
+            store = DiskEmbeddingStore(path, "model-a", dim=3)
+            store.put_many([("k1", np.ones(3)), ("k2", np.full(3, 2.0))])
+            store.close()
+            # Simulate a crash halfway through appending the next key
+            with open(os.path.join(path, "keys.txt"), "a") as f:
+                f.write("k3-trunc")
+
+            store = DiskEmbeddingStore(path, "model-a", dim=3)
+            self.assertEqual(len(store), 2)
+            store.put("k4", np.full(3, 4.0))
+            store.close()
+
+            store = DiskEmbeddingStore(path, "model-a", dim=3)
+            self.assertEqual(len(store), 3)
+            np.testing.assert_array_equal(store.get("k4"), [4, 4, 4])
+            np.testing.assert_array_equal(store.get("k2"), [2, 2, 2])
+            store.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
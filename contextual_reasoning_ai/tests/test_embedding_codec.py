@@ -0,0 +1,31 @@
+import unittest
+
+import numpy as np
+
+from core.cognition.embedding_codec import decode_embedding, decode_embeddings, encode_embedding
+
+
+class TestEmbeddingCodec(unittest.TestCase):
+    def setUp(self):
+        self.vec = np.random.default_rng(7).normal(size=384).astype(np.float32)
+
+    def test_float32_round_trip_is_exact_and_compact(self):
+        packed = encode_embedding(self.vec, "float32")
+        self.assertEqual(len(packed), 4 + 384 * 4)
+        np.testing.assert_array_equal(decode_embedding(bytearray(packed)), self.vec)
+
+    def test_int8_round_trip_is_close(self):
+        packed = encode_embedding(self.vec, "int8")
+        self.assertEqual(len(packed), 8 + 384)
+        decoded = decode_embedding(packed)
+        self.assertLess(np.max(np.abs(decoded - self.vec)), np.max(np.abs(self.vec)) / 127)
+
+    def test_legacy_lists_still_decode(self):
+        decoded = decode_embeddings([self.vec.tolist(), encode_embedding(self.vec, "float32")])
+        self.assertEqual(decoded.shape, (2, 384))
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_allclose(decoded[0], decoded[1])
+
+
+if __name__ == "__main__":
+    unittest.main()
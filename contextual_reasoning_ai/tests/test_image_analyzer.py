@@ -0,0 +1,78 @@
+import io
+import unittest
+from unittest import mock
+
+import torch
+from PIL import Image
+
+from multimodal import image_analyzer
+from multimodal.image_analyzer import ImageAnalyzer
+
+
+class FakeClipModel:
+    """Maps every prompt to its own one-hot feature and every image to the first."""
+
+    def __init__(self, dim=8):
+        self.dim = dim
+        self.logit_scale = torch.tensor(0.0)
+        self.text_calls = []
+        self.image_calls = 0
+
+    def encode_text(self, tokens):
+        self.text_calls.append(tokens.shape[0])
+        return torch.eye(self.dim)[:tokens.shape[0]] * 3.0
+
+    def encode_image(self, batch):
+        self.image_calls += 1
+        features = torch.zeros(batch.shape[0], self.dim)
+        features[:, 0] = 2.0
+        return features
+
+
+def fake_preprocess(image):
+    return torch.zeros(3, 4, 4)
+
+
+def png_bytes():
+    buf = io.BytesIO()
+    Image.new("RGB", (4, 4)).save(buf, format="PNG")
+    buf.seek(0)
+    return buf
+
+
+class TestImageAnalyzerTextCache(unittest.TestCase):
+    def setUp(self):
+        self.model = FakeClipModel()
+        patcher = mock.patch.object(image_analyzer.clip, "load", return_value=(self.model, fake_preprocess))
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.analyzer = ImageAnalyzer(device="cpu")
+
+    def test_repeated_prompt_set_encoded_once(self):
+        prompts = ["a firewall", "a hacker"]
+        first = self.analyzer.analyze_image(png_bytes(), prompts)
+        second = self.analyzer.analyze_images([png_bytes(), png_bytes()], tuple(prompts))
+        self.assertEqual(self.model.text_calls, [2])
+        self.assertEqual(first[0][0], "a firewall")
+        self.assertEqual([r[0][0] for r in second], ["a firewall", "a firewall"])
+
+        # A different prompt set is a separate entry
+        self.analyzer.analyze_image(png_bytes(), ["a computer"])
+        self.assertEqual(self.model.text_calls, [2, 1])
+
+    def test_features_are_normalized(self):
+        features = self.analyzer.text_features(["a computer", "a firewall"])
+        self.assertTrue(torch.allclose(features.norm(dim=-1), torch.ones(2)))
+
+    def test_oldest_prompt_set_evicted(self):
+        self.analyzer.max_cached_prompt_sets = 2
+        self.analyzer.text_features(["a"])
+        self.analyzer.text_features(["b"])
+        self.analyzer.text_features(["c"])
+        self.assertEqual(list(self.analyzer._text_feature_cache), [("b",), ("c",)])
+        self.analyzer.text_features(["a"])
+        self.assertEqual(len(self.model.text_calls), 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
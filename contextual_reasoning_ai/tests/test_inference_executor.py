@@ -0,0 +1,41 @@
+import asyncio
+import threading
+import unittest
+
+from api.executors import InferenceBusyError, InferenceExecutor
+
+
+class TestInferenceExecutor(unittest.TestCase):
+    def test_rejects_beyond_workers_plus_pending(self):
+        executor = InferenceExecutor("test", workers=1, max_pending=1)
+        release = threading.Event()
+        running = executor.submit(release.wait)
+        queued = executor.submit(lambda: "done")
+        with self.assertRaises(InferenceBusyError):
+            executor.submit(lambda: "too many")
+        self.assertEqual(executor.stats()["rejected"], 1)
+
+        release.set()
+        running.result(timeout=1)
+        self.assertEqual(queued.result(timeout=1), "done")
+        # Slots come back once the work finishes
+        self.assertEqual(executor.submit(lambda: 42).result(timeout=1), 42)
+        executor.shutdown()
+
+    def test_run_does_not_block_event_loop(self):
+        executor = InferenceExecutor("test", workers=1, max_pending=0)
+        release = threading.Event()
+
+        async def scenario():
+            slow = asyncio.ensure_future(executor.run(release.wait, 1))
+            await asyncio.sleep(0)
+            # The loop is still free while the slow call holds the only worker
+            release.set()
+            return await slow
+
+        self.assertTrue(asyncio.run(scenario()))
+        executor.shutdown()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,109 @@
+import queue
+import threading
+import unittest
+
+from core.cognitive.ingest_buffer import IngestBuffer
+
+
+class RecordingGraph:
+    def __init__(self, fail_batches=False):
+        self.fail_batches = fail_batches
+        self.batches = []
+        self.singles = []
+        self.release = threading.Event()
+        self.release.set()
+
+    def process_observation_batch(self, observations):
+        self.release.wait()
+        if self.fail_batches:
+            raise RuntimeError("batch write failed")
+        self.batches.append([o["wm_id"] for o in observations])
+
+    def process_new_observation(self, content, keywords, wm_id=None):
+        self.singles.append(wm_id)
+
+
+def observation(i):
+    return {"wm_id": f"wm_{i}", "content": f"event {i}", "keywords": ["event"]}
+
+
+class TestIngestBuffer(unittest.TestCase):
+    def test_close_flushes_everything_in_batches(self):
+        graph = RecordingGraph()
+        buffer = IngestBuffer(graph, max_batch_size=10, flush_interval_ms=20)
+        for i in range(35):
+            buffer.submit(observation(i))
+        buffer.close()
+        written = [wm_id for batch in graph.batches for wm_id in batch]
+        self.assertEqual(written, [f"wm_{i}" for i in range(35)])
+        self.assertTrue(all(len(batch) <= 10 for batch in graph.batches))
+        self.assertEqual(buffer.stats()["written"], 35)
+
+    def test_full_queue_pushes_back(self):
+        graph = RecordingGraph()
+        graph.release.clear()
+        buffer = IngestBuffer(graph, max_queue_size=2, max_batch_size=1, put_timeout=0.05)
+        with self.assertRaises(queue.Full):
+            for i in range(10):
+                buffer.submit(observation(i))
+        graph.release.set()
+        buffer.close()
+
+    def test_close_timeout_reports_unflushed(self):
+        graph = RecordingGraph()
+        graph.release.clear()
+        buffer = IngestBuffer(graph, max_batch_size=2)
+        for i in range(5):
+            buffer.submit(observation(i))
+        self.assertEqual(buffer.close(timeout=0.1), 5)
+        graph.release.set()
+        self.assertEqual(buffer.close(), 0)
+        self.assertEqual(buffer.stats()["written"], 5)
+
+    def test_failed_batch_is_retried_individually(self):
+        graph = RecordingGraph(fail_batches=True)
+        buffer = IngestBuffer(graph, max_batch_size=5)
+        for i in range(3):
+            buffer.submit(observation(i))
+        buffer.close()
+        self.assertEqual(sorted(graph.singles), ["wm_0", "wm_1", "wm_2"])
+
+    def test_dropped_observations_are_logged(self):
+        class FailingGraph(RecordingGraph):
+            def process_new_observation(self, content, keywords, wm_id=None):
+                raise RuntimeError("node write failed")
+
+        buffer = IngestBuffer(FailingGraph(fail_batches=True), max_batch_size=5)
+        with self.assertLogs("core.cognitive.ingest_buffer", level="ERROR") as logs:
+            buffer.submit(observation(0))
+            buffer.close()
+        self.assertIn("wm_0", logs.output[0])
+        self.assertEqual(buffer.stats()["failed"], 1)
+
+    def test_submits_racing_close_are_all_written(self):
+        graph = RecordingGraph()
+        buffer = IngestBuffer(graph, max_queue_size=16, max_batch_size=4, flush_interval_ms=1)
+        accepted = []
+        lock = threading.Lock()
+
+        def producer(offset):
+            for i in range(offset, offset + 500):
+                try:
+                    buffer.submit(observation(i))
+                except RuntimeError:
+                    return  # closed
+                with lock:
+                    accepted.append(f"wm_{i}")
+
+        threads = [threading.Thread(target=producer, args=(n * 1000,)) for n in range(4)]
+        for t in threads:
+            t.start()
+        self.assertEqual(buffer.close(), 0)
+        for t in threads:
+            t.join()
+        written = {wm_id for batch in graph.batches for wm_id in batch}
+        self.assertEqual(written, set(accepted))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,40 @@
+import threading
+import time
+import unittest
+
+from multimodal import model_registry
+
+
+class TestModelRegistry(unittest.TestCase):
+    def tearDown(self):
+        model_registry.clear_models()
+
+    def test_concurrent_first_use_loads_once(self):
+        loads = []
+
+        def loader():
+            time.sleep(0.05)
+            loads.append(1)
+            return object()
+
+        results = []
+        threads = [
+            threading.Thread(target=lambda: results.append(model_registry._get_or_load(("fake", "m", "cpu"), loader)))
+            for _ in range(8)
+        ]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(len(loads), 1)
+        self.assertTrue(all(r is results[0] for r in results))
+
+    def test_idle_models_are_unloaded_and_reloaded(self):
+        first = model_registry._get_or_load(("fake", "m", "cpu"), object)
+        self.assertEqual(model_registry.unload_idle_models(max_idle=0), [("fake", "m", "cpu")])
+        self.assertEqual(model_registry.loaded_models(), [])
+        self.assertIsNot(model_registry._get_or_load(("fake", "m", "cpu"), object), first)
+
+
+if __name__ == "__main__":
+    unittest.main()
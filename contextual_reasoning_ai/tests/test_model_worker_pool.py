@@ -0,0 +1,66 @@
+import io
+import pickle
+import unittest
+
+import numpy as np
+
+from workers.model_worker_pool import ModelWorkerPool, RemoteModel, SHM_THRESHOLD_BYTES
+
+
+class TestModelWorkerPool(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # Any "module:callable" works as a model factory; numpy's Generator keeps this light
+        cls.pool = ModelWorkerPool("test", "numpy.random:default_rng", args=(7,), workers=2, torch_threads=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.pool.close()
+
+    def test_calls_run_in_workers(self):
+        self.assertEqual(sorted(self.pool.call("permutation", 5)), [0, 1, 2, 3, 4])
+        self.assertEqual(RemoteModel(self.pool).integers(1, 2), 1)
+
+    def test_large_arrays_go_through_shared_memory(self):
+        big = np.arange(1 << 19, dtype=np.float32)
+        shuffled = self.pool.call("permutation", big)
+        self.assertEqual(shuffled.shape, big.shape)
+        self.assertEqual(float(shuffled.sum()), float(big.sum()))
+
+    def test_errors_come_back_on_the_future(self):
+        with self.assertRaises(RuntimeError):
+            self.pool.submit("no_such_method").result(timeout=30)
+        self.assertGreaterEqual(self.pool.stats()["failed"], 1)
+
+
+class TestModelWorkerPoolSupervision(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        # The "model" is the os / pickle module itself, so os._exit kills a worker mid-job
+        cls.os_pool = ModelWorkerPool("os", "builtins:__import__", args=("os",), workers=1, torch_threads=1, call_timeout=60)
+        cls.pickle_pool = ModelWorkerPool("pickle", "builtins:__import__", args=("pickle",), workers=1, torch_threads=1)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.os_pool.close()
+        cls.pickle_pool.close()
+
+    def test_jobs_of_a_dead_worker_fail_instead_of_hanging(self):
+        pid = self.os_pool.call("getpid")
+        dying = self.os_pool.submit("_exit", 1)
+        queued = self.os_pool.submit("getpid")  # sent to the same worker, never started
+        for future in (dying, queued):
+            with self.assertRaises(RuntimeError):
+                future.result(timeout=30)
+        self.assertNotEqual(self.os_pool.call("getpid"), pid)
+        self.assertEqual(self.os_pool.stats()["restarts"], 1)
+        self.assertEqual(self.os_pool.stats()["running"], 0)
+
+    def test_large_byte_payloads_go_through_shared_memory(self):
+        payload = b"x" * (SHM_THRESHOLD_BYTES + 1)
+        # pickle.load reads a file object: the worker gets the bytes back as a BytesIO
+        self.assertEqual(self.pickle_pool.call("load", io.BytesIO(pickle.dumps(payload))), payload)
+
+
+if __name__ == "__main__":
+    unittest.main()
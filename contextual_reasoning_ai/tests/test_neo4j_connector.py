@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+from db import neo4j_connector
+
+
+class FakeSession:
+    def __init__(self):
+        self.closed = False
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.closed = True
+        return False
+
+    def run(self, query, **params):
+        return [{"query": query, **params}]
+
+
+class FakeDriver:
+    def __init__(self, uri, auth, **config):
+        self.uri = uri
+        self.auth = auth
+        self.config = config
+        self.closed = False
+
+    def session(self, **kwargs):
+        return FakeSession()
+
+    def close(self):
+        self.closed = True
+
+
+class FakeGraphDatabase:
+    created = []
+
+    @classmethod
+    def driver(cls, uri, auth, **config):
+        driver = FakeDriver(uri, auth, **config)
+        cls.created.append(driver)
+        return driver
+
+
+class TestDriverRegistry(unittest.TestCase):
+    def setUp(self):
+        FakeGraphDatabase.created = []
+        patcher = mock.patch.object(neo4j_connector, "GraphDatabase", FakeGraphDatabase)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(neo4j_connector.close_all_drivers)
+        neo4j_connector.close_all_drivers()
+
+    def test_lookups_share_one_driver(self):
+        first = neo4j_connector.get_neo4j_driver("bolt://db:7687", "neo4j", "pw")
+        second = neo4j_connector.get_neo4j_driver("bolt://db:7687", "neo4j", "pw")
+        other = neo4j_connector.get_neo4j_driver("bolt://db:7687", "reader", "pw")
+        other_password = neo4j_connector.get_neo4j_driver("bolt://db:7687", "neo4j", "other-pw")
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertIsNot(first, other_password)
+        self.assertEqual(FakeGraphDatabase.created[2].auth, ("neo4j", "other-pw"))
+        self.assertEqual(len(FakeGraphDatabase.created), 3)
+
+        # Closing through the proxy leaves the shared pool open
+        first.close()
+        self.assertFalse(FakeGraphDatabase.created[0].closed)
+        neo4j_connector.close_all_drivers()
+        self.assertTrue(all(d.closed for d in FakeGraphDatabase.created))
+
+    def test_pool_config_from_environment(self):
+        with mock.patch.dict("os.environ", {"NEO4J_MAX_POOL_SIZE": "7", "NEO4J_LIVENESS_CHECK_TIMEOUT": "30"}):
+            shared = neo4j_connector.get_neo4j_driver("bolt://db:7687", "neo4j", "pw")
+        config = FakeGraphDatabase.created[0].config
+        self.assertEqual(config["max_connection_pool_size"], 7)
+        self.assertEqual(config["liveness_check_timeout"], 30.0)
+        self.assertEqual(shared.max_pool_size, 7)
+
+    def test_session_metrics(self):
+        shared = neo4j_connector.get_neo4j_driver("bolt://db:7687", "neo4j", "pw")
+        with shared.session() as outer:
+            self.assertEqual(outer.run("RETURN 1", x=1), [{"query": "RETURN 1", "x": 1}])
+            with shared.session():
+                metrics = shared.metrics()
+                self.assertEqual(metrics["active_sessions"], 2)
+        metrics = shared.metrics()
+        self.assertEqual(metrics["active_sessions"], 0)
+        self.assertEqual(metrics["peak_active_sessions"], 2)
+        self.assertEqual(metrics["sessions_opened"], 2)
+        self.assertEqual(metrics["active_sessions_per_pool_slot"], 0.0)
+        self.assertGreaterEqual(metrics["avg_session_seconds"], 0.0)
+        self.assertEqual(neo4j_connector.neo4j_pool_metrics(), [metrics])
+
+    def test_session_metrics_recover_after_error(self):
+        shared = neo4j_connector.get_neo4j_driver("bolt://db:7687", "neo4j", "pw")
+        with self.assertRaises(RuntimeError):
+            with shared.session():
+                raise RuntimeError("query failed")
+        self.assertEqual(shared.metrics()["active_sessions"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
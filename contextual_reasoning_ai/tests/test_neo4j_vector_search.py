@@ -0,0 +1,59 @@
+import unittest
+
+from core.cognition.neo4j_vector_search import VECTOR_INDEX_NAMES, query_vector_indexes, vector_index_statements
+
+
+class FakeSession:
+    def __init__(self, rows_by_index):
+        self.rows_by_index = rows_by_index
+        self.calls = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def run(self, query, **params):
+        self.calls.append((query, params))
+        return iter(self.rows_by_index.get(params.get("index_name"), []))
+
+
+class FakeDriver:
+    def __init__(self, rows_by_index=None):
+        self.session_ = FakeSession(rows_by_index or {})
+
+    def session(self):
+        return self.session_
+
+
+class TestNeo4jVectorSearch(unittest.TestCase):
+    def test_single_label_query_and_parameters(self):
+        driver = FakeDriver({"sm_embedding_index": [{"id": "sm_1", "content": "phishing", "score": 0.9}]})
+        hits = query_vector_indexes(driver, [0.5, 0.25], k=3, memory_label="SemanticMemory")
+
+        (query, params), = driver.session_.calls
+        self.assertIn("CALL db.index.vector.queryNodes($index_name, $k, $embedding)", query)
+        self.assertEqual(params, {"index_name": "sm_embedding_index", "k": 3, "embedding": [0.5, 0.25]})
+        # Neo4j's [0, 1] cosine score is mapped back to [-1, 1]
+        self.assertEqual(hits, [{"id": "sm_1", "content": "phishing", "score": 0.8}])
+
+    def test_all_labels_are_merged_by_score(self):
+        driver = FakeDriver({
+            "sm_embedding_index": [{"id": "sm_1", "content": "a", "score": 0.6}],
+            "em_embedding_index": [{"id": "em_1", "content": "b", "score": 0.95}],
+        })
+        hits = query_vector_indexes(driver, [1.0, 0.0], k=2)
+        self.assertEqual([params["index_name"] for _, params in driver.session_.calls], list(VECTOR_INDEX_NAMES.values()))
+        self.assertEqual([(h["id"], h["label"]) for h in hits], [("em_1", "EpisodicMemory"), ("sm_1", "SemanticMemory")])
+
+    def test_unknown_label_and_index_statements(self):
+        with self.assertRaises(ValueError):
+            query_vector_indexes(FakeDriver(), [1.0], k=1, memory_label="Nope")
+        statements = vector_index_statements(384)
+        self.assertEqual(len(statements), len(VECTOR_INDEX_NAMES))
+        self.assertIn("`vector.dimensions`: 384", statements[0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import unittest
+from unittest import mock
+
+import networkx as nx
+
+from core.graph.graph_engine import KnowledgeGraph
+from core.graph.graph_reasoner import GraphReasoner
+from core.graph import path_search
+from core.graph.path_search import iter_paths
+
+
+def grid_graph(width, height):
+    """Bidirectional grid: the number of simple paths explodes with its size."""
+    graph = nx.MultiDiGraph()
+    for x in range(width):
+        for y in range(height):
+            for dx, dy in ((1, 0), (0, 1), (-1, 0), (0, -1)):
+                if 0 <= x + dx < width and 0 <= y + dy < height:
+                    graph.add_edge((x, y), (x + dx, y + dy), relation="connected_to")
+    return graph
+
+
+class TestPathSearch(unittest.TestCase):
+    def test_paths_come_cheapest_first_with_relations(self):
+        graph = nx.MultiDiGraph()
+        graph.add_edge("user", "device", relation="owns")
+        graph.add_edge("device", "threat", relation="exposed_to")
+        graph.add_edge("user", "threat", key="phished_by")
+        weights = {"phished_by": 5.0}
+
+        results = list(iter_paths(graph, "user", {"threat"}, relation_weights=weights))
+        self.assertEqual([r["path"] for r in results], [["user", "device", "threat"], ["user", "threat"]])
+        self.assertEqual(results[0]["relations"], ["owns", "exposed_to"])
+        self.assertEqual(results[1]["relations"], ["phished_by"])
+        self.assertEqual([r["cost"] for r in results], [2.0, 5.0])
+
+    def test_depth_and_count_bounds(self):
+        graph = grid_graph(4, 4)
+        for result in iter_paths(graph, (0, 0), {(3, 3)}, max_depth=8, max_paths=1000):
+            self.assertLessEqual(len(result["path"]) - 1, 8)
+            self.assertEqual(len(set(result["path"])), len(result["path"]))
+        self.assertEqual(len(list(iter_paths(graph, (0, 0), {(3, 3)}, max_depth=20, max_paths=5))), 5)
+
+    def test_excluded_relations_and_missing_source(self):
+        graph = nx.MultiDiGraph()
+        graph.add_edge("user", "threat", relation="mitigated_by")
+        self.assertEqual(list(iter_paths(graph, "user", {"threat"}, relation_weights={"mitigated_by": None})), [])
+        self.assertEqual(list(iter_paths(graph, "nobody", {"threat"})), [])
+
+    def test_large_graph_stays_within_budget(self):
+        graph = grid_graph(60, 60)
+        results = list(iter_paths(graph, (0, 0), {(59, 59), (30, 30)}, max_depth=200, max_paths=20, time_budget=2.0))
+        self.assertTrue(results)
+        self.assertEqual(results[0]["target"], (30, 30))
+
+    def test_negative_weights_rejected(self):
+        graph = nx.MultiDiGraph()
+        graph.add_edge("user", "threat", relation="owns")
+        with self.assertRaises(ValueError):
+            iter_paths(graph, "user", {"threat"}, relation_weights={"owns": -1.0})
+        with self.assertRaises(ValueError):
+            iter_paths(graph, "user", {"threat"}, default_weight=-0.5)
+
+    def test_consumer_time_not_charged_to_budget(self):
+        clock = [0.0]
+        fake_time = mock.Mock(monotonic=lambda: clock[0])
+        graph = nx.MultiDiGraph()
+        for i in range(5):
+            graph.add_edge("user", f"threat_{i}", relation="exposed_to")
+        targets = {f"threat_{i}" for i in range(5)}
+        with mock.patch.object(path_search, "time", fake_time):
+            results = []
+            for result in iter_paths(graph, "user", targets, time_budget=1.0):
+                results.append(result)
+                clock[0] += 10.0  # slow consumer
+        self.assertEqual(len(results), 5)
+
+
+class TestGraphReasoner(unittest.TestCase):
+    def test_detect_threat_path(self):
+        reasoner = GraphReasoner(KnowledgeGraph())
+        paths = reasoner.detect_threat_path("User_A")
+        self.assertEqual(len(paths), 1)
+        self.assertEqual(paths[0]["path"], ["User_A", "Device_X", "Network_1", "Threat_Z"])
+        self.assertEqual(paths[0]["threat"], "Threat_Z")
+        self.assertEqual(paths[0]["length"], 4)
+        self.assertIn("Threat_Z", reasoner.summarize_paths(paths))
+
+
+if __name__ == "__main__":
+    unittest.main()
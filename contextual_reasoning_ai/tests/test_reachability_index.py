@@ -0,0 +1,76 @@
+import random
+import unittest
+
+import networkx as nx
+
+from core.graph.graph_engine import KnowledgeGraph
+from core.graph.graph_reasoner import GraphReasoner
+from core.knowledge_graph.graph_builder import CyberGuardKnowledgeGraph
+
+
+def brute_force_reach(graph):
+    """{node: {threat: distance}} straight from BFS, to check the index against."""
+    threats = [n for n, d in graph.nodes(data=True) if d.get("type") == "Threat"]
+    reach = {}
+    for threat in threats:
+        for node, distance in nx.single_source_shortest_path_length(graph.reverse(copy=False), threat).items():
+            if node != threat:
+                reach.setdefault(node, {})[threat] = distance
+    return reach
+
+
+class TestReachabilityIndex(unittest.TestCase):
+    def test_initial_graph_lookups(self):
+        kg = KnowledgeGraph()
+        self.assertEqual(kg.nodes_of_type("Threat"), {"Threat_Z"})
+        self.assertEqual(kg.threats_reachable_from("User_A"), {"Threat_Z": 3})
+        self.assertEqual(kg.exposed_to("Threat_Z", "User"), {"User_A": 3})
+        self.assertEqual(kg.threats_reachable_from("Vuln_Y"), {})
+
+    def test_edges_and_threats_update_incrementally(self):
+        kg = CyberGuardKnowledgeGraph()
+        kg.add_entity("User", "user_1")
+        kg.add_entity("Device", "device_1")
+        kg.add_relationship("user_1", "device_1", "owns")
+        self.assertEqual(kg.threats_reachable_from("user_1"), {})
+
+        # A threat appearing later is picked up by everyone upstream of it
+        kg.add_relationship("device_1", "net_1", "connects_to")
+        kg.add_relationship("net_1", "threat_1", "exposed_to")
+        kg.add_entity("Threat", "threat_1", severity="Critical")
+        self.assertEqual(kg.threats_reachable_from("user_1"), {"threat_1": 3})
+
+        # A shortcut shortens the distance
+        kg.add_relationship("user_1", "threat_1", "phished_by")
+        self.assertEqual(kg.exposed_to("threat_1", "User"), {"user_1": 1})
+
+        # Retyping a threat removes it from the index
+        kg.add_entity("Vulnerability", "threat_1")
+        self.assertEqual(kg.threats_reachable_from("user_1"), {})
+        self.assertEqual(kg.nodes_of_type("Threat"), set())
+
+    def test_matches_brute_force_on_random_graph(self):
+        rng = random.Random(7)
+        kg = CyberGuardKnowledgeGraph()
+        nodes = [f"n{i}" for i in range(80)]
+        for _ in range(200):
+            if rng.random() < 0.1:
+                kg.add_entity(rng.choice(["Threat", "User", "Device"]), rng.choice(nodes))
+            else:
+                kg.add_relationship(rng.choice(nodes), rng.choice(nodes), rng.choice(["owns", "connects_to"]))
+        expected = brute_force_reach(kg.graph)
+        for node in kg.graph.nodes:
+            self.assertEqual(kg.threats_reachable_from(node), expected.get(node, {}))
+
+    def test_reasoner_uses_index(self):
+        kg = KnowledgeGraph()
+        kg.add_entity("User", "User_B")
+        reasoner = GraphReasoner(kg)
+        self.assertEqual(reasoner.detect_threat_path("User_B"), [])
+        self.assertEqual(reasoner.exposed_entities("Threat_Z"), {"User_A": 3})
+        self.assertEqual(reasoner.detect_threat_path("User_A", max_depth=2), [])
+        self.assertEqual(len(reasoner.detect_threat_path("User_A", max_depth=3)), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,113 @@
+import queue
+import time
+import unittest
+
+from core.cognition.redis_near_cache import NearCache
+
+
+class FakePubSub:
+    def __init__(self, messages):
+        self.messages = messages
+        self.patterns = []
+
+    def psubscribe(self, pattern):
+        self.patterns.append(pattern)
+
+    def get_message(self, timeout=None):
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        pass
+
+
+class FakeNotifyingRedis:
+    """Redis stand-in that publishes keyspace events when told to."""
+
+    def __init__(self, flags="KEA"):
+        self.flags = flags
+        self.messages = queue.Queue()
+        self.connection_pool = type("Pool", (), {"connection_kwargs": {"db": 0}})()
+
+    def config_get(self, name):
+        return {name: self.flags}
+
+    def pubsub(self, ignore_subscribe_messages=True):
+        return FakePubSub(self.messages)
+
+    def touch(self, key, event="hset"):
+        self.messages.put({"type": "pmessage", "channel": f"__keyspace@0__:{key}", "data": event})
+
+
+def wait_for(predicate, timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.01)
+    return False
+
+
+class TestNearCache(unittest.TestCase):
+    def test_hits_until_keyspace_event_invalidates(self):
+        redis = FakeNotifyingRedis()
+        cache = NearCache(redis, fallback_ttl=0.0)
+        self.assertTrue(wait_for(lambda: cache.stats()["mode"] == "notifications"))
+
+        loads = []
+        loader = lambda: loads.append(1) or {"version": len(loads)}
+        self.assertEqual(cache.get("wm:context", loader), {"version": 1})
+        self.assertEqual(cache.get("wm:context", loader), {"version": 1})
+
+        redis.touch("wm:context")
+        self.assertTrue(wait_for(lambda: cache.stats()["invalidations"] == 1))
+        self.assertEqual(cache.get("wm:context", loader), {"version": 2})
+
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+        cache.close()
+
+    def test_ttl_refresh_events_do_not_invalidate(self):
+        redis = FakeNotifyingRedis()
+        cache = NearCache(redis, fallback_ttl=0.0)
+        self.assertTrue(wait_for(lambda: cache.stats()["mode"] == "notifications"))
+
+        touched = []
+        cache.get("wm:session:s1", lambda: {"context": {}})
+        # The EXPIRE sent alongside the HGETALL that filled the cache
+        redis.touch("wm:session:s1", event="expire")
+        redis.touch("wm:other", event="hset")
+        self.assertTrue(wait_for(lambda: redis.messages.empty()))
+        time.sleep(0.05)
+
+        self.assertEqual(cache.get("wm:session:s1", lambda: "reloaded", on_hit=touched.append), {"context": {}})
+        self.assertEqual(touched, ["wm:session:s1"])
+        self.assertEqual(cache.stats()["invalidations"], 0)
+        cache.close()
+
+    def test_falls_back_to_ttl_without_notifications(self):
+        cache = NearCache(FakeNotifyingRedis(flags=""), fallback_ttl=0.05)
+        loads = []
+        loader = lambda: loads.append(1) or len(loads)
+        self.assertEqual(cache.get("wm:context", loader), 1)
+        self.assertEqual(cache.get("wm:context", loader), 1)
+        time.sleep(0.06)
+        self.assertEqual(cache.get("wm:context", loader), 2)
+        self.assertEqual(cache.stats()["mode"], "ttl")
+        cache.close()
+
+    def test_invalidation_during_load_is_not_cached(self):
+        cache = NearCache(FakeNotifyingRedis(flags=""), fallback_ttl=60.0, use_notifications=False)
+
+        def racing_loader():
+            cache.invalidate("wm:context")  # a write lands while we are reading
+            return "stale"
+
+        self.assertEqual(cache.get("wm:context", racing_loader), "stale")
+        self.assertEqual(cache.get("wm:context", lambda: "fresh"), "fresh")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,165 @@
+import json
+import unittest
+
+from core.cognition.redis_task_stream import RedisTaskStream
+from core.cognition.redis_working_memory import RedisWorkingMemory
+
+
+class FakeStreamRedis:
+    """In-memory stand-in for the Redis stream commands RedisTaskStream uses."""
+
+    def __init__(self):
+        self.streams = {}
+        self.groups = {}
+        self.clock = 0
+        self.seq = 0
+
+    def _id(self, seq):
+        return f"0-{seq}"
+
+    def xgroup_create(self, stream, group, id="0", mkstream=False):
+        if (stream, group) in self.groups:
+            raise Exception("BUSYGROUP Consumer Group name already exists")
+        self.streams.setdefault(stream, [])
+        self.groups[(stream, group)] = {"last": 0, "pending": {}}
+
+    def xadd(self, stream, fields, maxlen=None, approximate=True):
+        self.seq += 1
+        entries = self.streams.setdefault(stream, [])
+        entries.append((self.seq, dict(fields)))
+        if maxlen is not None:
+            del entries[:max(0, len(entries) - maxlen)]
+        return self._id(self.seq)
+
+    def pipeline(self, transaction=True):
+        client, calls = self, []
+
+        class Pipeline:
+            def xadd(self, *args, **kwargs):
+                calls.append(lambda: client.xadd(*args, **kwargs))
+
+            def execute(self):
+                return [call() for call in calls]
+        return Pipeline()
+
+    def xreadgroup(self, group, consumer, streams, count=None, block=None):
+        response = []
+        for stream in streams:
+            state = self.groups[(stream, group)]
+            new = [(seq, f) for seq, f in self.streams[stream] if seq > state["last"]][:count]
+            for seq, _ in new:
+                state["pending"][seq] = (consumer, self.clock)
+                state["last"] = seq
+            if new:
+                response.append([stream, [(self._id(seq), f) for seq, f in new]])
+        return response
+
+    def xack(self, stream, group, *ids):
+        pending = self.groups[(stream, group)]["pending"]
+        return sum(pending.pop(int(i.split("-")[1]), None) is not None for i in ids)
+
+    def xautoclaim(self, stream, group, consumer, min_idle_time, start_id="0-0", count=100):
+        pending = self.groups[(stream, group)]["pending"]
+        entries = dict(self.streams[stream])
+        claimed = []
+        for seq, (_, delivered_at) in sorted(pending.items())[:count]:
+            if self.clock - delivered_at >= min_idle_time:
+                pending[seq] = (consumer, self.clock)
+                claimed.append((self._id(seq), entries.get(seq)))
+        return ["0-0", claimed, []]
+
+    def xpending(self, stream, group):
+        pending = self.groups[(stream, group)]["pending"]
+        return {"pending": len(pending)}
+
+    def xinfo_groups(self, stream):
+        return [{"name": g, "last-delivered-id": self._id(state["last"])}
+                for (s, g), state in self.groups.items() if s == stream]
+
+    def xrange(self, stream, min="-", max="+", count=None):
+        after = int(min.lstrip("(").split("-")[1])
+        return [(self._id(seq), f) for seq, f in self.streams[stream] if seq > after][:count]
+
+    def xlen(self, stream):
+        return len(self.streams.get(stream, []))
+
+    def delete(self, key):
+        self.streams.pop(key, None)
+        for k in [k for k in self.groups if k[0] == key]:
+            del self.groups[k]
+
+
+class TestRedisTaskStream(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeStreamRedis()
+        self.worker_a = RedisTaskStream(self.redis, consumer="a")
+        self.worker_b = RedisTaskStream(self.redis, consumer="b")
+
+    def test_consumers_share_the_queue(self):
+        self.worker_a.add_many([{"n": i} for i in range(5)])
+        first = self.worker_a.read(count=2)
+        second = self.worker_b.read(count=2)
+        self.assertEqual([t["n"] for _, t in first], [0, 1])
+        self.assertEqual([t["n"] for _, t in second], [2, 3])
+        self.assertEqual(self.worker_a.peek(), [{"n": 4}])
+
+    def test_unacked_tasks_can_be_reclaimed(self):
+        self.worker_a.add({"job": "scan"})
+        (task_id, _), = self.worker_a.read()
+        # worker a "crashes"; once the task has been idle long enough b takes it over
+        self.redis.clock = 30000
+        self.assertEqual(self.worker_b.reclaim(min_idle_ms=60000), [])
+        self.redis.clock = 90000
+        reclaimed = self.worker_b.reclaim(min_idle_ms=60000)
+        self.assertEqual(reclaimed, [(task_id, {"job": "scan"})])
+        self.assertEqual(self.worker_b.ack(task_id), 1)
+        self.assertEqual(self.worker_b.pending()["pending"], 0)
+
+    def test_stream_is_trimmed_to_maxlen(self):
+        capped = RedisTaskStream(self.redis, stream="capped", consumer="a", maxlen=3)
+        for i in range(10):
+            capped.add({"n": i})
+        self.assertEqual(capped.length(), 3)
+        self.assertEqual([t["n"] for _, t in capped.read(count=10)], [7, 8, 9])
+
+
+class FakeListAndStreamRedis(FakeStreamRedis):
+    def __init__(self):
+        super().__init__()
+        self.lists = {}
+
+    def lpush(self, key, value):
+        self.lists.setdefault(key, []).insert(0, value)
+
+    def rpop(self, key):
+        items = self.lists.get(key)
+        return items.pop() if items else None
+
+    def lrange(self, key, start, end):
+        items = self.lists.get(key, [])
+        return items[start:] if end == -1 else items[start:end + 1]
+
+
+class TestWorkingMemoryTaskBackends(unittest.TestCase):
+    def test_list_backend_is_the_default_and_lists_everything(self):
+        redis = FakeListAndStreamRedis()
+        wm = RedisWorkingMemory(redis_client=redis, near_cache=False)
+        self.assertIsNone(wm.task_stream)
+        for i in range(150):
+            wm.add_task({"n": i})
+        self.assertEqual(len(wm.get_all_tasks()), 150)
+        self.assertEqual(len(wm.get_all_tasks(limit=10)), 10)
+        self.assertEqual(wm.get_next_task(), {"n": 0})
+
+    def test_stream_backend_drains_the_old_list_first(self):
+        redis = FakeListAndStreamRedis()
+        for i in range(3):
+            redis.lpush("wm:tasks", json.dumps({"n": i}))
+        wm = RedisWorkingMemory(redis_client=redis, task_backend="stream", consumer="a", near_cache=False)
+        wm.add_task({"n": 3})
+        self.assertEqual(redis.lists["wm:tasks"], [])
+        self.assertEqual([wm.get_next_task()["n"] for _ in range(4)], [0, 1, 2, 3])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,146 @@
+import unittest
+
+from core.cognition.redis_working_memory import RedisWorkingMemory
+
+
+class FakeRedis:
+    """Just enough of a Redis client for the session hash layout."""
+
+    def __init__(self):
+        self.hashes = {}
+        self.strings = {}
+        self.ttls = {}
+        self.round_trips = 0
+
+    def pipeline(self, transaction=True):
+        return FakePipeline(self)
+
+    def hset(self, key, mapping):
+        self.hashes.setdefault(key, {}).update(mapping)
+
+    def hget(self, key, field):
+        return self.hashes.get(key, {}).get(field)
+
+    def hgetall(self, key):
+        return dict(self.hashes.get(key, {}))
+
+    def hdel(self, key, *fields):
+        for field in fields:
+            self.hashes.get(key, {}).pop(field, None)
+
+    def expire(self, key, seconds):
+        if key in self.hashes:
+            self.ttls[key] = seconds
+
+    def hsetnx(self, key, field, value):
+        fields = self.hashes.setdefault(key, {})
+        if field in fields:
+            return 0
+        fields[field] = value
+        return 1
+
+    def get(self, key):
+        return self.strings.get(key)
+
+    def set(self, key, value):
+        self.strings[key] = value
+
+    def scan_iter(self, match, count=None):
+        prefix = match.rstrip("*")
+        return [key for key in list(self.strings) if key.startswith(prefix)]
+
+    def delete(self, *keys):
+        for key in keys:
+            self.hashes.pop(key, None)
+            self.strings.pop(key, None)
+            self.ttls.pop(key, None)
+
+
+class FakePipeline:
+    def __init__(self, client):
+        self.client = client
+        self.commands = []
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    def execute(self):
+        self.client.round_trips += 1
+        return [getattr(self.client, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+class TestRedisWorkingMemorySessions(unittest.TestCase):
+    def setUp(self):
+        self.redis = FakeRedis()
+        self.wm = RedisWorkingMemory(session_ttl=120, redis_client=self.redis)
+
+    def test_session_state_lives_in_one_hash_with_ttl(self):
+        self.wm.update_session("s1", context={"goal": "triage"}, perception={"ip": "10.0.0.5"})
+        self.wm.store_decision("s1", {"action": "block"})
+        self.assertEqual(list(self.redis.hashes), ["wm:session:s1"])
+        self.assertEqual(self.redis.ttls["wm:session:s1"], 120)
+        self.assertEqual(self.redis.round_trips, 2)
+
+        session = self.wm.get_session("s1")
+        self.assertEqual(session["context"], {"goal": "triage"})
+        self.assertEqual(session["decision"], {"action": "block"})
+        self.assertEqual(self.wm.get_perception("s1"), {"ip": "10.0.0.5"})
+        self.assertEqual(self.wm.get_decision("missing"), {})
+
+    def test_reads_slide_the_ttl(self):
+        self.wm.store_perception("s1", {"ip": "10.0.0.5"})
+        self.redis.ttls["wm:session:s1"] = 5
+        self.wm.get_session("s1")
+        self.assertEqual(self.redis.ttls["wm:session:s1"], 120)
+
+    def test_legacy_keys_are_migrated_on_first_read(self):
+        self.redis.set("wm:perceptions:s1", b'{"ip": "10.0.0.5"}')
+        self.redis.set("wm:decisions:s1", b'{"action": "block"}')
+        self.assertEqual(self.wm.get_perception("s1"), {"ip": "10.0.0.5"})
+        self.assertEqual(self.wm.get_decision("s1"), {"action": "block"})
+        self.assertEqual(self.redis.strings, {})
+        self.assertEqual(self.redis.ttls["wm:session:s1"], 120)
+
+    def test_newer_writes_win_over_legacy_keys(self):
+        self.redis.set("wm:perceptions:s1", b'{"ip": "old"}')
+        self.redis.set("wm:decisions:s1", b'{"action": "allow"}')
+        self.wm.store_perception("s1", {"ip": "new"})
+        session = self.wm.get_session("s1")
+        self.assertEqual(session["perception"], {"ip": "new"})
+        self.assertEqual(session["decision"], {"action": "allow"})
+        self.assertEqual(self.redis.strings, {})
+
+    def test_migrate_legacy_sessions(self):
+        for i in range(3):
+            self.redis.set(f"wm:decisions:s{i}", b'{"action": "block"}')
+        self.redis.set("wm:perceptions:s0", b'{"ip": "10.0.0.5"}')
+        self.assertEqual(self.wm.migrate_legacy_sessions(), 3)
+        self.assertEqual(self.redis.strings, {})
+        self.assertEqual(sorted(self.redis.hashes), ["wm:session:s0", "wm:session:s1", "wm:session:s2"])
+        self.assertEqual(self.wm.get_session("s0")["perception"], {"ip": "10.0.0.5"})
+
+    def test_unknown_fields_are_rejected(self):
+        with self.assertRaises(ValueError):
+            self.wm.update_session("s1", mood="curious")
+
+
+class TestRedisWorkingMemoryNearCache(unittest.TestCase):
+    def test_cache_hits_still_slide_the_ttl(self):
+        redis = FakeRedis()
+        wm = RedisWorkingMemory(session_ttl=120, redis_client=redis, task_backend="list", near_cache=True)
+        wm.store_perception("s1", {"ip": "10.0.0.5"})
+        self.assertEqual(wm.get_perception("s1"), {"ip": "10.0.0.5"})
+        trips = redis.round_trips
+
+        # Served from the near cache: no HGETALL, but the TTL is refreshed once it is due
+        redis.ttls["wm:session:s1"] = 5
+        wm._ttl_refreshed["wm:session:s1"] -= 60
+        self.assertEqual(wm.get_perception("s1"), {"ip": "10.0.0.5"})
+        self.assertEqual(redis.round_trips, trips)
+        self.assertEqual(redis.ttls["wm:session:s1"], 120)
+        self.assertEqual(wm.cache_stats()["hits"], 1)
+        wm.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,31 @@
+import io
+import os
+import unittest
+from unittest import mock
+
+from multimodal import uploads
+from multimodal.uploads import upload_source
+
+
+class TestUploadSource(unittest.TestCase):
+    def test_small_upload_is_passed_through(self):
+        buffer = io.BytesIO(b"RIFF....WAVE")
+        buffer.read()
+        with upload_source(buffer, "clip.wav") as source:
+            self.assertIs(source, buffer)
+            self.assertEqual(source.tell(), 0)
+
+    def test_large_upload_spools_to_unique_temp_file(self):
+        with mock.patch.object(uploads, "SPOOL_THRESHOLD_BYTES", 4):
+            with upload_source(io.BytesIO(b"0123456789"), "shot.png") as first, \
+                    upload_source(io.BytesIO(b"abcdefghij"), "shot.png") as second:
+                self.assertNotEqual(first, second)
+                self.assertTrue(first.endswith(".png"))
+                with open(second, "rb") as f:
+                    self.assertEqual(f.read(), b"abcdefghij")
+        self.assertFalse(os.path.exists(first))
+        self.assertFalse(os.path.exists(second))
+
+
+if __name__ == "__main__":
+    unittest.main()
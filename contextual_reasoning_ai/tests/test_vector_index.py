@@ -0,0 +1,147 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from core.cognition.vector_index import IVFLabelIndex, VectorIndex
+
+
+class TestVectorIndex(unittest.TestCase):
+    def setUp(self):
+        rng = np.random.default_rng(42)
+        self.vectors = rng.normal(size=(600, 16)).astype(np.float32)
+        self.ids = [f"sm_{i:04d}" for i in range(600)]
+
+    def _build(self, **options):
+        index = VectorIndex(dim=16, backend="ivf", **options)
+        index.add_batch("SemanticMemory", self.ids[:300], self.vectors[:300])
+        index.add_batch("EpisodicMemory", self.ids[300:], self.vectors[300:])
+        return index
+
+    def test_exact_match_is_top_hit(self):
+        index = self._build()
+        hits = index.search(self.vectors[42], k=3)
+        self.assertEqual(hits[0]["id"], "sm_0042")
+        self.assertEqual(hits[0]["label"], "SemanticMemory")
+        self.assertAlmostEqual(hits[0]["score"], 1.0, places=5)
+
+    def test_label_filter(self):
+        index = self._build()
+        hits = index.search(self.vectors[42], k=5, label="EpisodicMemory")
+        self.assertEqual(len(hits), 5)
+        self.assertTrue(all(h["label"] == "EpisodicMemory" for h in hits))
+
+    def test_trained_index_finds_neighbours(self):
+        index = self._build(min_train_size=100, nprobe=4)
+        hits = index.search(self.vectors[450], k=1, label="EpisodicMemory")
+        self.assertEqual(hits[0]["id"], "sm_0450")
+
+    def test_remove_and_relabel(self):
+        index = self._build()
+        index.remove("sm_0042")
+        self.assertNotIn("sm_0042", [h["id"] for h in index.search(self.vectors[42], k=5)])
+        index.add("EpisodicMemory", "sm_0007", self.vectors[7])
+        hits = index.search(self.vectors[7], k=1, label="SemanticMemory")
+        self.assertNotEqual(hits[0]["id"], "sm_0007")
+        self.assertEqual(len(index), 599)
+
+    def test_trains_only_when_threshold_crossed(self):
+        index = IVFLabelIndex(dim=16, min_train_size=100)
+        with mock.patch.object(IVFLabelIndex, "_train", autospec=True, side_effect=IVFLabelIndex._train) as train:
+            for i in range(99):
+                index.add([self.ids[i]], self.vectors[i:i + 1])
+            self.assertEqual(train.call_count, 0)
+            index.add([self.ids[99]], self.vectors[99:100])
+            self.assertEqual(train.call_count, 1)
+            for i in range(100, 399):
+                index.add([self.ids[i]], self.vectors[i:i + 1])
+            self.assertEqual(train.call_count, 1)
+            index.add([self.ids[399]], self.vectors[399:400])
+            self.assertEqual(train.call_count, 2)
+        self.assertEqual(index.search(self.vectors[0] / np.linalg.norm(self.vectors[0]), k=1)[0][0], "sm_0000")
+
+    def test_clear(self):
+        index = self._build()
+        index.clear("EpisodicMemory")
+        self.assertEqual(index.labels(), ["SemanticMemory"])
+        self.assertEqual(len(index), 300)
+        index.add("EpisodicMemory", "sm_0450", self.vectors[450])
+        self.assertEqual(len(index), 301)
+        index.clear()
+        self.assertEqual(len(index), 0)
+        self.assertEqual(index.search(self.vectors[0], k=1), [])
+
+    def test_rebuild_swaps_in_and_keeps_concurrent_writes(self):
+        index = self._build()
+        fresh = index.begin_rebuild()
+        fresh.add_batch("SemanticMemory", self.ids[:10], self.vectors[:10])
+        # The live index keeps serving, and writes made meanwhile reach both
+        self.assertEqual(index.search(self.vectors[450], k=1)[0]["id"], "sm_0450")
+        index.add("EpisodicMemory", "sm_0599", self.vectors[599])
+        index.finish_rebuild(fresh)
+        self.assertEqual(len(index), 11)
+        self.assertEqual(index.search(self.vectors[599], k=1)[0]["id"], "sm_0599")
+        self.assertNotEqual(index.search(self.vectors[450], k=1)[0]["id"], "sm_0450")
+
+    def test_label_rebuild_and_abort(self):
+        index = self._build()
+        fresh = index.begin_rebuild("EpisodicMemory")
+        fresh.add_batch("EpisodicMemory", self.ids[300:310], self.vectors[300:310])
+        index.abort_rebuild(fresh)
+        self.assertEqual(len(index), 600)
+        fresh = index.begin_rebuild("EpisodicMemory")
+        fresh.add_batch("EpisodicMemory", self.ids[300:310], self.vectors[300:310])
+        index.finish_rebuild(fresh, "EpisodicMemory")
+        self.assertEqual(len(index), 310)
+        self.assertEqual(index.search(self.vectors[42], k=1)[0]["id"], "sm_0042")
+
+    def test_concurrent_adds_and_searches(self):
+        index = VectorIndex(dim=16, backend="ivf", min_train_size=64)
+        errors = []
+
+        def writer(offset):
+            try:
+                for i in range(offset, 600, 4):
+                    index.add("SemanticMemory", self.ids[i], self.vectors[i])
+            except Exception as e:
+                errors.append(e)
+
+        def reader():
+            try:
+                for i in range(300):
+                    index.search(self.vectors[i], k=3)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=writer, args=(o,)) for o in range(4)]
+        threads += [threading.Thread(target=reader) for _ in range(2)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(index), 600)
+
+    def test_mark_stale(self):
+        index = self._build()
+        with tempfile.TemporaryDirectory() as path:
+            index.save(path)
+            VectorIndex.mark_stale(path)
+            self.assertFalse(os.path.exists(os.path.join(path, "manifest.json")))
+            self.assertFalse(VectorIndex(dim=16, path=path, backend="ivf").load())
+
+    def test_save_and_load(self):
+        index = self._build()
+        with tempfile.TemporaryDirectory() as path:
+            index.save(path)
+            restored = VectorIndex(dim=16, path=path, backend="ivf")
+            self.assertTrue(restored.load())
+            self.assertEqual(len(restored), 600)
+            self.assertEqual(restored.search(self.vectors[10], k=1)[0]["id"], "sm_0010")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,48 @@
+import json
+import unittest
+
+import numpy as np
+
+from core.cognition.wm_codecs import encode_value, decode_value
+
+try:
+    import msgpack
+except ImportError:
+    msgpack = None
+
+
+class TestWorkingMemoryCodecs(unittest.TestCase):
+    def test_json_codec_writes_legacy_layout(self):
+        value = {"goal": "triage", "score": np.float32(0.5)}
+        data = encode_value(value, "json")
+        self.assertEqual(json.loads(data), {"goal": "triage", "score": 0.5})
+        self.assertEqual(decode_value(data), {"goal": "triage", "score": 0.5})
+
+    def test_legacy_json_still_decodes(self):
+        self.assertEqual(decode_value('{"ip": "10.0.0.5"}'), {"ip": "10.0.0.5"})
+        self.assertEqual(decode_value(b'{"ip": "10.0.0.5"}'), {"ip": "10.0.0.5"})
+        self.assertIsNone(decode_value(None))
+
+    def test_arrays_are_stored_as_raw_bytes(self):
+        embedding = np.random.rand(2, 384).astype(np.float32)
+        data = encode_value(embedding, "json")
+        self.assertLess(len(data), len(json.dumps(embedding.tolist())))
+        decoded = decode_value(data)
+        self.assertEqual(decoded.dtype, np.float32)
+        np.testing.assert_array_equal(decoded, embedding)
+
+    @unittest.skipIf(msgpack is None, "msgpack not installed")
+    def test_msgpack_round_trip_with_nested_array(self):
+        value = {"context": {"goal": "triage"}, "embedding": np.arange(8, dtype=np.float64), "tags": ["a", "b"]}
+        decoded = decode_value(encode_value(value, "msgpack"))
+        self.assertEqual(decoded["context"], {"goal": "triage"})
+        self.assertEqual(decoded["tags"], ["a", "b"])
+        np.testing.assert_array_equal(decoded["embedding"], value["embedding"])
+
+    def test_unknown_codec_is_rejected(self):
+        with self.assertRaises(ValueError):
+            encode_value({}, "pickle")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,8 @@
 import streamlit as st
 from core.context_engine import ContextEngine
 from simulation.threat_simulator import ThreatSimulator
-from multimodal.audio_analyzer import AudioAnalyzer
+from multimodal.model_registry import get_audio_analyzer
+from multimodal.uploads import upload_source
 
 st.set_page_config(page_title="Contextual Reasoner Dashboard", layout="centered")
 st.title("🧠 Contextual Reasoning Dashboard")
@@ -19,21 +20,19 @@ if st.button("Analyze Text"):
 st.subheader("Image Analysis")
 image_file = st.file_uploader("Upload an image", type=["jpg", "jpeg", "png"])
 if image_file and st.button("Analyze Image"):
-    image_path = f"/tmp/{image_file.name}"
-    with open(image_path, "wb") as f:
-        f.write(image_file.read())
-    result = engine.analyze_image(image_path)
+    # Uploads are in-memory buffers; the analyzers read them directly
+    with upload_source(image_file, image_file.name) as image:
+        result = engine.analyze_image(image)
     st.json(result)
 
 # Audio Analysis
 st.subheader("Audio Analysis")
 audio_file = st.file_uploader("Upload an audio file", type=["wav"])
 if audio_file and st.button("Analyze Audio"):
-    audio_path = f"/tmp/{audio_file.name}"
-    with open(audio_path, "wb") as f:
-        f.write(audio_file.read())
-    analyzer = AudioAnalyzer()
-    result = analyzer.analyze_audio(audio_path)
+    # Shared across reruns and sessions; the model loads once per process
+    analyzer = get_audio_analyzer()
+    with upload_source(audio_file, audio_file.name) as audio:
+        result = analyzer.analyze_audio(audio)
     st.text("Transcription:")
     st.write(result)
 
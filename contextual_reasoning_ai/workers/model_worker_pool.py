@@ -0,0 +1,418 @@
+# model_worker_pool.py
+# Process pool for CPU-bound model inference.
+# Each worker is a separate (spawned) process that builds its model once and
+# then serves method calls from its own job queue, so audio, image and
+# embedding models no longer fight over the API process's GIL. Per worker,
+# torch intra-op threads are capped so several workers can share the box.
+# Jobs go to the worker with the fewest in flight; the parent tracks which
+# worker holds which job, so a worker that dies fails exactly its jobs.
+#
+# Large numpy arrays and byte payloads (bytes or BytesIO, e.g. uploaded
+# audio / images) travel through shared memory instead of being pickled
+# through the queue; everything else is pickled as usual.
+#
+# Pools are configured per model type from the environment:
+#   MODEL_WORKERS_<TYPE>        worker processes (0 / unset = run in-process)
+#   MODEL_TORCH_THREADS_<TYPE>  torch threads per worker (falls back to
+#                               MODEL_TORCH_THREADS, then cpu_count // workers)
+#   MODEL_WORKER_SHM_THRESHOLD  array / byte arguments at least this many bytes
+#                               go through shared memory (default 1 MiB)
+#   MODEL_WORKER_TIMEOUT        seconds call() waits for a result (default 300)
+
+import atexit
+import importlib
+import io
+import itertools
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+SHM_THRESHOLD_BYTES = int(os.getenv("MODEL_WORKER_SHM_THRESHOLD", 1 << 20))
+CALL_TIMEOUT = float(os.getenv("MODEL_WORKER_TIMEOUT", 300))
+
+# Model type -> "module:callable" that builds the model inside a worker
+MODEL_FACTORIES = {
+    "audio": "contextual_reasoning_ai.multimodal.audio_analyzer:AudioAnalyzer",
+    "image": "contextual_reasoning_ai.multimodal.image_analyzer:ImageAnalyzer",
+    "embedding": "sentence_transformers:SentenceTransformer",
+}
+
+
+class SharedArray:
+    """Handle to a numpy array placed in a shared memory segment."""
+
+    def __init__(self, name, shape, dtype):
+        self.name = name
+        self.shape = shape
+        self.dtype = dtype
+
+
+class SharedBytes:
+    """Handle to a byte payload in a shared memory segment; arrives as a BytesIO."""
+
+    def __init__(self, name, size):
+        self.name = name
+        self.size = size
+
+
+def _share(value, segments):
+    if isinstance(value, np.ndarray) and value.nbytes >= SHM_THRESHOLD_BYTES:
+        shm = shared_memory.SharedMemory(create=True, size=value.nbytes)
+        np.ndarray(value.shape, dtype=value.dtype, buffer=shm.buf)[...] = value
+        segments.append(shm)
+        return SharedArray(shm.name, value.shape, value.dtype.str)
+    if isinstance(value, io.BytesIO):
+        data = value.getbuffer()
+    elif isinstance(value, (bytes, bytearray)):
+        data = memoryview(value)
+    else:
+        return value
+    size = data.nbytes
+    if size < SHM_THRESHOLD_BYTES:
+        data.release()
+        return value
+    shm = shared_memory.SharedMemory(create=True, size=size)
+    shm.buf[:size] = data.cast("B")
+    data.release()
+    segments.append(shm)
+    # The segment may be rounded up to a page; keep the real payload size
+    return SharedBytes(shm.name, size)
+
+
+def _attach(value, handles):
+    if isinstance(value, SharedArray):
+        shm = shared_memory.SharedMemory(name=value.name)
+        handles.append(shm)
+        return np.ndarray(value.shape, dtype=np.dtype(value.dtype), buffer=shm.buf)
+    if isinstance(value, SharedBytes):
+        shm = shared_memory.SharedMemory(name=value.name)
+        handles.append(shm)
+        # Decoders want a seekable file; this one copy replaces pickling through the pipe
+        return io.BytesIO(shm.buf[:value.size])
+    return value
+
+
+def _close_segments(segments, unlink=False):
+    for shm in segments:
+        try:
+            shm.close()
+        except BufferError:
+            # The model kept a view of the input; the OS reclaims it with the process
+            pass
+        if unlink:
+            try:
+                shm.unlink()
+            except FileNotFoundError:
+                pass
+
+
+def _resolve_factory(spec):
+    module_name, _, attr = spec.partition(":")
+    target = importlib.import_module(module_name)
+    for part in attr.split("."):
+        target = getattr(target, part)
+    return target
+
+
+def _worker_main(index, factory, args, kwargs, torch_threads, jobs, results):
+    # Thread caps must be in place before torch / BLAS initialize
+    for var in ("OMP_NUM_THREADS", "MKL_NUM_THREADS", "OPENBLAS_NUM_THREADS"):
+        os.environ[var] = str(torch_threads)
+    try:
+        import torch
+        torch.set_num_threads(torch_threads)
+    except ImportError:
+        pass
+
+    def send(kind, job_id, payload=None):
+        # Pickle first so an unpicklable result fails just this job
+        try:
+            data = pickle.dumps((kind, job_id, index, payload))
+        except Exception as e:
+            data = pickle.dumps(("error", job_id, index, RuntimeError(f"Unpicklable result: {e}")))
+        # Sent synchronously on this worker's own pipe: no lock shared with other
+        # workers, so dying at any point can't wedge the rest of the pool
+        results.send_bytes(data)
+
+    try:
+        model = _resolve_factory(factory)(*args, **kwargs)
+    except Exception as e:
+        send("failed", None, RuntimeError(f"Could not load {factory}: {type(e).__name__}: {e}"))
+        return
+    send("ready", None)
+
+    while True:
+        job = jobs.get()
+        if job is None:
+            break
+        job_id, method, call_args, call_kwargs = job
+        handles = []
+        try:
+            call_args = [_attach(a, handles) for a in call_args]
+            call_kwargs = {k: _attach(v, handles) for k, v in call_kwargs.items()}
+            send("ok", job_id, getattr(model, method)(*call_args, **call_kwargs))
+        except Exception as e:
+            send("error", job_id, RuntimeError(f"{type(e).__name__}: {e}"))
+        finally:
+            _close_segments(handles)
+
+
+class ModelWorkerPool:
+    def __init__(self, name, factory, args=(), kwargs=None, workers=1, torch_threads=None, call_timeout=None):
+        self.name = name
+        self.factory = factory
+        self.args = tuple(args)
+        self.kwargs = dict(kwargs or {})
+        self.workers = max(1, workers)
+        self.torch_threads = torch_threads or max(1, (os.cpu_count() or 1) // self.workers)
+        self.call_timeout = call_timeout if call_timeout is not None else CALL_TIMEOUT
+
+        self._ctx = multiprocessing.get_context("spawn")
+        self._job_queues = [None] * self.workers  # one per worker, replaced on restart
+        self._result_readers = [None] * self.workers  # parent end of each worker's result pipe
+        self._lock = threading.Lock()
+        self._ids = itertools.count()
+        self._futures = {}
+        self._segments = {}
+        self._assigned = {}  # job_id -> worker index
+        self._in_flight = [0] * self.workers
+        self._load_error = None
+        self._closed = False
+
+        # Metrics
+        self._completed = 0
+        self._failed = 0
+        self._restarts = 0
+
+        self._processes = [self._spawn(i) for i in range(self.workers)]
+        self._collector = threading.Thread(target=self._collect, name=f"model-pool-{name}", daemon=True)
+        self._collector.start()
+        atexit.register(self.close)
+
+    def _spawn(self, index):
+        # Fresh channels: a worker that died mid-read may have left the old ones unusable
+        self._job_queues[index] = self._ctx.Queue()
+        if self._result_readers[index] is not None:
+            self._result_readers[index].close()
+        reader, writer = self._ctx.Pipe(duplex=False)
+        process = self._ctx.Process(
+            target=_worker_main,
+            args=(index, self.factory, self.args, self.kwargs, self.torch_threads, self._job_queues[index], writer),
+            name=f"model-worker-{self.name}-{index}",
+            daemon=True,
+        )
+        process.start()
+        writer.close()  # only the worker writes; EOF on the reader then means it is gone
+        self._result_readers[index] = reader
+        return process
+
+    # ------------------------
+    # Client side
+    # ------------------------
+    def submit(self, method, *args, **kwargs) -> Future:
+        """Run model.<method>(*args, **kwargs) on a worker; the future resolves to its result."""
+        if self._closed:
+            raise RuntimeError(f"ModelWorkerPool '{self.name}' is closed")
+        if self._load_error is not None:
+            raise self._load_error
+        future = Future()
+        segments = []
+        args = [_share(a, segments) for a in args]
+        kwargs = {k: _share(v, segments) for k, v in kwargs.items()}
+        job_id = next(self._ids)
+        with self._lock:
+            self._futures[job_id] = future
+            if segments:
+                self._segments[job_id] = segments
+            index = min(range(self.workers), key=self._in_flight.__getitem__)
+            self._assigned[job_id] = index
+            self._in_flight[index] += 1
+            self._job_queues[index].put((job_id, method, args, kwargs))
+        return future
+
+    def call(self, method, *args, **kwargs):
+        """Blocking submit; raises TimeoutError after `call_timeout` seconds."""
+        future = self.submit(method, *args, **kwargs)
+        try:
+            return future.result(timeout=self.call_timeout)
+        except FutureTimeoutError:
+            raise TimeoutError(f"Model worker {self.name}.{method} gave no result within {self.call_timeout}s") from None
+
+    # ------------------------
+    # Result collection & supervision
+    # ------------------------
+    def _finish(self, job_id, result=None, error=None):
+        with self._lock:
+            future = self._futures.pop(job_id, None)
+            segments = self._segments.pop(job_id, [])
+            index = self._assigned.pop(job_id, None)
+            if index is not None:
+                self._in_flight[index] -= 1
+            if error is None:
+                self._completed += 1
+            else:
+                self._failed += 1
+        _close_segments(segments, unlink=True)
+        if future is not None and not future.done():
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
+
+    def _collect(self):
+        while not self._closed:
+            with self._lock:
+                readers = [r for r in self._result_readers if r is not None]
+            for reader in wait(readers, timeout=1.0) if readers else []:
+                try:
+                    kind, job_id, index, payload = pickle.loads(reader.recv_bytes())
+                except (EOFError, OSError):
+                    # Worker exited; stop polling its pipe until _check_workers replaces it
+                    with self._lock:
+                        if reader in self._result_readers:
+                            self._result_readers[self._result_readers.index(reader)] = None
+                    reader.close()
+                    continue
+                self._handle(kind, job_id, payload)
+            if not readers:
+                time.sleep(1.0)  # every worker gone (e.g. after a load failure): don't spin
+            self._check_workers()
+
+    def _handle(self, kind, job_id, payload):
+        if kind == "ok":
+            self._finish(job_id, result=payload)
+        elif kind == "error":
+            self._finish(job_id, error=payload)
+        elif kind == "failed":
+            # The model can't be built: no point restarting workers
+            print(f"[MODEL POOL] {self.name}: {payload}")
+            self._load_error = payload
+            with self._lock:
+                pending = list(self._futures)
+            for pending_id in pending:
+                self._finish(pending_id, error=payload)
+
+    def _check_workers(self):
+        if self._closed or self._load_error is not None:
+            return
+        for index, process in enumerate(self._processes):
+            if process.is_alive():
+                continue
+            print(f"[MODEL POOL] Restarting worker {self.name}-{index} (exit code {process.exitcode})")
+            with self._lock:
+                # Everything sent to this worker is lost, started or still queued
+                lost = [job_id for job_id, worker in self._assigned.items() if worker == index]
+                self._restarts += 1
+                self._processes[index] = self._spawn(index)
+            for job_id in lost:
+                self._finish(job_id, error=RuntimeError(f"Model worker {self.name}-{index} died (exit code {process.exitcode})"))
+
+    # ------------------------
+    # Metrics & lifecycle
+    # ------------------------
+    def stats(self):
+        with self._lock:
+            return {
+                "factory": self.factory,
+                "workers": self.workers,
+                "alive_workers": sum(p.is_alive() for p in self._processes),
+                "torch_threads": self.torch_threads,
+                "pending": len(self._futures),
+                "running": len(self._assigned),
+                "completed": self._completed,
+                "failed": self._failed,
+                "restarts": self._restarts,
+                "load_error": str(self._load_error) if self._load_error else None,
+            }
+
+    def close(self, timeout=10.0):
+        if self._closed:
+            return
+        self._closed = True
+        for jobs in self._job_queues:
+            jobs.put(None)
+        for process in self._processes:
+            process.join(timeout=timeout)
+            if process.is_alive():
+                process.terminate()
+        self._collector.join(timeout=timeout)
+        for reader in self._result_readers:
+            if reader is not None:
+                reader.close()
+        with self._lock:
+            pending = list(self._futures)
+        for job_id in pending:
+            self._finish(job_id, error=RuntimeError(f"ModelWorkerPool '{self.name}' is closed"))
+        atexit.unregister(self.close)
+
+
+class RemoteModel:
+    """
+    Stand-in for a model object: attribute calls run on a ModelWorkerPool,
+    e.g. RemoteModel(pool).encode(texts) -> pool.call("encode", texts).
+    """
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def __getattr__(self, method):
+        def remote_call(*args, **kwargs):
+            return self.pool.call(method, *args, **kwargs)
+        return remote_call
+
+
+# ======================================
+# Per-model-type pool registry
+# ======================================
+_pools = {}
+_registry_lock = threading.Lock()
+
+
+def model_workers(model_type):
+    return int(os.getenv(f"MODEL_WORKERS_{model_type.upper()}", 0))
+
+
+def get_model_pool(model_type, *args, **kwargs):
+    """
+    Return the process pool for `model_type` (built with factory args/kwargs),
+    or None when MODEL_WORKERS_<TYPE> is 0 and the model should run in-process.
+    """
+    workers = model_workers(model_type)
+    if workers <= 0:
+        return None
+    key = (model_type, args, tuple(sorted(kwargs.items())))
+    with _registry_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            threads = os.getenv(f"MODEL_TORCH_THREADS_{model_type.upper()}", os.getenv("MODEL_TORCH_THREADS"))
+            pool = ModelWorkerPool(
+                model_type,
+                MODEL_FACTORIES[model_type],
+                args=args,
+                kwargs=kwargs,
+                workers=workers,
+                torch_threads=int(threads) if threads else None,
+            )
+            _pools[key] = pool
+        return pool
+
+
+def model_pool_stats():
+    with _registry_lock:
+        pools = list(_pools.items())
+    return [{"model_type": key[0], **pool.stats()} for key, pool in pools]
+
+
+def close_model_pools():
+    with _registry_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()